@@ -2,29 +2,84 @@
 """
 Hypnotic NFT Agent v3.0 - Clean Architecture
 Gera NFTs e inicia marketplace automaticamente
+
+Uso:
+  python agent.py                              # menu interativo
+  python agent.py --count 10 --concurrency 4 --no-marketplace
+  python agent.py --help
+
+O import não tem efeitos colaterais: .env, requests e módulos opcionais
+(pós-processamento, otimizador, supervisor) só são carregados quando usados.
 """
 
 import os
 import json
 import time
 import random
-import hashlib
-import requests
-import subprocess
 import threading
-from typing import Dict, List, Optional
+import queue
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 from dataclasses import dataclass
 from pathlib import Path
-from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
 import sys
 
-# Carrega variáveis de ambiente
-load_dotenv()
+from hedging import DEFAULT_PERCENTILE, HedgeCancelled, Hedger
+from metrics import Metrics, MetricsServer, StatsFileReporter
+from model_router import ModelRouter, Route
+from prompt_builder import PromptBuilder
+from response_cache import CacheMiss, ResponseCache, cache_key
+from scheduler import (DISCOUNT_RATIO, FAIL_OUTCOMES, BudgetExceeded, CostAwareScheduler, Job,
+                       JobQueue, format_projection, in_discount_window, model_cost_per_1k,
+                       next_window_change, parse_targets)
+from streaming import StreamAborted, consume_completion_stream
+from artifact_writer import ArtifactPackage, ArtifactWriter, PublishCancelled
+from catalog_index import CatalogIndex
+from nft_store import ContentStore, content_hash, new_nft_id
+from preview import ASSETS_DIR, compressed_variants, ensure_shared_assets, render_preview
+from svg_repair import repair_instructions, repair_locally
+from svg_analyzer import analyze_svg
+from svg_macros import MacroError, expand_macros
+from svg_validator import validate_svg
+
+if TYPE_CHECKING:
+    import requests
+    from supervisor import ProcessSupervisor
 
-# Configuração da API DeepSeek
+# Configuração da API DeepSeek (recarregada por load_environment() após ler o .env)
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+MARKETPLACE_URL = os.getenv("MARKETPLACE_URL", "http://localhost:5000")
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+
+# Preço relativo dos tokens de entrada com cache hit
+CACHE_HIT_PRICE_RATIO = 0.25
+
+# Aproximação de caracteres por token, para o prompt de um stream cancelado (sem `usage`)
+CHARS_PER_TOKEN = 4
+
+# Status HTTP que justificam nova tentativa
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Espera pela publicação de um job com intenção registrada por outro worker
+PUBLISH_GRACE_SECONDS = 30.0
+
+
+def load_environment(env_file: Optional[Path] = None):
+    """Lê o .env (diretório atual ou o do agente) e atualiza a configuração"""
+    global DEEPSEEK_API_KEY, DEEPSEEK_API_URL, MARKETPLACE_URL
+    candidates = [Path(env_file)] if env_file else [Path.cwd() / ".env",
+                                                    Path(__file__).resolve().parent / ".env"]
+    for path in candidates:
+        if path.is_file():
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            break
+    DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
+    DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", DEEPSEEK_API_URL)
+    MARKETPLACE_URL = os.getenv("MARKETPLACE_URL", MARKETPLACE_URL)
 
 @dataclass
 class NFTArtwork:
@@ -35,15 +90,118 @@ class NFTArtwork:
     price: float
     attributes: Dict[str, any]
     svg_code: str
+    cost: float = 0.0
+    tokens: int = 0
     
 class HypnoticNFTAgent:
-    def __init__(self):
-        self.model = "deepseek-reasoner"
-        self.max_tokens = 20000
+    def __init__(self, connect_timeout: float = 10.0, read_timeout: float = 300.0,
+                 max_retries: int = 4, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 stream: bool = False, optimize_svg: bool = False, svg_precision: int = 3,
+                 lean_preview: bool = False, precompress: bool = True,
+                 postprocess_workers: int = 0, async_writer: bool = True,
+                 writer_queue: int = 32, cache_mode: str = "off",
+                 cache_path: Optional[Path] = None, cache_max_mb: int = 256,
+                 seed: Optional[int] = None, metrics_port: Optional[int] = None,
+                 stats_file: Optional[Path] = None, stats_interval: float = 60.0,
+                 repair_attempts: int = 2, local_repair: bool = True,
+                 svg_macros: bool = False, near_duplicates: str = "off",
+                 similarity_threshold: Optional[float] = None,
+                 model_routing: str = "fixed", route_fallback: bool = True,
+                 routes_file: Optional[Path] = None, hedge: bool = False,
+                 hedge_percentile: float = DEFAULT_PERCENTILE,
+                 hedge_budget: Optional[Dict[str, float]] = None,
+                 bundle: bool = False, nfts_dir: Optional[Path] = None):
+        if hedge and not stream:
+            # Sem SSE a cópia perdedora não pode ser cancelada: seria paga por inteiro
+            raise ValueError("hedge requer stream=True")
+        
+        # Modelo/max_tokens/temperatura por raridade (montado após o complexity_map)
+        self.model_routing = model_routing
+        self.route_fallback = route_fallback
+        self.routes_file = routes_file
+        
+        # Streaming SSE com validação incremental e cancelamento antecipado
+        self.stream_mode = stream
+        
+        # Reparo de SVGs rejeitados: correção local ou turno curto de correção
+        self.repair_attempts = repair_attempts
+        self.local_repair = local_repair
+        self.repair_tokens_saved = 0
+        self._typical_tokens = 0.0  # média móvel de uma geração completa aceita
+        
+        # Macros SVG compactas no lugar do SMIL verboso (expandidas localmente)
+        self.svg_macros = svg_macros
+        
+        # Otimização do SVG antes de salvar (opcional)
+        self.svg_optimizer = None
+        if optimize_svg:
+            from svg_optimizer import SVGOptimizer
+            self.svg_optimizer = SVGOptimizer(precision=svg_precision)
+        
+        # Preview enxuto (referencia artwork.svg + assets compartilhados) e .gz/.br
+        self.lean_preview = lean_preview
+        self.precompress = precompress
+        
+        # Pool de processos: thumbnails e etapas pesadas de CPU fora do loop
+        self.postprocessor = None
+        self._thumbnails = False
+        if postprocess_workers > 0:
+            from postprocess import PostProcessor, rasterizer_available
+            self.postprocessor = PostProcessor(postprocess_workers)
+            self._thumbnails = rasterizer_available() is not None
+            if not self._thumbnails:
+                print("⚠️ Sem cairosvg/rsvg-convert: thumbnails desativados")
+        
+        # Cache de gravação/reprodução das respostas (desenvolvimento/testes offline)
+        self.response_cache = None
+        if cache_mode != "off":
+            self.response_cache = ResponseCache(
+                cache_path or Path.cwd() / ".cache" / "deepseek_responses.db",
+                mode=cache_mode, max_bytes=cache_max_mb * 1024 * 1024
+            )
+        
+        # Semente fixa torna estilo/raridade/nome reprodutíveis (e o replay determinístico)
+        if seed is not None:
+            random.seed(seed)
+        
+        # Camada HTTP: sessão compartilhada com pool keep-alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http_pool_size = 2 if hedge else 1  # a cópia do hedge precisa de conexão própria
+        self._session = None
+        self._session_lock = threading.Lock()
         
         # Estrutura limpa de diretórios
-        self.nfts_dir = Path.cwd() / "nfts"
-        self.nfts_dir.mkdir(exist_ok=True)
+        self.nfts_dir = Path(nfts_dir) if nfts_dir else Path.cwd() / "nfts"
+        self.nfts_dir.mkdir(parents=True, exist_ok=True)
+        self.store = ContentStore(self.nfts_dir)
+        self.catalog = CatalogIndex(self.nfts_dir / "catalog.db")
+        
+        # Quase-duplicatas estruturais (MinHash + LSH): off, flag (marca) ou reject
+        self.near_duplicate_mode = near_duplicates
+        self.similarity_index = None
+        if near_duplicates != "off":
+            from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex
+            self.similarity_index = NearDuplicateIndex(
+                self.nfts_dir / "near_duplicates.db", similarity_threshold or DEFAULT_THRESHOLD
+            )
+        if lean_preview:
+            ensure_shared_assets(self.nfts_dir, precompress)
+        
+        # Bundle único append-only acompanhando as pastas (backup/CDN sem milhares de inodes)
+        self.bundle = None
+        if bundle:
+            from nft_bundle import BUNDLE_NAME, CollectionBundle, read_folder
+            self.bundle = CollectionBundle(self.nfts_dir / BUNDLE_NAME)
+            if lean_preview and ASSETS_DIR not in self.bundle:
+                self.bundle.append(ASSETS_DIR, ASSETS_DIR, read_folder(self.nfts_dir / ASSETS_DIR))
+        
+        # Writer dedicado: publicação atômica e fsync em lote
+        self.async_writer = async_writer
+        self.writer = ArtifactWriter(self.store, max_queue=writer_queue)
         
         print(f"📁 Diretório NFTs: {self.nfts_dir}")
         
@@ -51,7 +209,31 @@ class HypnoticNFTAgent:
         self.nft_counter = 0
         self.session_start = time.time()
         self.session_cost = 0
-        self.marketplace_process = None
+        self.marketplace: Optional["ProcessSupervisor"] = None
+        
+        # Instrumentação por etapa (prompt_build, http, json_parse, validation, save, publish)
+        self.stage_observer: Optional[Callable[[str, float], None]] = None
+        self.pause_seconds = 3
+        
+        # Contabilidade compartilhada entre workers concorrentes
+        self._stats_lock = threading.Lock()
+        
+        # Métricas: baratas o bastante para ficarem sempre ligadas; exposição opcional
+        self.metrics = Metrics()
+        self._register_metrics()
+        self.metrics_server = None
+        if metrics_port is not None:
+            self.metrics_server = MetricsServer(self.metrics, metrics_port)
+            print(f"📈 Métricas em {self.metrics_server.url} (JSON: /metrics.json)")
+        self.stats_reporter = None
+        if stats_file:
+            self.stats_reporter = StatsFileReporter(self.metrics, stats_file, stats_interval)
+            print(f"📝 Estatísticas a cada {stats_interval:g}s em {stats_file}")
+        
+        # Hedging: cópia da requisição quando a latência passa do percentil recente
+        self.hedger = None
+        if hedge:
+            self.hedger = Hedger(hedge_percentile, hedge_budget, metrics=self.metrics)
         
         # Estilos artísticos
         self.art_styles = [
@@ -77,28 +259,89 @@ class HypnoticNFTAgent:
             "Legendary": {"chance": 0.10, "base_price": 500, "multiplier": 3}
         }
         
-    def start_marketplace(self):
-        """Inicia o marketplace em background"""
-        def run_marketplace():
+        # Complexidade por raridade
+        self.complexity_map = {
+            "Common": {"min_animations": 6, "complexity": 6, "colors": 4},
+            "Rare": {"min_animations": 10, "complexity": 7, "colors": 6},
+            "Epic": {"min_animations": 15, "complexity": 8, "colors": 8},
+            "Legendary": {"min_animations": 20, "complexity": 10, "colors": 10}
+        }
+        
+        # Rotas por raridade; estatísticas por rota vão para as métricas
+        self.router = ModelRouter(self.complexity_map, self.model_routing, self.route_fallback,
+                                  self.routes_file, self.metrics)
+        if self.model_routing != "fixed" or self.routes_file:
+            for rarity, route in self.router.routes.items():
+                print(f"🧭 {rarity}: {route.model} (max_tokens {route.max_tokens}, "
+                      f"temperature {route.temperature})")
+        
+        # Paletas de cores por estilo
+        self.color_palettes = {
+            "Hypnotic Spirals": ["#FF006E", "#FB5607", "#FFBE0B", "#8338EC", "#3A86FF"],
+            "Psychedelic Mandala": ["#FF0080", "#FF8C00", "#FFD700", "#00CED1", "#9400D3"],
+            "Quantum Particles": ["#00FFFF", "#FF00FF", "#FFFF00", "#00FF00", "#FF1493"],
+            "Neural Network": ["#00D9FF", "#00FF88", "#FF0099", "#FFD300", "#9D00FF"],
+            "Sacred Geometry Motion": ["#FFD700", "#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4"],
+            "Neon Circuit Board": ["#39FF14", "#FF1493", "#00CED1", "#FFD700", "#FF00FF"],
+            "Galaxy Formation": ["#E94B3C", "#EE7879", "#F6D55C", "#3CAEA3", "#20639B"],
+            "Aurora Borealis": ["#00FF41", "#00D4FF", "#FF006E", "#FFDD00", "#FF00DC"]
+        }
+        
+        # Prompts pré-compilados por (estilo, raridade) com prefixo estável
+        self.prompt_builder = PromptBuilder(
+            self.art_styles, self.complexity_map, self._get_style_specific_requirements,
+            macros=svg_macros
+        )
+        self.cache_savings = 0
+        
+    def start_marketplace(self, ready_timeout: float = 30.0) -> bool:
+        """
+        Inicia o marketplace supervisionado (log drenado para logs/marketplace.log,
+        reinício com backoff) e espera ele responder por HTTP
+        """
+        if self.marketplace is None:
+            from supervisor import ProcessSupervisor
+            # Ao lado do agente; o diretório atual (comportamento anterior) fica como alternativa
+            candidates = [Path(__file__).resolve().parent / "marketplace.py", Path.cwd() / "marketplace.py"]
+            script = next((path for path in candidates if path.exists()), None)
+            if script is None:
+                print(f"❌ Erro ao iniciar marketplace: {candidates[0]} não encontrado")
+                return False
+            print("\n🛍️ Iniciando Marketplace...")
+            self.marketplace = ProcessSupervisor(
+                "marketplace",
+                [sys.executable, str(script)],
+                ready_url=MARKETPLACE_URL,
+                log_path=Path("logs") / "marketplace.log",
+                ready_timeout=ready_timeout
+            )
+            self._register_marketplace_metrics()
             try:
-                print("\n🛍️ Iniciando Marketplace...")
-                self.marketplace_process = subprocess.Popen(
-                    [sys.executable, "marketplace.py"],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                
-                # Aguarda marketplace iniciar
-                time.sleep(3)
-                print("✅ Marketplace rodando em http://localhost:5000")
-                
-            except Exception as e:
+                self.marketplace.start()
+            except OSError as e:
                 print(f"❌ Erro ao iniciar marketplace: {e}")
+                self.marketplace = None
+                return False
         
-        # Executa em thread separada
-        marketplace_thread = threading.Thread(target=run_marketplace, daemon=True)
-        marketplace_thread.start()
+        started = time.perf_counter()
+        if not self.marketplace.wait_ready(ready_timeout):
+            return False  # o supervisor já avisou (uma vez) e continua sondando
+        print(f"✅ Marketplace rodando em {MARKETPLACE_URL} "
+              f"(pronto em {time.perf_counter() - started:.2f}s)")
+        return True
+    
+    def stop_marketplace(self):
+        if self.marketplace is not None:
+            self.marketplace.stop()
+    
+    def _register_marketplace_metrics(self):
+        marketplace = self.marketplace
+        self.metrics.gauge("marketplace_up", lambda: float(marketplace.ready),
+                           "1 se o marketplace responde por HTTP")
+        self.metrics.gauge("marketplace_uptime_seconds", lambda: marketplace.uptime,
+                           "Segundos desde o último (re)início do marketplace")
+        self.metrics.gauge("marketplace_restarts", lambda: marketplace.restarts,
+                           "Reinícios do marketplace após quedas")
     
     def generate_unique_name(self) -> str:
         """Gera nome único e criativo"""
@@ -130,47 +373,235 @@ class HypnoticNFTAgent:
         
         return round(base * multiplier * complexity_bonus, 2)
     
-    def estimate_cost(self, tokens: int) -> float:
-        """Estima custo da geração"""
-        cost_per_1k = 0.014
-        current_hour = time.gmtime().tm_hour
+    def estimate_cost(self, tokens: int, cache_hit_tokens: int = 0,
+                      model: Optional[str] = None) -> float:
+        """Estima custo da geração (preço do modelo da rota)"""
+        cost_per_1k = model_cost_per_1k(model)
         
         # Desconto horário brasileiro
-        if (current_hour >= 16) or (current_hour <= 0):
-            cost_per_1k *= 0.25
+        if in_discount_window():
+            cost_per_1k *= DISCOUNT_RATIO
+        
+        # Tokens de entrada servidos pelo cache de contexto custam menos
+        cache_hit_tokens = min(cache_hit_tokens, tokens)
+        billable = (tokens - cache_hit_tokens) + cache_hit_tokens * CACHE_HIT_PRICE_RATIO
             
-        return (tokens / 1000) * cost_per_1k
+        return (billable / 1000) * cost_per_1k
     
-    def generate_artwork(self) -> NFTArtwork:
-        """Gera uma obra de arte NFT"""
-        style = random.choice(self.art_styles)
-        rarity = self.determine_rarity()
-        name = self.generate_unique_name()
+    def _cost_from_usage(self, usage: Dict, model: Optional[str] = None) -> float:
+        """Calcula custo a partir do payload `usage` e acumula na sessão"""
+        tokens = usage.get('total_tokens', 0)
+        cache_hit = usage.get('prompt_cache_hit_tokens', 0)
+        cost = self.estimate_cost(tokens, cache_hit, model)
+        savings = self.estimate_cost(tokens, model=model) - cost
         
-        # Complexidade por raridade
-        complexity_map = {
-            "Common": {"min_animations": 6, "complexity": 6, "colors": 4},
-            "Rare": {"min_animations": 10, "complexity": 7, "colors": 6},
-            "Epic": {"min_animations": 15, "complexity": 8, "colors": 8},
-            "Legendary": {"min_animations": 20, "complexity": 10, "colors": 10}
-        }
+        with self._stats_lock:
+            self.session_cost += cost
+            self.cache_savings += savings
         
-        reqs = complexity_map[rarity]
+        self.metrics.inc("nft_tokens_total", usage.get('prompt_tokens', 0), direction="in")
+        self.metrics.inc("nft_tokens_total", usage.get('completion_tokens', 0), direction="out")
+        self.metrics.inc("nft_prompt_cache_hit_tokens_total", cache_hit)
+        self.metrics.inc("nft_cost_dollars_total", cost)
         
-        # Paletas de cores por estilo
-        color_palettes = {
-            "Hypnotic Spirals": ["#FF006E", "#FB5607", "#FFBE0B", "#8338EC", "#3A86FF"],
-            "Psychedelic Mandala": ["#FF0080", "#FF8C00", "#FFD700", "#00CED1", "#9400D3"],
-            "Quantum Particles": ["#00FFFF", "#FF00FF", "#FFFF00", "#00FF00", "#FF1493"],
-            "Neural Network": ["#00D9FF", "#00FF88", "#FF0099", "#FFD300", "#9D00FF"],
-            "Sacred Geometry Motion": ["#FFD700", "#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4"],
-            "Neon Circuit Board": ["#39FF14", "#FF1493", "#00CED1", "#FFD700", "#FF00FF"],
-            "Galaxy Formation": ["#E94B3C", "#EE7879", "#F6D55C", "#3CAEA3", "#20639B"],
-            "Aurora Borealis": ["#00FF41", "#00D4FF", "#FF006E", "#FFDD00", "#FF00DC"]
-        }
+        if cache_hit:
+            cache_miss = usage.get('prompt_cache_miss_tokens', 0)
+            print(f"   🧊 Cache: {cache_hit} hit / {cache_miss} miss (economia ${savings:.4f})")
+        return cost
+    
+    def _get_session(self) -> "requests.Session":
+        """Retorna a sessão HTTP compartilhada (criada sob demanda)"""
+        with self._session_lock:
+            if self._session is None:
+                import requests  # ~100ms: só quando a primeira requisição é feita
+                session = requests.Session()
+                session.headers.update({
+                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+                    "Content-Type": "application/json"
+                })
+                self._mount_adapter(session)
+                self._session = session
+            return self._session
+    
+    def _mount_adapter(self, session: "requests.Session"):
+        """Monta adapter com pool dimensionado para os workers"""
+        from requests.adapters import HTTPAdapter
+        # Retries ficam em _post_with_retry para controlar backoff e Retry-After
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.http_pool_size,
+                              max_retries=0, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    
+    def configure_http_pool(self, size: int):
+        """Ajusta o pool de conexões ao número de workers concorrentes"""
+        size = max(1, size) * (2 if self.hedger else 1)
+        with self._session_lock:
+            if size == self.http_pool_size:
+                return
+            self.http_pool_size = size
+            if self._session is not None:
+                self._mount_adapter(self._session)
+    
+    def close(self):
+        """Fecha conexões do pool HTTP, writer, índice do catálogo e métricas"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        self.writer.close()
+        self.catalog.close()
+        if self.bundle:
+            self.bundle.close()
+        if self.similarity_index:
+            self.similarity_index.close()
+        if self.response_cache:
+            self.response_cache.close()
+        if self.postprocessor:
+            print(f"⏳ Finalizando pós-processamento ({self.postprocessor.queue_depth} na fila)...")
+            self.postprocessor.shutdown(wait=True)
+        if self.stats_reporter:
+            self.stats_reporter.close()
+        if self.metrics_server:
+            self.metrics_server.close()
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Backoff exponencial com jitter completo"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def _retry_after_delay(self, response: "requests.Response") -> Optional[float]:
+        """Interpreta o header Retry-After (segundos ou data HTTP)"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        from email.utils import parsedate_to_datetime
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    
+    def _post_with_retry(self, payload: Dict, stream: bool = False) -> "requests.Response":
+        """
+        POST na API DeepSeek com timeouts e retry/backoff em 429/5xx e falhas de
+        conexão; ReadTimeout não é repetido (a requisição não é idempotente)
+        """
+        session = self._get_session()
+        import requests
+        timeout = (self.connect_timeout, self.read_timeout)
+        
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt >= self.max_retries
+            try:
+                response = session.post(DEEPSEEK_API_URL, json=payload,
+                                        timeout=timeout, stream=stream)
+            except (requests.ConnectTimeout, requests.ConnectionError) as e:
+                # ReadTimeout não entra: a geração pode já ter sido feita (e cobrada)
+                if last_attempt:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"   🔁 Falha de conexão ({type(e).__name__}), nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            
+            if response.status_code in RETRYABLE_STATUS and not last_attempt:
+                delay = self._retry_after_delay(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                delay = min(delay, self.backoff_max)  # Retry-After longo não prende o worker
+                response.close()
+                print(f"   🔁 HTTP {response.status_code}, nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            
+            response.raise_for_status()
+            return response
+    
+    def _run_cpu(self, fn, *args):
+        """Executa etapa pesada de CPU no pool de processos, se habilitado"""
+        if self.postprocessor is None:
+            return fn(*args)
+        return self.postprocessor.run(fn, *args)
+    
+    def _register_metrics(self):
+        """Descreve as séries e registra gauges calculados só na leitura"""
+        m = self.metrics
+        m.describe("nft_stage_seconds", "Duração de cada etapa do pipeline")
+        m.describe("nft_generations_total", "Gerações por desfecho")
+        m.describe("nft_validation_failures_total", "SVGs rejeitados por motivo")
+        m.describe("nft_tokens_total", "Tokens consumidos (in = prompt, out = completion)")
+        m.describe("nft_prompt_cache_hit_tokens_total", "Tokens de prompt servidos pelo cache de contexto")
+        m.describe("nft_cost_dollars_total", "Custo estimado acumulado")
+        m.describe("nft_saved_total", "NFTs publicados em disco")
+        m.describe("nft_duplicates_total", "SVGs descartados por já existirem")
+        m.describe("nft_near_duplicates_total", "Quase-duplicatas detectadas (action = flag/reject)")
+        m.describe("nft_bytes_written_total", "Bytes gravados nos pacotes publicados")
+        m.describe("nft_write_failures_total", "Pacotes que o writer não conseguiu publicar")
+        m.describe("nft_bundle_bytes_total", "Bytes acrescentados ao bundle da coleção")
+        m.describe("nft_repairs_total", "Reparos de SVG por método (local/follow_up) e desfecho")
+        m.describe("nft_repair_tokens_total", "Tokens gastos em turnos de correção")
+        m.describe("nft_route_attempts_total", "Tentativas por rota (rarity, model) e desfecho")
+        m.describe("nft_route_seconds", "Latência de uma tentativa por rota (geração + reparos)")
+        m.describe("nft_route_cost_dollars_total", "Custo por rota, incluindo tentativas reprovadas")
+        m.describe("nft_route_fallbacks_total", "Jobs repetidos no modelo mais forte após reprovação")
+        m.describe("nft_hedge_jobs_total", "Tentativas elegíveis a hedge por raridade")
+        m.describe("nft_hedges_total", "Cópias disparadas (fired) ou barradas pelo orçamento (skipped_budget)")
+        m.describe("nft_hedge_wins_total", "Tentativas com cópia por vencedora (primary/hedge)")
+        m.describe("nft_hedge_extra_tokens_total", "Tokens gastos pela tentativa perdedora")
+        m.describe("nft_hedge_extra_cost_dollars_total", "Custo da tentativa perdedora")
+        m.gauge("nft_repair_tokens_saved", lambda: self.repair_tokens_saved,
+                "Tokens economizados por reparos vs regeneração completa")
+        m.gauge("nft_session_cost_dollars", lambda: self.session_cost, "Gasto acumulado da sessão")
+        m.gauge("nft_cache_savings_dollars", lambda: self.cache_savings, "Economia com cache de contexto")
+        m.gauge("nft_cost_per_nft_dollars", lambda: self.session_cost / max(self.nft_counter, 1),
+                "Custo médio por NFT salvo")
+        m.gauge("nft_saved_per_minute",
+                lambda: self.nft_counter * 60 / max(time.time() - self.session_start, 1e-9),
+                "NFTs salvos por minuto desde o início da sessão")
+        m.gauge("nft_writer_queue_depth", lambda: self.writer.queue_depth, "Pacotes aguardando o writer")
+        if self.postprocessor:
+            m.gauge("nft_postprocess_queue_depth", lambda: self.postprocessor.queue_depth,
+                    "Tarefas no pool de pós-processamento")
+    
+    @contextmanager
+    def _stage(self, name: str):
+        """Mede a duração de uma etapa do pipeline (métricas e observador opcional)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._report_stage(name, time.perf_counter() - start)
+    
+    def _report_stage(self, name: str, seconds: float):
+        self.metrics.observe("nft_stage_seconds", seconds, stage=name)
+        if self.stage_observer is not None:
+            self.stage_observer(name, seconds)
+    
+    def _add_session_cost(self, cost: float):
+        """Acumula custo da sessão de forma thread-safe"""
+        with self._stats_lock:
+            self.session_cost += cost
+        self.metrics.inc("nft_cost_dollars_total", cost)
+    
+    def generate_artwork(self, job_number: Optional[int] = None,
+                         rarity: Optional[str] = None) -> NFTArtwork:
+        """Gera uma obra de arte NFT (raridade sorteada, ou fixa pelo agendador)"""
+        if job_number is None:
+            job_number = self.nft_counter + 1
+        
+        style = random.choice(self.art_styles)
+        rarity = rarity or self.determine_rarity()
+        name = self.generate_unique_name()
+        
+        reqs = self.complexity_map[rarity]
         
         # Seleciona paleta ou gera uma vibrante
-        base_colors = color_palettes.get(style, [
+        base_colors = self.color_palettes.get(style, [
             f"#{random.randint(128,255):02X}{random.randint(0,128):02X}{random.randint(128,255):02X}",
             f"#{random.randint(0,128):02X}{random.randint(128,255):02X}{random.randint(128,255):02X}",
             f"#{random.randint(128,255):02X}{random.randint(128,255):02X}{random.randint(0,128):02X}",
@@ -178,185 +609,46 @@ class HypnoticNFTAgent:
             f"#{random.randint(128,255):02X}{random.randint(0,255):02X}{random.randint(200,255):02X}"
         ])
         
-        prompt = f"""
-Você é um MESTRE em criar arte SVG SURREAL, HIPNOTIZANTE e PROFUNDAMENTE ANIMADA.
-
-CONTEXTO:
-- Nome da obra: {name}
-- Estilo: {style}
-- Raridade: {rarity}
-- Cores base sugeridas: {', '.join(base_colors[:reqs['colors']])}
-
-REQUISITOS TÉCNICOS OBRIGATÓRIOS:
-1. ViewBox: EXATAMENTE viewBox="0 0 1000 1000"
-2. Background: Cor sólida ou gradiente radial/linear (NUNCA transparente)
-3. Mínimo de {reqs['min_animations']} animações DIFERENTES e SINCRONIZADAS
-4. TODAS as animações com repeatCount="indefinite"
-5. Duração das animações: Varie entre 3s e 30s para criar polirritmia hipnótica
-6. Use calcMode="spline" com keySplines para movimentos orgânicos
-
-TÉCNICAS DE ANIMAÇÃO OBRIGATÓRIAS (use TODAS):
-
-1. ROTAÇÕES HIPNÓTICAS:
-   <animateTransform attributeName="transform" type="rotate" 
-    from="0 500 500" to="360 500 500" dur="20s" repeatCount="indefinite"/>
-   - Varie: direção (360 ou -360), centro de rotação, duração
-
-2. MORPHING DE FORMAS:
-   <animate attributeName="d" values="path1;path2;path3;path1" 
-    dur="10s" repeatCount="indefinite" calcMode="spline" 
-    keySplines="0.5 0 0.5 1;0.5 0 0.5 1"/>
-   - Transforme círculos em estrelas, quadrados em espirais
-
-3. PULSAÇÕES ORGÂNICAS:
-   <animate attributeName="r" values="50;80;50" dur="4s" 
-    repeatCount="indefinite" calcMode="spline"/>
-   - Aplique em raios, larguras, alturas
-
-4. ONDULAÇÕES DE COR:
-   <animate attributeName="fill" values="cor1;cor2;cor3;cor1" 
-    dur="8s" repeatCount="indefinite"/>
-   - Use nas cores base fornecidas
-
-5. MOVIMENTOS EM PATHS:
-   <animateMotion dur="15s" repeatCount="indefinite">
-     <mpath href="#pathId"/>
-   </animateMotion>
-   - Crie paths sinuosos, espirais, lemniscatas
-
-6. OPACIDADE FANTASMAGÓRICA:
-   <animate attributeName="opacity" values="0;1;0" 
-    dur="6s" repeatCount="indefinite"/>
-
-7. TRANSFORMAÇÕES DE ESCALA:
-   <animateTransform attributeName="transform" type="scale" 
-    values="1;1.5;1" dur="7s" repeatCount="indefinite" additive="sum"/>
-
-8. FILTROS DINÂMICOS:
-   - Use feTurbulence com baseFrequency animado
-   - feGaussianBlur com stdDeviation variável
-   - feDisplacementMap para distorções líquidas
-
-ELEMENTOS VISUAIS OBRIGATÓRIOS PARA {style}:
-{self._get_style_specific_requirements(style)}
-
-ESTRUTURA SURREAL OBRIGATÓRIA:
-1. PROFUNDIDADE: Mínimo 5 camadas com diferentes velocidades (parallax)
-2. ELEMENTOS IMPOSSÍVEIS: Geometrias não-euclidianas, ilusões de ótica
-3. FLUXO LÍQUIDO: Tudo deve fluir como se estivesse submerso
-4. SINCRONIZAÇÃO: Crie "momentos" onde várias animações se alinham
-5. SURPRESAS VISUAIS: Elementos que aparecem/desaparecem periodicamente
-
-EXEMPLO DE ESTRUTURA SVG:
-```svg
-<svg viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg">
-  <defs>
-    <!-- Gradientes animados -->
-    <radialGradient id="grad1">
-      <stop offset="0%" stop-color="#FF006E">
-        <animate attributeName="stop-color" values="#FF006E;#FB5607;#FF006E" dur="5s" repeatCount="indefinite"/>
-      </stop>
-      <stop offset="100%" stop-color="#3A86FF">
-        <animate attributeName="stop-color" values="#3A86FF;#8338EC;#3A86FF" dur="7s" repeatCount="indefinite"/>
-      </stop>
-    </radialGradient>
-    
-    <!-- Filtros complexos -->
-    <filter id="liquid">
-      <feTurbulence baseFrequency="0.02" numOctaves="3">
-        <animate attributeName="baseFrequency" values="0.02;0.05;0.02" dur="10s" repeatCount="indefinite"/>
-      </feTurbulence>
-      <feDisplacementMap in="SourceGraphic" scale="20"/>
-    </filter>
-    
-    <!-- Paths para movimento -->
-    <path id="spiral" d="M500,500 Q600,400 500,300 T400,400 T500,500" opacity="0"/>
-  </defs>
-  
-  <!-- Background animado -->
-  <rect width="1000" height="1000" fill="url(#grad1)"/>
-  
-  <!-- Camadas com diferentes velocidades e filtros -->
-  <!-- ... elementos surreais aqui ... -->
-</svg>
-```
-
-IMPORTANTE PARA {rarity}:
-- Common: Foco em loops perfeitos e harmonia visual
-- Rare: Adicione elementos que quebram o padrão periodicamente  
-- Epic: Múltiplas dimensões visuais interagindo
-- Legendary: Transcenda a percepção normal, crie portais visuais
-
-PROIBIDO:
-- Elementos estáticos (TUDO deve se mover)
-- Animações abruptas (use sempre easing/splines)
-- Cores muito escuras ou muito claras (mantenha vibrante)
-- Repetições óbvias (varie durações para criar polirritmia)
-- SVG com erro de sintaxe
-
-Retorne um JSON VÁLIDO:
-{{
-    "artwork_name": "{name} (ou uma variação poética)",
-    "description": "Descrição surreal e poética que capture a essência hipnótica da obra (3-4 frases)",
-    "svg_code": "<!-- SVG COMPLETO E VÁLIDO COM TODAS AS ANIMAÇÕES -->",
-    "attributes": {{
-        "animation_count": {reqs['min_animations']} (número exato de animações),
-        "complexity": {reqs['complexity']},
-        "hypnotic_factor": número de 1-10,
-        "primary_colors": {base_colors[:reqs['colors']]},
-        "loop_duration": duração do loop mestre em segundos,
-        "special_features": ["feature1", "feature2", "feature3"]
-    }}
-}}
-
-LEMBRE-SE: Esta arte deve ser um PORTAL VISUAL que HIPNOTIZA e TRANSCENDE. Cada elemento deve DANÇAR em harmonia surreal. O observador deve sentir que está olhando para outra dimensão!
-"""
+        with self._stage("prompt_build"):
+            messages = self.prompt_builder.build_messages(
+                name, style, rarity, base_colors[:reqs['colors']]
+            )
         
         try:
-            print(f"\n🎨 Gerando NFT #{self.nft_counter + 1}")
+            print(f"\n🎨 Gerando NFT #{job_number}")
             print(f"   Raridade: {rarity}")
             print(f"   Estilo: {style}")
             
-            headers = {
-                "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": "Você é um gênio criativo especializado em arte SVG surreal e hipnotizante. Você domina completamente a sintaxe SVG, animações SMIL, filtros, gradientes e transformações. Suas criações são portais visuais para outras dimensões. SEMPRE retorne JSON válido com SVG sintaticamente perfeito."},
-                    {"role": "user", "content": prompt}
-                ],
-                "max_tokens": self.max_tokens,
-                "temperature": 0.9,
-                "response_format": {"type": "json_object"}
-            }
-            
-            response = requests.post(DEEPSEEK_API_URL, headers=headers, json=data)
-            response.raise_for_status()
-            
-            result = json.loads(response.json()['choices'][0]['message']['content'])
-            
-            # Validação rigorosa
-            svg_code = result.get("svg_code", "")
-            if not svg_code or len(svg_code) < 500:
-                raise ValueError("SVG muito curto")
-            
-            if not all(tag in svg_code for tag in ["<svg", "<animate", "viewBox=\"0 0 1000 1000\""]):
-                raise ValueError("SVG incompleto ou malformado")
+            route = self.router.route(rarity)
+            print(f"   Modelo: {route.model}")
+            try:
+                result, svg_code, report, cost, tokens = self._attempt(
+                    rarity, route, messages, reqs['min_animations']
+                )
+            except ValueError as e:
+                # Reprovada mesmo após os reparos: repete uma vez no modelo mais forte
+                fallback = self.router.fallback_for(route)
+                if fallback is None:
+                    raise
+                self.router.record_fallback(rarity, route, fallback)
+                print(f"   ⤴️ {route.model} reprovado; nova tentativa com {fallback.model}")
+                result, svg_code, report, cost, tokens = self._attempt(
+                    rarity, fallback, messages, reqs['min_animations']
+                )
+                cost += getattr(e, "cost", 0.0)
+                tokens += getattr(e, "tokens", 0)
+            for warning in report.warnings():
+                print(f"   ⚠️ {warning}")
             
-            animation_count = svg_code.count("<animate")
-            if animation_count < reqs['min_animations']:
-                raise ValueError(f"Poucas animações: {animation_count} < {reqs['min_animations']}")
+            animation_count = report.animation_total
             
-            # Calcula custo
-            tokens = response.json().get('usage', {}).get('total_tokens', 0)
-            cost = self.estimate_cost(tokens)
-            self.session_cost += cost
+            # Metadados medidos no SVG (o modelo não gasta tokens com eles)
+            with self._stage("analysis"):
+                analysis = self._run_cpu(analyze_svg, svg_code)
+            complexity = reqs['complexity']
+            attributes = analysis.attributes(complexity, colors=reqs['colors'])
             
             # Calcula preço de venda
-            complexity = result["attributes"].get("complexity", reqs['complexity'])
             price = self.calculate_price(rarity, complexity)
             
             artwork = NFTArtwork(
@@ -365,21 +657,240 @@ LEMBRE-SE: Esta arte deve ser um PORTAL VISUAL que HIPNOTIZA e TRANSCENDE. Cada
                 style=style,
                 rarity=rarity,
                 price=price,
-                attributes=result["attributes"],
-                svg_code=svg_code
+                attributes=attributes,
+                svg_code=svg_code,
+                cost=cost,
+                tokens=tokens
             )
             
             print(f"   ✅ Gerado: {artwork.name}")
-            print(f"   🎬 Animações: {animation_count}")
+            print(f"   🎬 Animações: {animation_count} (loop mestre: {attributes['perceived_loop']}s)")
             print(f"   💰 Preço: ${price}")
             print(f"   💸 Custo: ${cost:.3f}")
             
+            self.metrics.inc("nft_generations_total", outcome="ok")
             return artwork
             
         except Exception as e:
+            self.metrics.inc("nft_generations_total", outcome="failed", error=type(e).__name__)
             print(f"❌ Erro: {str(e)}")
             raise
     
+    def _attempt(self, rarity: str, route: Route, messages: List[Dict], min_animations: int):
+        """Uma tentativa na rota; com hedging, uma cópia pode correr em paralelo"""
+        if self.hedger is None:
+            return self._generate_on_route(rarity, route, messages, min_animations)
+        return self.hedger.run(
+            rarity, (rarity, route.model),
+            lambda cancel: self._generate_on_route(rarity, route, messages, min_animations, cancel),
+            spent=lambda generated: (generated[3], generated[4])
+        )
+    
+    def _generate_on_route(self, rarity: str, route: Route, messages: List[Dict],
+                           min_animations: int, cancel: Optional[threading.Event] = None):
+        """
+        Geração + validação/reparo numa rota, contabilizada nas estatísticas da rota.
+        Retorna (result, svg_code, report, custo, tokens); se reprovada (ou cancelada
+        pelo hedge), a exceção leva o que já foi gasto em `cost`/`tokens`.
+        """
+        data = route.payload(messages)
+        started = time.perf_counter()
+        cost = 0.0
+        tokens = 0
+        try:
+            with self._stage("http"):
+                content, usage = self._request_completion(data, min_animations, cancel)
+            
+            # Calcula custo (já pago, mesmo que a resposta seja rejeitada)
+            cost = self._cost_from_usage(usage, route.model)
+            tokens = usage.get('total_tokens', 0)
+            if cancel is not None and cancel.is_set():
+                raise HedgeCancelled("Cancelado: outra requisição já venceu")
+            
+            # Validação rigorosa; defeitos são reparados em vez de descartar a resposta
+            result, svg_code, report, repair_cost, repair_tokens, repaired = self._validate_or_repair(
+                data, content, tokens, min_animations, cancel
+            )
+        except ValueError as e:
+            e.cost = cost + getattr(e, "cost", 0.0)
+            e.tokens = tokens + getattr(e, "tokens", 0)
+            outcome = "cancelled" if cancel is not None and cancel.is_set() else "failed"
+            self.router.record(rarity, route, outcome, time.perf_counter() - started,
+                               e.cost, e.tokens)
+            raise
+        cost += repair_cost
+        tokens += repair_tokens
+        self.router.record(rarity, route, "repaired" if repaired else "ok",
+                           time.perf_counter() - started, cost, tokens)
+        return result, svg_code, report, cost, tokens
+    
+    def _parse_response(self, content: str, min_animations: int):
+        """JSON + validação do SVG em passada única: (result, svg_code, report, violations)"""
+        try:
+            with self._stage("json_parse"):
+                result = json.loads(content)
+        except json.JSONDecodeError as e:
+            return None, "", None, [("invalid_json", f"JSON inválido: {e}")]
+        if not isinstance(result, dict):
+            return None, "", None, [("invalid_json", "JSON inválido: esperado um objeto")]
+        
+        svg_code = result.get("svg_code") or ""
+        if self.svg_macros:
+            try:
+                with self._stage("macro_expand"):
+                    svg_code = expand_macros(svg_code)
+            except MacroError as e:
+                return result, svg_code, None, [("invalid_macro", str(e))]
+            result["svg_code"] = svg_code
+        if len(svg_code) < 500:
+            return result, svg_code, None, [("too_short", "SVG muito curto")]
+        
+        with self._stage("validation"):
+            report = self._run_cpu(validate_svg, svg_code)
+        violations = report.violations(min_animations)
+        missing = [key for key in ("artwork_name", "description") if key not in result]
+        if missing:
+            violations.append(("missing_fields", f"Campos ausentes no JSON: {', '.join(missing)}"))
+        return result, svg_code, report, violations
+    
+    def _validate_or_repair(self, data: Dict, content: str, original_tokens: int, min_animations: int,
+                            cancel: Optional[threading.Event] = None):
+        """
+        Valida a resposta; se rejeitada, tenta uma correção local determinística e
+        depois até `repair_attempts` turnos curtos de correção na mesma conversa.
+        Retorna (result, svg_code, report, custo_extra, tokens_extra, reparado).
+        """
+        repair_cost = 0.0
+        repair_tokens = 0
+        repairs = 0
+        
+        # Regenerar custaria uma geração completa: respostas truncadas subestimariam
+        regen_tokens = max(original_tokens, int(self._typical_tokens))
+        while True:
+            result, svg_code, report, violations = self._parse_response(content, min_animations)
+            if not violations:
+                if not repairs:
+                    with self._stats_lock:
+                        self._typical_tokens = (original_tokens if not self._typical_tokens else
+                                                0.8 * self._typical_tokens + 0.2 * original_tokens)
+                else:
+                    self._record_repair("follow_up", "ok", regen_tokens - repair_tokens)
+                return result, svg_code, report, repair_cost, repair_tokens, bool(repairs)
+            
+            for reason, _ in violations:
+                self.metrics.inc("nft_validation_failures_total", reason=reason)
+            message = "; ".join(text for _, text in violations)
+            
+            # 1. Correção local (viewBox, poucas animações faltando): zero tokens
+            if self.local_repair:
+                fixed = repair_locally(svg_code, report, violations, min_animations)
+                if fixed is not None:
+                    fixed_report = self._run_cpu(validate_svg, fixed)
+                    if not fixed_report.violations(min_animations):
+                        result["svg_code"] = fixed
+                        print(f"   🔧 Corrigido localmente: {message}")
+                        # Depois de turnos de correção o mérito (e o custo) é do follow_up
+                        self._record_repair("follow_up" if repairs else "local", "ok",
+                                            regen_tokens - repair_tokens)
+                        return result, fixed, fixed_report, repair_cost, repair_tokens, True
+            
+            if repairs >= self.repair_attempts or (cancel is not None and cancel.is_set()):
+                if repairs:
+                    self._record_repair("follow_up", "failed", -repair_tokens)
+                # Cópia perdedora do hedge não gasta turnos de correção
+                error = (HedgeCancelled("Cancelado: outra requisição já venceu")
+                         if cancel is not None and cancel.is_set() else ValueError(message))
+                error.cost, error.tokens = repair_cost, repair_tokens
+                raise error
+            
+            # 2. Turno de correção: o prefixo da conversa é servido pelo cache de contexto
+            repairs += 1
+            follow_up = repair_instructions(violations, report, min_animations, len(svg_code))
+            data = dict(data, messages=data["messages"] + [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": follow_up}
+            ])
+            print(f"   🩹 Reparo {repairs}/{self.repair_attempts}: {message}")
+            try:
+                with self._stage("http"):
+                    content, usage = self._request_completion(data, min_animations, cancel)
+            except ValueError as e:
+                # Stream do reparo cancelado: o que os reparos anteriores gastaram vai junto
+                e.cost = repair_cost + getattr(e, "cost", 0.0)
+                e.tokens = repair_tokens + getattr(e, "tokens", 0)
+                raise
+            repair_cost += self._cost_from_usage(usage, data.get("model"))
+            repair_tokens += usage.get('total_tokens', 0)
+            self.metrics.inc("nft_repair_tokens_total", usage.get('total_tokens', 0))
+    
+    def _record_repair(self, method: str, outcome: str, tokens_saved: int):
+        """Contabiliza tokens economizados em relação a regenerar a obra do zero"""
+        self.metrics.inc("nft_repairs_total", method=method, outcome=outcome)
+        with self._stats_lock:
+            self.repair_tokens_saved += tokens_saved
+        if outcome != "ok":
+            return
+        if tokens_saved >= 0:
+            print(f"   ♻️ Reparo ({method}) economizou ~{tokens_saved} tokens vs regenerar")
+        else:
+            print(f"   ♻️ Reparo ({method}) custou ~{-tokens_saved} tokens a mais que regenerar")
+    
+    def _request_completion(self, data: Dict, min_animations: int,
+                            cancel: Optional[threading.Event] = None):
+        """Obtém (content, usage) da API ou do cache de gravação/reprodução"""
+        key = None
+        if self.response_cache:
+            key = cache_key(data)
+            if self.response_cache.replays:
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    print("   📼 Resposta reproduzida do cache")
+                    return cached
+                if self.response_cache.mode == "replay":
+                    raise CacheMiss(f"Resposta não gravada para a chave {key[:12]}")
+        
+        if self.stream_mode:
+            content, usage = self._request_streaming(data, min_animations, cancel)
+        else:
+            response_json = self._post_with_retry(data).json()
+            content = response_json['choices'][0]['message']['content']
+            usage = response_json.get('usage', {})
+        
+        if self.response_cache and self.response_cache.records:
+            self.response_cache.put(key, content, usage)
+        return content, usage
+    
+    def _request_streaming(self, data: Dict, min_animations: int,
+                           cancel: Optional[threading.Event] = None):
+        """Requisição em modo SSE; cancela assim que o SVG viola uma regra rígida (ou o hedge vence)"""
+        data = dict(data, stream=True, stream_options={"include_usage": True})
+        started = time.perf_counter()
+        try:
+            stream = consume_completion_stream(
+                self._post_with_retry(data, stream=True), min_animations, started=started,
+                expand=expand_macros if self.svg_macros else None, cancel=cancel
+            )
+        except StreamAborted as e:
+            # Contabiliza os tokens consumidos até o cancelamento: o prompt inteiro
+            # já foi cobrado, sem `usage` para dizer quanto veio do cache
+            completion_tokens = getattr(e, "completion_tokens", 0)
+            prompt_tokens = len(json.dumps(data["messages"], ensure_ascii=False)) // CHARS_PER_TOKEN
+            e.tokens = prompt_tokens + completion_tokens
+            e.cost = self.estimate_cost(e.tokens, model=data.get("model"))
+            self._add_session_cost(e.cost)
+            self.metrics.inc("nft_tokens_total", prompt_tokens, direction="in")
+            self.metrics.inc("nft_tokens_total", completion_tokens, direction="out")
+            if e.reason != "cancelled":
+                self.metrics.inc("nft_validation_failures_total", reason=e.reason)
+            print(f"   ✂️ Stream cancelado: {e}")
+            raise
+        
+        print(f"   ⚡ TTFT: {stream['ttft']:.2f}s | {stream['tokens_per_second']:.1f} tokens/s")
+        if stream["violations"]:
+            # SVG completo: a validação/reparo decide (correção local ou turno curto)
+            print(f"   ⚠️ Stream completo com defeitos: {stream['violations'][0][1]}")
+        return stream["content"], stream["usage"]
+    
     def _get_style_specific_requirements(self, style: str) -> str:
         """Requisitos específicos detalhados para cada estilo"""
         requirements = {
@@ -440,261 +951,726 @@ LEMBRE-SE: Esta arte deve ser um PORTAL VISUAL que HIPNOTIZA e TRANSCENDE. Cada
 - Profundidade através de camadas e transparências
 - Surpresas visuais que aparecem periodicamente""")
     
-    def save_nft_package(self, artwork: NFTArtwork) -> str:
-        """Salva NFT em estrutura limpa"""
-        # Cria pasta única para o NFT
-        timestamp = int(time.time())
-        folder_name = f"{artwork.rarity.lower()}_{artwork.name.replace(' ', '_')}_{timestamp}"
-        nft_path = self.nfts_dir / folder_name
-        nft_path.mkdir(exist_ok=True)
+    def save_nft_package(self, artwork: NFTArtwork,
+                         before_publish: Optional[Callable[[str, str], bool]] = None,
+                         job_id: Optional[str] = None) -> Optional[str]:
+        """
+        Salva NFT em estrutura limpa (endereçada pelo hash do SVG)
+        before_publish(digest, pasta) é chamado antes de gravar e de novo logo antes
+        do rename; se retornar False o pacote é descartado. Nesse caso a gravação
+        é síncrona, para que o retorno signifique "publicado e durável".
+        """
+        # 1. Prepara SVG (otimizado, se habilitado)
+        svg_code = artwork.svg_code
+        svg_bytes = {"original": len(svg_code.encode("utf-8"))}
+        svg_bytes["optimized"] = svg_bytes["original"]
+        if self.svg_optimizer:
+            optimization = self._run_cpu(self.svg_optimizer.optimize, svg_code)
+            if optimization.applied:
+                svg_code = optimization.svg_code
+                svg_bytes["optimized"] = optimization.optimized_bytes
+                print(f"   🗜️ SVG otimizado: {optimization.original_bytes} → "
+                      f"{optimization.optimized_bytes} bytes (-{optimization.saved_ratio:.0%})")
+            else:
+                print(f"   ⚠️ Otimização ignorada: {optimization.reason}")
+        
+        # Pasta derivada do conteúdo: SVGs idênticos nunca são gravados duas vezes
+        svg_data = svg_code.encode("utf-8")
+        digest = content_hash(svg_data)
+        folder_name = self.store.relative_folder(digest)
+        if self.store.contains(digest):
+            self.metrics.inc("nft_duplicates_total")
+            print(f"   ♻️ SVG duplicado, já salvo em: nfts/{folder_name}/")
+            return None
+        
+        # Quase-duplicata: mesma estrutura com números ou cores ligeiramente diferentes
+        near_duplicate = None
+        if self.similarity_index is not None:
+            from near_duplicates import fingerprint
+            with self._stage("near_duplicate"):
+                signature = self._run_cpu(fingerprint, svg_code)
+                near_duplicate = self.similarity_index.query(signature)
+            if near_duplicate is not None:
+                self.metrics.inc("nft_near_duplicates_total", action=self.near_duplicate_mode)
+                print(f"   🔁 Quase-duplicata de nfts/{near_duplicate.folder}/ "
+                      f"({near_duplicate.similarity:.0%} parecida)")
+                if self.near_duplicate_mode == "reject":
+                    return None
+            # Visível para as outras threads até a publicação terminar
+            self.similarity_index.reserve(folder_name, signature)
+        
+        if before_publish is not None and not before_publish(digest, folder_name):
+            print("   ⚠️ Publicação cancelada: o job não pertence mais a este worker")
+            if self.similarity_index is not None:
+                self.similarity_index.release(folder_name)
+            return None
+        
+        # 2. Cria preview.html protegido (embutido ou referenciando artwork.svg)
+        assets_prefix = None
+        if self.lean_preview:
+            assets_prefix = "../" * (folder_name.count("/") + 1) + f"{ASSETS_DIR}/"
+        preview_html = render_preview(artwork.name, artwork.style, artwork.rarity,
+                                      svg_code, assets_prefix)
+        
+        files = {
+            "artwork.svg": svg_data,
+            "preview.html": preview_html.encode("utf-8")
+        }
         
-        # 1. Salva SVG original
-        svg_file = nft_path / "artwork.svg"
-        with open(svg_file, "w", encoding="utf-8") as f:
-            f.write(artwork.svg_code)
+        # 3. Variantes pré-comprimidas para servidores estáticos (gzip -9/brotli: pool de CPU)
+        if self.precompress:
+            with self._stage("precompress"):
+                for name, data in list(files.items()):
+                    files.update(self._run_cpu(compressed_variants, name, data))
+        disk_bytes = {name: len(data) for name, data in files.items()}
         
-        # 2. Cria metadata.json
+        # 4. Cria metadata.json
         metadata = {
-            "id": hashlib.md5(f"{artwork.name}{timestamp}".encode()).hexdigest()[:8],
+            "id": new_nft_id(),
+            "content_hash": digest,
             "name": artwork.name,
             "description": artwork.description,
             "price": artwork.price,
             "rarity": artwork.rarity,
             "style": artwork.style,
-            "animation_count": artwork.attributes.get("animation_count", 10),
-            "complexity": artwork.attributes.get("complexity", 7),
-            "hypnotic_factor": artwork.attributes.get("hypnotic_factor", 8),
-            "primary_colors": artwork.attributes.get("primary_colors", []),
-            "loop_duration": artwork.attributes.get("loop_duration", 20),
-            "special_features": artwork.attributes.get("special_features", []),
+            **artwork.attributes,
+            "svg_bytes": svg_bytes,
+            "disk_bytes": disk_bytes,
             "created_at": datetime.now().isoformat(),
             "folder": folder_name
         }
+        if job_id is not None:
+            metadata["job_id"] = job_id
+        if near_duplicate is not None:
+            metadata["near_duplicate_of"] = {"folder": near_duplicate.folder,
+                                             "similarity": round(near_duplicate.similarity, 3)}
+        
+        files["metadata.json"] = json.dumps(metadata, indent=2).encode("utf-8")
+        disk_bytes["metadata.json"] = len(files["metadata.json"])
+        
+        # Comparativo com o layout antigo: SVG + preview com SVG embutido + metadata
+        # (estimado sem renderizar de novo: o preview enxuto só não traz o SVG)
+        embedded_preview = disk_bytes["preview.html"] + (len(svg_data) if self.lean_preview else 0)
+        before = disk_bytes["artwork.svg"] + embedded_preview + disk_bytes["metadata.json"]
+        print(f"   💾 Disco: {sum(disk_bytes.values())} bytes (layout anterior: {before} bytes)")
         
-        metadata_file = nft_path / "metadata.json"
-        with open(metadata_file, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2)
-        
-        # 3. Cria preview.html protegido
-        preview_html = f"""<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{artwork.name} - NFT Preview</title>
-    <style>
-        * {{ 
-            margin: 0; 
-            padding: 0; 
-            box-sizing: border-box;
-            -webkit-user-select: none;
-            -moz-user-select: none;
-            -ms-user-select: none;
-            user-select: none;
-        }}
-        
-        body {{ 
-            background: #ffffff;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            min-height: 100vh;
-            position: relative;
-        }}
-        
-        .container {{
-            width: 90vmin;
-            height: 90vmin;
-            max-width: 800px;
-            max-height: 800px;
-            position: relative;
-            background: #fff;
-            border-radius: 20px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }}
-        
-        svg {{
-            width: 100%;
-            height: 100%;
-            pointer-events: none;
-        }}
-        
-        .watermark {{
-            position: absolute;
-            bottom: 20px;
-            right: 20px;
-            background: rgba(0,0,0,0.8);
-            color: white;
-            padding: 8px 16px;
-            border-radius: 8px;
-            font-family: Arial, sans-serif;
-            font-size: 14px;
-            pointer-events: none;
-        }}
-        
-        .info {{
-            position: absolute;
-            top: 20px;
-            left: 20px;
-            background: rgba(255,255,255,0.95);
-            padding: 15px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            font-family: Arial, sans-serif;
-        }}
-        
-        .info h3 {{
-            margin: 0 0 5px 0;
-            color: #333;
-            font-size: 18px;
-        }}
-        
-        .info p {{
-            margin: 0;
-            color: #666;
-            font-size: 14px;
-        }}
-        
-        .rarity {{
-            display: inline-block;
-            padding: 3px 10px;
-            border-radius: 15px;
-            font-size: 12px;
-            font-weight: bold;
-            margin-top: 5px;
-        }}
-        
-        .rarity.common {{ background: #e5e7eb; color: #374151; }}
-        .rarity.rare {{ background: #dbeafe; color: #1e40af; }}
-        .rarity.epic {{ background: #e9d5ff; color: #6b21a8; }}
-        .rarity.legendary {{ background: #fed7aa; color: #92400e; }}
-    </style>
-</head>
-<body oncontextmenu="return false;">
-    <div class="container">
-        {artwork.svg_code}
-        <div class="watermark">PREVIEW</div>
-        <div class="info">
-            <h3>{artwork.name}</h3>
-            <p>{artwork.style}</p>
-            <span class="rarity {artwork.rarity.lower()}">{artwork.rarity}</span>
-        </div>
-    </div>
-    
-    <script>
-        // Proteções
-        document.addEventListener('contextmenu', e => e.preventDefault());
-        document.addEventListener('selectstart', e => e.preventDefault());
-        document.addEventListener('dragstart', e => e.preventDefault());
-        
-        document.addEventListener('keydown', e => {{
-            if ((e.ctrlKey || e.metaKey) && (e.key === 's' || e.key === 'S')) {{
-                e.preventDefault();
-                return false;
-            }}
-        }});
-    </script>
-</body>
-</html>"""
-        
-        preview_file = nft_path / "preview.html"
-        with open(preview_file, "w", encoding="utf-8") as f:
-            f.write(preview_html)
-        
-        print(f"   📦 Salvo em: nfts/{folder_name}/")
+        # 5. Publicação atômica (diretório temporário + rename) pelo writer
+        enqueued_at = time.monotonic()
+        package = ArtifactPackage(
+            digest=digest,
+            files=files,
+            on_published=lambda nft_path: self._on_package_published(nft_path, metadata, files,
+                                                                     enqueued_at),
+            on_duplicate=lambda nft_path: self._on_package_duplicate(folder_name),
+            on_failed=lambda error: self._on_package_failed(folder_name, error),
+            # O worker pode ter travado desde a intenção: o lease é conferido de novo
+            before_rename=(None if before_publish is None else
+                           lambda: before_publish(digest, folder_name)),
+            enqueued_at=enqueued_at
+        )
+        if self.async_writer and before_publish is None:
+            # Bloqueia apenas se a fila do writer estiver cheia (backpressure)
+            self.writer.submit(package)
+        elif self.writer.write(package) is None:
+            return None  # on_duplicate/on_failed já liberaram a reserva
         
         return folder_name
     
-    def run_generation_loop(self, count: Optional[int] = None):
+    def _on_package_published(self, nft_path: Path, metadata: Dict, files: Dict[str, bytes],
+                              enqueued_at: float):
+        """Executado quando o pacote já está publicado e durável em disco"""
+        # Fila do writer + escrita + fsync até o pacote ficar visível
+        self._report_stage("publish", time.monotonic() - enqueued_at)
+        self.metrics.inc("nft_saved_total")
+        self.metrics.inc("nft_bytes_written_total", sum(metadata["disk_bytes"].values()))
+        
+        # Atualiza o índice do catálogo (consultas sem varrer o disco)
+        self.catalog.upsert(metadata)
+        if self.similarity_index is not None:
+            self.similarity_index.commit(metadata["folder"])
+        
+        # Mesmo pacote no bundle, já em memória (sem reler a pasta)
+        if self.bundle is not None:
+            entry = self.bundle.append(metadata["id"], metadata["folder"], files)
+            if entry is not None:
+                self.metrics.inc("nft_bundle_bytes_total", entry.length)
+        
+        print(f"   📦 Salvo em: nfts/{metadata['folder']}/")
+        
+        # Thumbnails em background (não bloqueia a geração)
+        if self.postprocessor and self._thumbnails:
+            self.postprocessor.submit_thumbnails(nft_path)
+    
+    def _on_package_failed(self, folder_name: str, error: Exception):
+        """Gravação falhou (ou foi cancelada): a reserva não pode barrar obras parecidas para sempre"""
+        if self.similarity_index is not None:
+            self.similarity_index.release(folder_name)
+        if isinstance(error, PublishCancelled):
+            print("   ⚠️ Publicação cancelada: o job não pertence mais a este worker")
+            return
+        self.metrics.inc("nft_write_failures_total")
+    
+    def _on_package_duplicate(self, folder_name: str):
+        if self.similarity_index is not None:
+            self.similarity_index.release(folder_name)
+        self.metrics.inc("nft_duplicates_total")
+        print(f"   ♻️ SVG duplicado, já salvo em: nfts/{folder_name}/")
+    
+    def _print_postprocess_queue(self):
+        if self.postprocessor:
+            print(f"   🧵 Fila de pós-processamento: {self.postprocessor.queue_depth}")
+    
+    def run_generation_loop(self, count: Optional[int] = None, concurrency: int = 1):
         """Loop principal de geração"""
-        generated = 0
+        self.configure_http_pool(concurrency)
+        if concurrency > 1:
+            return self._run_concurrent_loop(count, concurrency)
+        
+        attempted = 0
+        saved = 0
+        failed = 0
         
         print("\n🚀 Iniciando geração de NFTs...")
         print("🛑 Pressione Ctrl+C para parar\n")
         
         try:
             while True:
-                if count and generated >= count:
+                if count and attempted >= count:
                     break
                 
-                self.nft_counter += 1
-                generated += 1
-                
-                # Gera NFT
-                artwork = self.generate_artwork()
+                attempted += 1
+                job_number = self.nft_counter + 1
                 
-                # Salva pacote
-                folder = self.save_nft_package(artwork)
+                try:
+                    # Gera NFT
+                    artwork = self.generate_artwork(job_number)
+                    
+                    # Salva pacote
+                    with self._stage("save"):
+                        folder = self.save_nft_package(artwork)
+                except Exception as e:
+                    # Falha isolada (mesmo após reparos): pula o job e segue a sessão
+                    failed += 1
+                    print(f"   ⚠️ Job #{job_number} falhou e foi pulado: {e}\n")
+                    folder = None
                 
-                print(f"   ⏱️ Total gerados: {self.nft_counter}")
-                print(f"   💵 Gasto acumulado: ${self.session_cost:.2f}\n")
+                if folder is not None:
+                    self.nft_counter += 1
+                    saved += 1
+                    print(f"   ⏱️ Total gerados: {self.nft_counter}")
+                    self._print_postprocess_queue()
+                    print(f"   💵 Gasto acumulado: ${self.session_cost:.2f}\n")
                 
                 # Pausa entre gerações
-                if not count or generated < count:
-                    time.sleep(3)
+                if not count or attempted < count:
+                    time.sleep(self.pause_seconds)
                     
         except KeyboardInterrupt:
             print("\n\n🛑 Geração interrompida!")
         
-        return generated
+        # Garante que os pacotes enfileirados foram publicados
+        self.writer.flush()
+        
+        if failed:
+            print(f"⚠️ Jobs com falha: {failed}")
+        
+        return saved
+    
+    def _run_concurrent_loop(self, count: Optional[int], concurrency: int) -> int:
+        """Loop concorrente: N workers gerando e um consumidor salvando"""
+        print(f"\n🚀 Iniciando geração de NFTs ({concurrency} workers)...")
+        print("🛑 Pressione Ctrl+C para parar\n")
+        
+        # Fila limitada entre geração (produtores) e save_nft_package (consumidor)
+        save_queue = queue.Queue(maxsize=concurrency * 2)
+        in_flight = threading.BoundedSemaphore(concurrency)
+        stop_event = threading.Event()
+        job_numbers = itertools.count(self.nft_counter + 1)
+        results = {"saved": 0, "failed": 0}
+        
+        def generate_job(job_number: int):
+            try:
+                artwork = self.generate_artwork(job_number)
+                save_queue.put(artwork)
+            except Exception as e:
+                # Falha isolada: os demais workers continuam
+                with self._stats_lock:
+                    results["failed"] += 1
+                print(f"   ⚠️ Job #{job_number} falhou: {e}")
+            finally:
+                in_flight.release()
+        
+        def save_worker():
+            while True:
+                artwork = save_queue.get()
+                if artwork is None:
+                    break
+                try:
+                    with self._stage("save"):
+                        folder = self.save_nft_package(artwork)
+                    if folder is None:
+                        continue
+                    with self._stats_lock:
+                        self.nft_counter += 1
+                        results["saved"] += 1
+                        total, cost = self.nft_counter, self.session_cost
+                    print(f"   ⏱️ Total gerados: {total}")
+                    self._print_postprocess_queue()
+                    print(f"   💵 Gasto acumulado: ${cost:.2f}\n")
+                except Exception as e:
+                    with self._stats_lock:
+                        results["failed"] += 1
+                    print(f"   ❌ Erro ao salvar {artwork.name}: {e}")
+        
+        saver = threading.Thread(target=save_worker, daemon=True)
+        saver.start()
+        
+        submitted = 0
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="nft-gen")
+        try:
+            while not stop_event.is_set():
+                if count and submitted >= count:
+                    break
+                # Bloqueia enquanto houver `concurrency` requisições em voo
+                in_flight.acquire()
+                executor.submit(generate_job, next(job_numbers))
+                submitted += 1
+        except KeyboardInterrupt:
+            stop_event.set()
+            print("\n\n🛑 Geração interrompida! Aguardando jobs em andamento...")
+        finally:
+            executor.shutdown(wait=True)
+            save_queue.put(None)
+            saver.join()
+            self.writer.flush()
+        
+        if results["failed"]:
+            print(f"⚠️ Jobs com falha: {results['failed']}")
+        
+        return results["saved"]
+    
+    def process_job(self, job_queue: JobQueue, job: Job, job_number: int) -> str:
+        """
+        Executa um job da fila com publicação exatamente uma vez: o hash é
+        registrado na fila antes de publicar (renovando o lease) e a conclusão
+        só vale com o lease ainda deste processo. Um job retomado com intenção
+        registrada espera a publicação do dono anterior antes de gerar outra obra.
+        """
+        started = time.perf_counter()
+        if job.result_digest:
+            if self._await_publication(job.result_digest):
+                return self._recover_published_job(job_queue, job, started)
+            print(f"   ↩️ Job {job.id}: intenção anterior nunca publicada, gerando outra obra")
+        
+        artwork = self.generate_artwork(job_number, rarity=job.rarity)
+        with self._stage("save"):
+            folder = self.save_nft_package(
+                artwork,
+                before_publish=lambda digest, folder: job_queue.record_intent(job, digest, folder),
+                job_id=str(job.id)
+            )
+        if folder is None:
+            raise ValueError("obra não publicada (duplicata, quase-duplicata ou lease perdido)")
+        if not job_queue.complete(job, artwork.tokens, artwork.cost,
+                                  time.perf_counter() - started, folder):
+            # Outro worker retomou o job e vai encontrar a publicação pelo hash
+            print(f"   ⚠️ Lease do job {job.id} expirou após publicar")
+        return folder
+    
+    def _await_publication(self, digest: str, grace: float = PUBLISH_GRACE_SECONDS) -> bool:
+        """O dono anterior pode ter perdido o lease no meio da publicação: espera o rename"""
+        deadline = time.monotonic() + grace
+        while not self.store.contains(digest):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.5)
+        return True
+    
+    def _recover_published_job(self, job_queue: JobQueue, job: Job, started: float) -> str:
+        """
+        Worker anterior publicou e morreu (ou perdeu o lease) antes de concluir:
+        refaz os passos pós-publicação (catálogo, bundle, quase-duplicatas) e conclui
+        """
+        nft_path = self.store.path_for(job.result_digest)
+        files = {child.name: child.read_bytes() for child in sorted(nft_path.iterdir())
+                 if child.is_file()}
+        metadata = json.loads(files["metadata.json"])
+        if self.similarity_index is not None:
+            from near_duplicates import fingerprint
+            self.similarity_index.reserve(metadata["folder"],
+                                          fingerprint(files["artwork.svg"].decode("utf-8")))
+        self._on_package_published(nft_path, metadata, files, time.monotonic())
+        job_queue.complete(job, 0, 0.0, time.perf_counter() - started, metadata["folder"])
+        print(f"   ↩️ Job {job.id} já publicado por outro worker: nfts/{metadata['folder']}/")
+        return metadata["folder"]
+    
+    def plan_schedule(self, targets: Optional[Dict[str, int]] = None, budget: Optional[float] = None,
+                      peak_concurrency: int = 1, window_concurrency: int = 4,
+                      tokens_per_minute: Optional[int] = None) -> CostAwareScheduler:
+        """Cria (ou retoma) a fila persistente e mostra a projeção de custo/término"""
+        job_queue = JobQueue(self.nfts_dir / "schedule.db")
+        if job_queue.recovered:
+            print(f"↩️ {job_queue.recovered} jobs interrompidos serão retomados")
+        if targets and not job_queue.plan(targets, budget):
+            print("↩️ Já existe uma fila inacabada: retomando-a (o novo mix foi ignorado)")
+        if budget is None:
+            budget = job_queue.budget
+        
+        scheduler = CostAwareScheduler(job_queue, budget, peak_concurrency,
+                                       window_concurrency, tokens_per_minute,
+                                       models=self.router.models())
+        print(format_projection(scheduler.project()))
+        return scheduler
+    
+    def run_scheduled_loop(self, scheduler: CostAwareScheduler) -> int:
+        """Loop agendado: obras caras só na janela de desconto, fila persistente e orçamento"""
+        job_queue = scheduler.queue
+        job_queue.start_heartbeat()
+        self.configure_http_pool(scheduler.max_concurrency)
+        
+        # Gasto da fila (outras sessões/workers) + o desta sessão ainda não registrado
+        recorded = {"cost": self.session_cost}
+        
+        def record_spent(job: Optional[Job] = None):
+            with self._stats_lock:
+                delta = self.session_cost - recorded["cost"]
+                recorded["cost"] = self.session_cost
+            job_queue.add_spent(delta, settle=job)  # acerta a reserva feita no claim
+        
+        def spent_now() -> float:
+            return job_queue.spent + (self.session_cost - recorded["cost"])
+        
+        done = threading.Condition()
+        state = {"in_flight": 0, "saved": 0, "failed": 0}
+        job_numbers = itertools.count(self.nft_counter + 1)
+        
+        def run_job(job, job_number: int):
+            try:
+                self.process_job(job_queue, job, job_number)
+                scheduler.refresh_estimates()
+                with self._stats_lock:
+                    self.nft_counter += 1
+                    state["saved"] += 1
+            except Exception as e:
+                outcome = job_queue.fail(job, str(e))
+                with self._stats_lock:
+                    state["failed"] += 1
+                print(f"   ⚠️ Job #{job_number} ({job.rarity}) falhou, {FAIL_OUTCOMES[outcome]}: {e}")
+            finally:
+                record_spent(job)
+                with done:
+                    state["in_flight"] -= 1
+                    done.notify_all()
+        
+        print("\n🚀 Iniciando geração agendada (Epic/Legendary só na janela de desconto)...")
+        print("🛑 Pressione Ctrl+C para pausar (a fila é retomada na próxima execução)\n")
+        
+        executor = ThreadPoolExecutor(max_workers=scheduler.max_concurrency,
+                                      thread_name_prefix="nft-sched")
+        waiting_for_window = False
+        try:
+            while True:
+                # Concorrência maior dentro da janela
+                with done:
+                    while state["in_flight"] >= scheduler.concurrency_limit():
+                        done.wait(timeout=30)
+                
+                now = time.time()
+                discounted = in_discount_window(now)
+                try:
+                    # Reserva a estimativa na fila: outros workers a veem até o gasto real entrar
+                    job = job_queue.claim(scheduler.allowed_rarities(now),
+                                          lambda rarity: scheduler.job_cost(rarity, discounted),
+                                          scheduler.budget)
+                except BudgetExceeded:
+                    with done:
+                        if state["in_flight"] or job_queue.reserved:
+                            # Estimativas dos jobs em voo podem sobrar: espera o custo real
+                            done.wait(timeout=30)
+                            continue
+                    print(f"💰 Orçamento de ${scheduler.budget:.2f} atingido "
+                          f"(gasto ${spent_now():.2f}); jobs restantes ficam na fila")
+                    break
+                if job is None:
+                    with done:
+                        if not job_queue.pending_counts():
+                            if state["in_flight"] == 0:
+                                break
+                            done.wait(timeout=30)  # falhas podem voltar para a fila
+                            continue
+                        # Só restam obras caras: espera a janela (ou um job em voo terminar)
+                        opens_at = next_window_change(now)
+                        if not waiting_for_window:
+                            waiting_for_window = True
+                            print(f"🌙 Aguardando janela de desconto "
+                                  f"({time.strftime('%H:%M UTC', time.gmtime(opens_at))})...")
+                        done.wait(timeout=min(max(opens_at - now, 1), 300))
+                    continue
+                waiting_for_window = False
+                
+                if scheduler.limiter:
+                    waited = scheduler.limiter.acquire(scheduler.job_estimate(job.rarity)[0])
+                    if waited > 1:
+                        print(f"   🚦 Limite de tokens/min: aguardou {waited:.1f}s")
+                
+                with done:
+                    state["in_flight"] += 1
+                executor.submit(run_job, job, next(job_numbers))
+        except KeyboardInterrupt:
+            print("\n\n⏸️ Agendamento pausado! Aguardando jobs em andamento...")
+        finally:
+            executor.shutdown(wait=True)
+            self.writer.flush()
+            record_spent()
+            job_queue.release_owned()
+            scheduler.refresh_estimates()
+        
+        remaining = sum(job_queue.unfinished_counts().values())
+        print(f"📋 Agendamento: {state['saved']} salvos, {state['failed']} falhas, "
+              f"{remaining} na fila, gasto ${spent_now():.2f}")
+        job_queue.close()
+        return state["saved"]
 
-def main():
-    """Função principal"""
+def print_banner():
     print("="*60)
     print("🌀 HYPNOTIC NFT SYSTEM v3.0")
     print("💎 Clean Architecture Edition")
     print("="*60)
+
+
+def print_summary(agent: HypnoticNFTAgent, total: int):
+    print(f"\n📊 RESUMO DA SESSÃO")
+    print(f"="*40)
+    print(f"NFTs gerados: {total}")
+    print(f"Custo total: ${agent.session_cost:.2f}")
+    print(f"Custo médio: ${agent.session_cost/max(total,1):.2f}")
+    print(f"Economia com cache: ${agent.cache_savings:.2f}")
+    print(f"Tokens economizados com reparos: {agent.repair_tokens_saved}")
+    if agent.hedger:
+        for rarity, row in agent.hedger.summary().items():
+            print(f"Hedge {rarity}: {row['fired']}/{row['jobs']} cópias ({row['hedge_rate']:.0%}), "
+                  f"{row['hedge_wins']} vitórias, +{row['extra_tokens']} tokens (${row['extra_cost']:.4f})")
+    routes = agent.router.format_summary()
+    if len(routes) > 1 or agent.model_routing != "fixed":
+        print("Rotas:")
+        for line in routes:
+            print(f"  {line}")
+    if agent.marketplace:
+        stats = agent.marketplace.stats()
+        print(f"Marketplace: uptime {stats['uptime_s']:.0f}s, {stats['restarts']} reinícios")
+
+
+def wait_for_shutdown():
+    """Bloqueia até Ctrl+C/SIGTERM sem acordar a cada segundo"""
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+def interactive_main() -> int:
+    """Menu interativo (sem argumentos na linha de comando)"""
+    print_banner()
     
     # Verifica configuração
     if not DEEPSEEK_API_KEY:
         print("\n❌ Configure DEEPSEEK_API_KEY no arquivo .env")
-        return
+        return 2
     
     if not os.getenv('STRIPE_SECRET_KEY'):
         print("\n⚠️ Configure STRIPE_SECRET_KEY no .env para pagamentos")
     
-    agent = HypnoticNFTAgent()
+    metrics_port = os.getenv("METRICS_PORT")
+    agent = HypnoticNFTAgent(
+        postprocess_workers=int(os.getenv("NFT_POSTPROCESS_WORKERS") or 0),
+        metrics_port=int(metrics_port) if metrics_port else None,
+        stats_file=os.getenv("NFT_STATS_FILE") or None
+    )
     
-    # Inicia marketplace automaticamente
+    # Inicia marketplace automaticamente (bloqueia só até ele responder)
     agent.start_marketplace()
-    time.sleep(2)
     
     # Menu de opções
     print("\n📋 Opções de geração:")
     print("1. Gerar continuamente (infinito)")
     print("2. Gerar quantidade específica")
     print("3. Gerar apenas 1 NFT de teste")
+    print("4. Agendar por custo (Epic/Legendary na janela de desconto)")
     
-    choice = input("\nEscolha (1-3): ").strip()
+    choice = input("\nEscolha (1-4): ").strip()
     
-    if choice == "2":
-        count = int(input("Quantos NFTs? "))
-    elif choice == "3":
-        count = 1
+    if choice == "4":
+        mix = input("Mix por raridade (ex: Common=10,Rare=5,Epic=2,Legendary=1; Enter = retomar fila): ")
+        budget = input("Orçamento em $ (Enter = sem limite): ").strip()
+        window_workers = input("Workers na janela de desconto (Enter = 4): ").strip()
+        tpm = input("Limite de tokens/min (Enter = sem limite): ").strip()
+        scheduler = agent.plan_schedule(
+            parse_targets(mix),
+            float(budget) if budget else None,
+            window_concurrency=int(window_workers) if window_workers.isdigit() else 4,
+            tokens_per_minute=int(tpm) if tpm.isdigit() else None
+        )
+        if input("Iniciar? (s/n): ").strip().lower() != "s":
+            scheduler.queue.close()
+            agent.stop_marketplace()
+            agent.close()
+            return 0
+        total = agent.run_scheduled_loop(scheduler)
     else:
-        count = None
-    
-    # Inicia geração
-    total = agent.run_generation_loop(count)
+        if choice == "2":
+            count = int(input("Quantos NFTs? "))
+        elif choice == "3":
+            count = 1
+        else:
+            count = None
+        
+        workers = input("Workers simultâneos (Enter = 1): ").strip()
+        concurrency = int(workers) if workers.isdigit() and int(workers) > 0 else 1
+        
+        # Inicia geração
+        total = agent.run_generation_loop(count, concurrency=concurrency)
     
     # Resumo final
-    print(f"\n📊 RESUMO DA SESSÃO")
-    print(f"="*40)
-    print(f"NFTs gerados: {total}")
-    print(f"Custo total: ${agent.session_cost:.2f}")
-    print(f"Custo médio: ${agent.session_cost/max(total,1):.2f}")
-    print(f"\n✨ Marketplace continua rodando em http://localhost:5000")
+    print_summary(agent, total)
+    if agent.marketplace:
+        print(f"\n✨ Marketplace continua rodando em {MARKETPLACE_URL}")
     print("💡 Use Ctrl+C para encerrar tudo")
     
-    # Mantém o programa rodando
+    # Mantém o marketplace no ar até Ctrl+C
+    wait_for_shutdown()
+    print("\n👋 Encerrando sistema...")
+    agent.stop_marketplace()
+    agent.close()
+    return 0
+
+
+def build_parser():
+    import argparse
+    from hedging import parse_budget
+    from model_router import ROUTING_MODES
+    from response_cache import CACHE_MODES
+    
+    parser = argparse.ArgumentParser(
+        description="Gera NFTs hipnóticos sem interação (cron, containers)",
+        epilog="Sem argumentos, abre o menu interativo."
+    )
+    parser.add_argument("--count", type=int, default=1,
+                        help="NFTs a gerar (0 = contínuo até Ctrl+C/SIGTERM; padrão 1)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Gerações simultâneas")
+    parser.add_argument("--output-dir", type=Path, default=None,
+                        help="Diretório dos NFTs (padrão ./nfts)")
+    parser.add_argument("--no-marketplace", action="store_true", help="Não inicia o marketplace")
+    parser.add_argument("--serve", action="store_true",
+                        help="Mantém o marketplace no ar após a geração (até Ctrl+C/SIGTERM)")
+    parser.add_argument("--schedule", metavar="MIX", default=None,
+                        help="Agendamento por custo, ex.: Common=10,Epic=2 ('' = retomar a fila)")
+    parser.add_argument("--budget", type=float, default=None, help="Orçamento do agendamento ($)")
+    parser.add_argument("--window-workers", type=int, default=4)
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    parser.add_argument("--stream", action="store_true", help="Streaming SSE com validação incremental")
+    parser.add_argument("--optimize-svg", action="store_true")
+    parser.add_argument("--svg-precision", type=int, default=3,
+                        help="Casas decimais do --optimize-svg (algarismos significativos "
+                             "em números pequenos)")
+    parser.add_argument("--postprocess-workers", type=int,
+                        default=int(os.getenv("NFT_POSTPROCESS_WORKERS") or 0),
+                        help="Processos para thumbnails e etapas de CPU (0 = desligado)")
+    parser.add_argument("--svg-macros", action="store_true",
+                        help="Modelo escreve macros SVG compactas, expandidas localmente")
+    parser.add_argument("--lean-preview", action="store_true")
+    parser.add_argument("--near-duplicates", choices=("off", "flag", "reject"), default="off",
+                        help="Quase-duplicatas estruturais: marcar no metadata ou rejeitar")
+    parser.add_argument("--similarity-threshold", type=float, default=None,
+                        help="Similaridade mínima (Jaccard estimado) para quase-duplicata")
+    parser.add_argument("--model-routing", choices=ROUTING_MODES, default="fixed",
+                        help="fixed = reasoner em tudo; rarity = modelo/max_tokens/temperatura por raridade")
+    parser.add_argument("--routes", type=Path, default=None, metavar="JSON",
+                        help='Ajustes da tabela de rotas, ex.: {"Rare": {"model": "deepseek-reasoner"}}')
+    parser.add_argument("--no-route-fallback", action="store_true",
+                        help="Não repete no reasoner os jobs reprovados no modelo mais barato")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Dispara uma cópia da requisição quando passa do percentil de latência recente")
+    parser.add_argument("--hedge-percentile", type=float, default=DEFAULT_PERCENTILE * 100)
+    parser.add_argument("--hedge-budget", type=parse_budget, default=None, metavar="MIX",
+                        help="Fração dos jobs com cópia por raridade, ex.: Legendary=0.2,Epic=0.1")
+    parser.add_argument("--bundle", action="store_true",
+                        help="Acrescenta cada NFT publicado a nfts/collection.bundle (mmap, offsets por id)")
+    parser.add_argument("--cache", choices=CACHE_MODES, default="off",
+                        help="Cache de respostas (gravação/reprodução)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--metrics-port", type=int,
+                        default=int(os.environ["METRICS_PORT"]) if os.getenv("METRICS_PORT") else None)
+    parser.add_argument("--stats-file", type=Path, default=os.getenv("NFT_STATS_FILE") or None)
+    return parser
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_headless(args) -> int:
+    """Execução não interativa; código de saída 0 só se todos os NFTs pedidos foram salvos"""
+    import signal
+    
+    if not DEEPSEEK_API_KEY:
+        print("❌ Configure DEEPSEEK_API_KEY no ambiente ou no .env")
+        return 2
+    
+    # SIGTERM (docker stop, kill) pausa como Ctrl+C: jobs em andamento terminam
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    
+    agent = HypnoticNFTAgent(
+        stream=args.stream, optimize_svg=args.optimize_svg, svg_precision=args.svg_precision,
+        postprocess_workers=args.postprocess_workers, lean_preview=args.lean_preview,
+        svg_macros=args.svg_macros, near_duplicates=args.near_duplicates,
+        similarity_threshold=args.similarity_threshold, model_routing=args.model_routing,
+        route_fallback=not args.no_route_fallback, routes_file=args.routes,
+        hedge=args.hedge, hedge_percentile=args.hedge_percentile / 100,
+        hedge_budget=args.hedge_budget, bundle=args.bundle,
+        cache_mode=args.cache, seed=args.seed, metrics_port=args.metrics_port,
+        stats_file=args.stats_file, nfts_dir=args.output_dir
+    )
+    agent.pause_seconds = 0  # sem pausa cosmética entre gerações
+    if not args.no_marketplace:
+        agent.start_marketplace()
+    
     try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\n👋 Encerrando sistema...")
-        if agent.marketplace_process:
-            agent.marketplace_process.terminate()
+        if args.schedule is not None:
+            scheduler = agent.plan_schedule(parse_targets(args.schedule), args.budget,
+                                            peak_concurrency=args.concurrency,
+                                            window_concurrency=args.window_workers,
+                                            tokens_per_minute=args.tokens_per_minute)
+            total = agent.run_scheduled_loop(scheduler)
+            job_queue = JobQueue(agent.nfts_dir / "schedule.db")
+            complete = not job_queue.unfinished_counts()  # pausas/orçamento deixam jobs na fila
+            job_queue.close()
+        else:
+            total = agent.run_generation_loop(args.count or None, concurrency=args.concurrency)
+            complete = not args.count or total >= args.count
+        
+        print_summary(agent, total)
+        if args.serve and agent.marketplace:
+            print(f"\n✨ Marketplace rodando em {MARKETPLACE_URL} (Ctrl+C encerra)")
+            wait_for_shutdown()
+    finally:
+        agent.stop_marketplace()
+        agent.close()
+    return 0 if complete else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Função principal"""
+    argv = sys.argv[1:] if argv is None else argv
+    load_environment()
+    if not argv:
+        return interactive_main()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.hedge and not args.stream:
+        # Sem SSE a cópia perdedora não pode ser cancelada: seria paga por inteiro
+        parser.error("--hedge requer --stream")
+    return run_headless(args)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
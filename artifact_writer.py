@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Gravação assíncrona, atômica e em lote dos pacotes NFT
+Cada pacote é escrito num diretório temporário e publicado com um único rename;
+os fsyncs são agrupados entre vários pacotes
+"""
+
+import os
+import time
+import queue
+import shutil
+import uuid
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from nft_store import ContentStore
+
+STALE_TMP_SECONDS = 3600
+
+# Marcador de flush(): fecha o lote atual sem esperar batch_wait
+_FLUSH = object()
+
+
+class PublishCancelled(Exception):
+    """before_rename recusou a publicação (ex.: o lease do job já não é deste worker)"""
+
+
+@dataclass
+class ArtifactPackage:
+    """Pacote completo em memória, pronto para publicar"""
+    digest: str
+    files: Dict[str, bytes]
+    on_published: Optional[Callable[[Path], None]] = None
+    on_duplicate: Optional[Callable[[Path], None]] = None
+    on_failed: Optional[Callable[[Exception], None]] = None
+    # Conferida imediatamente antes do rename; False descarta o pacote já gravado
+    before_rename: Optional[Callable[[], bool]] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        return sum(len(data) for data in self.files.values())
+
+
+class ArtifactWriter:
+    """
+    Estágio dedicado de escrita. submit() bloqueia quando a fila está cheia
+    (backpressure), então a memória não cresce se o disco estiver lento.
+    """
+
+    def __init__(self, store: ContentStore, max_queue: int = 32, batch_size: int = 8,
+                 batch_wait: float = 0.2, fsync: bool = True):
+        self.store = store
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.fsync = fsync
+        self.tmp_root = store.root / ".tmp"
+        self.tmp_root.mkdir(parents=True, exist_ok=True)
+        self._cleanup_stale_tmp()
+
+        self._queue: "queue.Queue[Optional[ArtifactPackage]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.batches = 0
+        self.bytes_written = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"queue_depth": self.queue_depth, "written": self.written,
+                    "duplicates": self.duplicates, "failed": self.failed,
+                    "cancelled": self.cancelled, "batches": self.batches, "bytes_written": self.bytes_written}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="nft-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, package: ArtifactPackage):
+        """Enfileira o pacote (bloqueia se a fila estiver cheia)"""
+        self.start()
+        self._queue.put(package)
+
+    def write(self, package: ArtifactPackage) -> Optional[Path]:
+        """Escrita síncrona com a mesma garantia de atomicidade"""
+        return self._write_batch([package])[0]
+
+    def flush(self):
+        """Aguarda até que todos os pacotes enfileirados estejam publicados"""
+        if self._thread is not None:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+
+    def close(self):
+        """Drena a fila e encerra a thread de escrita"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            package = self._queue.get()
+            if package is None:
+                self._queue.task_done()
+                return
+            if package is _FLUSH:
+                self._queue.task_done()
+                continue
+            batch = [package]
+            markers = 0
+            stop = False
+
+            # Agrupa pacotes que chegarem logo em seguida
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    package = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if package is None:
+                    stop = True
+                    break
+                if package is _FLUSH:
+                    markers += 1  # alguém espera: grava o que já chegou
+                    break
+                batch.append(package)
+
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in range(len(batch) + markers + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[ArtifactPackage]) -> List[Optional[Path]]:
+        results: List[Optional[Path]] = [None] * len(batch)
+        settled = [False] * len(batch)  # já publicado, duplicado ou com falha reportada
+        staged = []
+        try:
+            # 1. Escreve todos os pacotes em diretórios temporários
+            for i, package in enumerate(batch):
+                tmp_dir = self.tmp_root / f"{os.getpid()}-{uuid.uuid4().hex}"
+                fds: List[int] = []
+                try:
+                    tmp_dir.mkdir()
+                    for name, data in package.files.items():
+                        fds.append(os.open(tmp_dir / name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+                        _write_all(fds[-1], data)
+                except OSError as e:
+                    _close_all(fds)
+                    self._fail(package, tmp_dir, e)
+                    settled[i] = True
+                    continue
+                staged.append((i, package, tmp_dir, fds))
+
+            # 2. Um único ciclo de fsync para o lote inteiro
+            synced = []
+            for i, package, tmp_dir, fds in staged:
+                try:
+                    if self.fsync:
+                        for fd in fds:
+                            os.fsync(fd)
+                        _fsync_dir(tmp_dir)
+                except OSError as e:
+                    self._fail(package, tmp_dir, e)
+                    settled[i] = True
+                    continue
+                finally:
+                    _close_all(fds)
+                synced.append((i, package, tmp_dir))
+
+            # 3. Publica cada pacote com um rename atômico
+            parents = set()
+            published = []
+            for i, package, tmp_dir in synced:
+                if package.before_rename is not None and not _allowed(package):
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    settled[i] = True
+                    with self._lock:
+                        self.cancelled += 1
+                    _callback(package.on_failed,
+                              PublishCancelled(f"publicação de {package.digest[:12]} cancelada"),
+                              f"cancelamento de {package.digest[:12]}")
+                    continue
+                try:
+                    final = self.store.publish(tmp_dir, package.digest)
+                except OSError as e:
+                    self._fail(package, tmp_dir, e)
+                    settled[i] = True
+                    continue
+                settled[i] = True
+                if final is None:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    with self._lock:
+                        self.duplicates += 1
+                    _callback(package.on_duplicate, self.store.path_for(package.digest),
+                              f"duplicata {package.digest[:12]}")
+                    continue
+                parents.add(final.parent)
+                published.append((package, final))
+                results[i] = final
+
+            if self.fsync:
+                for parent in parents:
+                    _fsync_dir(parent)
+
+            with self._lock:
+                self.batches += 1
+                self.written += len(published)
+                self.bytes_written += sum(p.size for p, _ in published)
+
+            # 4. Callbacks só depois que o pacote está durável e visível
+            for package, final in published:
+                _callback(package.on_published, final, f"pós-publicação em {final.name}")
+        except Exception as e:
+            # Erro inesperado: quem ainda não teve desfecho recebe a falha,
+            # e a thread de escrita continua viva para os próximos lotes
+            for i, package in enumerate(batch):
+                if not settled[i]:
+                    self._fail(package, None, e)
+        finally:
+            for _, _, _, fds in staged:
+                _close_all(fds)
+
+        return results
+
+    def _fail(self, package: ArtifactPackage, tmp_dir: Optional[Path], error: Exception):
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        with self._lock:
+            self.failed += 1
+        print(f"   ❌ Erro ao gravar pacote {package.digest[:12]}: {error}")
+        _callback(package.on_failed, error, f"falha de {package.digest[:12]}")
+
+    def _cleanup_stale_tmp(self):
+        """Remove restos de execuções interrompidas (crash, Ctrl+C)"""
+        now = time.time()
+        for entry in self.tmp_root.iterdir():
+            try:
+                if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                    shutil.rmtree(entry, ignore_errors=True)
+            except OSError:
+                continue
+
+
+def _callback(fn: Optional[Callable], arg, context: str):
+    """Erro num callback não derruba a thread de escrita"""
+    if fn is None:
+        return
+    try:
+        fn(arg)
+    except Exception as e:
+        print(f"   ⚠️ Erro no callback ({context}): {e}")
+
+
+def _allowed(package: ArtifactPackage) -> bool:
+    """before_rename com erro (ex.: fila SQLite indisponível) conta como recusa"""
+    try:
+        return bool(package.before_rename())
+    except Exception as e:
+        print(f"   ⚠️ Erro ao confirmar a publicação de {package.digest[:12]}: {e}")
+        return False
+
+
+def _close_all(fds: List[int]):
+    while fds:
+        try:
+            os.close(fds.pop())
+        except OSError:
+            pass
+
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Benchmark: layout de pastas (nfts/ab/cd/<hash>/) vs bundle único com índice
+
+Gera N pacotes sintéticos (SVG da cena "rich", preview.html, metadata.json e,
+com --precompress, as variantes .gz), empacota com o export e mede:
+arquivos/espaço em disco, varredura completa, acesso aleatório a artwork.svg,
+custo de um append incremental (com fsync) e a volta ao layout de pastas.
+Com permissão para /proc/sys/vm/drop_caches também mede com cache frio.
+
+Uso: python benchmarks/bench_bundle.py [--count 20000] [--precompress] [--output resultado.json]
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_e2e import git_revision, summarize
+from fake_deepseek import make_rich_svg
+from nft_bundle import BUNDLE_NAME, CollectionBundle, export, read_folder, unpack
+from nft_store import ContentStore, content_hash, new_nft_id
+from preview import compressed_variants, render_preview
+
+RARITIES = ("Common", "Rare", "Epic", "Legendary")
+
+
+def make_package(salt: int, precompress: bool) -> Tuple[str, Dict[str, bytes]]:
+    rng = random.Random(salt)
+    rarity = rng.choice(RARITIES)
+    svg = make_rich_svg(rng.choice((6, 10, 15, 20)), rng.randint(0, 12), salt)
+    svg_data = svg.encode("utf-8")
+    name = f"Hypnotic #{salt}"
+    files = {"artwork.svg": svg_data,
+             "preview.html": render_preview(name, "psychedelic", rarity, svg).encode("utf-8")}
+    if precompress:
+        for file_name, data in list(files.items()):
+            files.update(compressed_variants(file_name, data))
+    digest = content_hash(svg_data)
+    metadata = {"id": new_nft_id(), "content_hash": digest, "name": name, "rarity": rarity,
+                "style": "psychedelic", "disk_bytes": {k: len(v) for k, v in files.items()}}
+    files["metadata.json"] = json.dumps(metadata, indent=2).encode("utf-8")
+    return digest, files
+
+
+def populate(store: ContentStore, count: int, precompress: bool) -> List[str]:
+    """Grava as pastas direto (sem fsync): aqui só interessa o layout final"""
+    folders = []
+    for salt in range(count):
+        digest, files = make_package(salt, precompress)
+        if store.contains(digest):
+            continue
+        path = store.path_for(digest)
+        path.mkdir(parents=True)
+        for name, data in files.items():
+            (path / name).write_bytes(data)
+        folders.append(store.relative_folder(digest))
+    return folders
+
+
+def disk_usage(paths: List[Path]) -> Dict:
+    """Arquivos, diretórios e bytes alocados (blocos), não só o tamanho lógico"""
+    files = dirs = logical = allocated = 0
+    for root in paths:
+        if root.is_file():
+            st = root.stat()
+            files += 1
+            logical += st.st_size
+            allocated += st.st_blocks * 512
+            continue
+        for current, subdirs, names in os.walk(root):
+            dirs += 1
+            allocated += os.stat(current).st_blocks * 512
+            for name in names:
+                st = os.stat(os.path.join(current, name))
+                files += 1
+                logical += st.st_size
+                allocated += st.st_blocks * 512
+    return {"files": files, "dirs": dirs, "logical_mb": round(logical / 1e6, 2),
+            "allocated_mb": round(allocated / 1e6, 2)}
+
+
+def drop_caches() -> bool:
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def timed(fn: Callable[[], int], cold: bool) -> Optional[Dict]:
+    if cold and not drop_caches():
+        return None
+    started = time.perf_counter()
+    checksum = fn()
+    return {"seconds": round(time.perf_counter() - started, 3), "checksum": checksum}
+
+
+def scan_folders(nfts_dir: Path) -> int:
+    """Varredura como o backup/rsync vê: lista os shards e lê todos os arquivos"""
+    total = 0  # soma dos crc32: não depende da ordem, confere com a do bundle
+    for path in ContentStore(nfts_dir).iter_folders():
+        for child in path.iterdir():
+            with open(child, "rb") as f:
+                total += zlib.crc32(f.read())
+    return total
+
+
+def scan_bundle(bundle_path: Path) -> int:
+    bundle = CollectionBundle(bundle_path)
+    total = 0
+    for _, files in bundle.iter_packages():
+        for data in files.values():
+            total += zlib.crc32(data)
+    bundle.close()
+    return total
+
+
+def random_access(read: Callable[[str], bytes], keys: List[str]) -> List[float]:
+    durations = []
+    for key in keys:
+        started = time.perf_counter()
+        zlib.crc32(read(key))  # toca os bytes, como o envio ao cliente faria
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def read_folder_file(nfts_dir: Path) -> Callable[[str], bytes]:
+    def read(folder: str) -> bytes:
+        with open(nfts_dir / folder / "artwork.svg", "rb") as f:
+            return f.read()
+    return read
+
+
+def measure_random(nfts_dir: Path, bundle_path: Path, keys: List[str], cold: bool) -> Optional[Dict]:
+    if cold and not drop_caches():
+        return None
+    folder = summarize(random_access(read_folder_file(nfts_dir), keys))
+    if cold and not drop_caches():
+        return None
+    started = time.perf_counter()
+    bundle = CollectionBundle(bundle_path)
+    opened = time.perf_counter() - started
+    result = {"folders": folder,
+              "bundle": summarize(random_access(lambda key: bundle.read(key, "artwork.svg"), keys)),
+              "bundle_open_ms": round(opened * 1000, 2)}
+    bundle.close()
+    return result
+
+
+def measure_appends(bundle_path: Path, count: int, precompress: bool) -> Dict:
+    """Custo do append incremental feito a cada save_nft_package (com fsync)"""
+    bundle = CollectionBundle(bundle_path)
+    store = ContentStore(bundle_path.parent)
+    durations = []
+    for salt in range(10 ** 7, 10 ** 7 + count):
+        digest, files = make_package(salt, precompress)
+        nft_id = json.loads(files["metadata.json"])["id"]
+        started = time.perf_counter()
+        bundle.append(nft_id, store.relative_folder(digest), files)
+        durations.append(time.perf_counter() - started)
+    bundle.close()
+    return summarize(durations)
+
+
+def round_trip(nfts_dir: Path, bundle_path: Path, dest: Path) -> Dict:
+    bundle = CollectionBundle(bundle_path)
+    started = time.perf_counter()
+    created, _ = unpack(bundle, dest)
+    seconds = time.perf_counter() - started
+    mismatches = missing = 0
+    for path in ContentStore(nfts_dir).iter_folders():
+        restored = dest / path.relative_to(nfts_dir)
+        original = read_folder(path)
+        if not restored.is_dir():
+            missing += 1
+        elif read_folder(restored) != original:
+            mismatches += 1
+    problems = len(bundle.verify())
+    bundle.close()
+    return {"folders_restored": created, "unpack_s": round(seconds, 3), "missing": missing,
+            "mismatches": mismatches, "crc_problems": problems}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--reads", type=int, default=5000, help="Leituras aleatórias de artwork.svg")
+    parser.add_argument("--appends", type=int, default=200)
+    parser.add_argument("--precompress", action="store_true", help="Inclui as variantes .gz")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="nft_bundle_"))
+    try:
+        nfts_dir = workdir / "nfts"
+        bundle_dir = workdir / "bundle"
+        bundle_dir.mkdir()
+        bundle_path = bundle_dir / BUNDLE_NAME
+
+        started = time.perf_counter()
+        folders = populate(ContentStore(nfts_dir), args.count, args.precompress)
+        populate_s = time.perf_counter() - started
+
+        bundle = CollectionBundle(bundle_path)
+        started = time.perf_counter()
+        added, _ = export(nfts_dir, bundle)
+        export_s = time.perf_counter() - started
+        bundle.close()
+
+        keys = random.Random(5).choices(folders, k=args.reads)
+        scans, reads = {}, {}
+        for cache in ("warm", "cold"):
+            cold = cache == "cold"
+            if not cold:  # aquece o cache de páginas das duas representações
+                scan_folders(nfts_dir)
+                scan_bundle(bundle_path)
+            scans[cache] = {"folders": timed(lambda: scan_folders(nfts_dir), cold),
+                            "bundle": timed(lambda: scan_bundle(bundle_path), cold)}
+            reads[cache] = measure_random(nfts_dir, bundle_path, keys, cold)
+
+        result = {
+            "benchmark": "bundle",
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "params": {"count": args.count, "packages": len(folders), "reads": args.reads,
+                       "precompress": args.precompress},
+            "populate_s": round(populate_s, 2),
+            "export": {"packages": added, "seconds": round(export_s, 3)},
+            "disk": {"folders": disk_usage([nfts_dir]),
+                     "bundle": disk_usage([bundle_path, bundle_path.with_name(BUNDLE_NAME + ".idx")])},
+            "full_scan": scans,
+            "random_access": reads,
+            "round_trip": round_trip(nfts_dir, bundle_path, workdir / "restored"),
+            "append": measure_appends(bundle_path, args.appends, args.precompress),
+        }
+        for cache, pair in scans.items():
+            if pair["folders"] and pair["bundle"]:
+                pair["speedup"] = round(pair["folders"]["seconds"] / pair["bundle"]["seconds"], 1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
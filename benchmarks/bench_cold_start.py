@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark de partida a frio do CLI headless
+
+Mede, em processos novos: o tempo de `import agent`, o tempo do início do
+processo até a primeira requisição chegar ao DeepSeek falso e até o processo
+terminar (`agent.py --count 1 --no-marketplace`). Também confere que o import
+não cria arquivos nem diretórios.
+
+Uso: python benchmarks/bench_cold_start.py [--runs 10] [--output resultado.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_e2e import git_revision, summarize
+from fake_deepseek import FakeConfig, FakeDeepSeekServer
+
+IMPORT_SNIPPET = ("import time; t = time.perf_counter(); import agent; "
+                  "print(time.perf_counter() - t)")
+
+
+def measure_import(runs: int, env: Dict[str, str]) -> Dict:
+    """Tempo de `import agent` e se o import deixou algo no diretório atual"""
+    samples: List[float] = []
+    side_effects: List[str] = []
+    for _ in range(runs):
+        workdir = Path(tempfile.mkdtemp(prefix="nft_import_"))
+        try:
+            output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=workdir,
+                                    env=env, capture_output=True, text=True, check=True).stdout
+            samples.append(float(output.strip().splitlines()[-1]))
+            side_effects.extend(p.name for p in workdir.iterdir())
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {"import": summarize(samples), "side_effect_free": not side_effects,
+            "created": sorted(set(side_effects))}
+
+
+def import_offenders(env: Dict[str, str], top: int) -> List[Dict]:
+    """Imports diretos do agente com maior tempo acumulado (python -X importtime)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import agent"],
+                            env=env, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # cabeçalho
+        indent = len(name) - len(name.lstrip()) - 1
+        entries.append((indent, name.strip(), int(cumulative) / 1000))
+
+    # importtime lista os filhos antes do pai: os imports diretos precedem a linha do agente
+    agent_index = max(i for i, (indent, name, _) in enumerate(entries)
+                      if indent == 0 and name == "agent")
+    children = []
+    for indent, name, cumulative_ms in reversed(entries[:agent_index]):
+        if indent == 0:
+            break
+        if indent == 2:
+            children.append({"module": name, "cumulative_ms": round(cumulative_ms, 2)})
+    children.sort(key=lambda c: c["cumulative_ms"], reverse=True)
+    return [{"module": "agent", "cumulative_ms": round(entries[agent_index][2], 2)}] + children[:top]
+
+
+def measure_first_request(runs: int, env: Dict[str, str]) -> Dict:
+    """Do Popen até a 1ª requisição no servidor falso, e até o processo terminar"""
+    first_request: List[float] = []
+    total: List[float] = []
+    with FakeDeepSeekServer(FakeConfig(latency=0.0)) as server:
+        env = dict(env, DEEPSEEK_API_URL=server.url, DEEPSEEK_API_KEY="bench")
+        for _ in range(runs):
+            workdir = Path(tempfile.mkdtemp(prefix="nft_cold_"))
+            try:
+                seen = server.fake.counts["requests"]
+                started = time.perf_counter()
+                process = subprocess.Popen(
+                    [sys.executable, str(REPO_ROOT / "agent.py"), "--count", "1",
+                     "--no-marketplace", "--output-dir", str(workdir / "nfts")],
+                    cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                while server.fake.counts["requests"] == seen and process.poll() is None:
+                    time.sleep(0.0005)
+                first_request.append(time.perf_counter() - started)
+                _, stderr = process.communicate()
+                total.append(time.perf_counter() - started)
+                if process.returncode != 0:
+                    raise RuntimeError(f"agent.py saiu com {process.returncode}: {stderr[-500:]}")
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return {"first_request": summarize(first_request), "total": summarize(total)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Módulos mais caros no import")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), PYTHONDONTWRITEBYTECODE="1")
+    env.pop("DEEPSEEK_API_KEY", None)
+
+    # Baseline do interpretador: o que não depende do agente
+    interpreter = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+        interpreter.append(time.perf_counter() - started)
+
+    result = {
+        "benchmark": "cold_start",
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "interpreter": summarize(interpreter),
+        **measure_import(args.runs, env),
+        "import_offenders": import_offenders(env, args.top),
+        **measure_first_request(args.runs, env),
+    }
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    return 0 if result["side_effect_free"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Benchmark ponta a ponta: HypnoticNFTAgent contra um DeepSeek falso local
+
+Mede throughput, p50/p95/p99 por etapa (prompt_build, http, json_parse,
+validation, save, publish), pico de RSS e bytes gravados. Resultado em JSON
+para comparar commits: --output atual.json --baseline anterior.json
+
+Uso: python benchmarks/bench_e2e.py [--count 200] [--concurrency 4] [--stream]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import tempfile
+import threading
+import subprocess
+import contextlib
+from pathlib import Path
+from dataclasses import asdict
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import agent
+from fake_deepseek import FakeDeepSeekServer, add_config_arguments, config_from_args
+
+# Métricas comparadas com o baseline: (chave, maior é melhor)
+COMPARED = [("throughput_nfts_per_s", True), ("peak_rss_mb", False)]
+COMPARED_PERCENTILES = ("p50_ms", "p95_ms", "p99_ms")
+TOLERANCE = 0.05  # variação considerada ruído
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil com interpolação linear (valores já ordenados)"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def summarize(samples: List[float]) -> Dict:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB, macOS reporta bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(rss / divisor, 1)
+
+
+def directory_bytes(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def git_revision() -> Dict:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def run_benchmark(args: argparse.Namespace, workdir: Path) -> Dict:
+    samples: Dict[str, List[float]] = defaultdict(list)
+    samples_lock = threading.Lock()
+
+    def observe(stage: str, seconds: float):
+        with samples_lock:
+            samples[stage].append(seconds)
+
+    with FakeDeepSeekServer(config_from_args(args)) as server:
+        agent.DEEPSEEK_API_URL = server.url
+        agent.DEEPSEEK_API_KEY = "bench"
+
+        previous_cwd = os.getcwd()
+        os.chdir(workdir)  # o agente grava em ./nfts
+        output = open(os.devnull, "w") if not args.verbose else sys.stdout
+        error = None
+        try:
+            with contextlib.redirect_stdout(output):
+                nft_agent = agent.HypnoticNFTAgent(
+                    backoff_base=args.backoff_base, stream=args.stream,
+                    optimize_svg=args.optimize_svg, lean_preview=args.lean_preview,
+                    svg_macros=args.svg_macros,
+                    precompress=not args.no_precompress, async_writer=not args.sync_writer,
+                    seed=args.seed
+                )
+                nft_agent.stage_observer = observe
+                nft_agent.pause_seconds = 0
+
+                started = time.perf_counter()
+                try:
+                    saved = nft_agent.run_generation_loop(args.count, args.concurrency)
+                except Exception as e:
+                    # Loop sequencial interrompe na primeira falha
+                    saved, error = nft_agent.nft_counter, f"{type(e).__name__}: {e}"
+                    nft_agent.writer.flush()
+                elapsed = time.perf_counter() - started
+
+                writer_stats = nft_agent.writer.stats()
+                session_cost = nft_agent.session_cost
+                nft_agent.close()
+        finally:
+            os.chdir(previous_cwd)
+            if output is not sys.stdout:
+                output.close()
+        server_counts = dict(server.fake.counts)
+
+    return {
+        "benchmark": "e2e",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "params": {
+            "count": args.count, "concurrency": args.concurrency, "stream": args.stream,
+            "optimize_svg": args.optimize_svg, "lean_preview": args.lean_preview,
+            "svg_macros": args.svg_macros,
+            "precompress": not args.no_precompress, "async_writer": not args.sync_writer,
+            "backoff_base": args.backoff_base, "seed": args.seed,
+            "server": asdict(config_from_args(args)),
+        },
+        "saved": saved,
+        "aborted": error,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_nfts_per_s": round(saved / elapsed, 3) if elapsed else 0.0,
+        "stages": {stage: summarize(values) for stage, values in sorted(samples.items())},
+        "peak_rss_mb": peak_rss_mb(),
+        "bytes_written": writer_stats["bytes_written"],
+        "disk_bytes": directory_bytes(workdir / "nfts"),
+        "writer": writer_stats,
+        "server": server_counts,
+        "session_cost": round(session_cost, 4),
+    }
+
+
+def compare(current: Dict, baseline: Dict) -> List[str]:
+    """Linhas com a variação de cada métrica em relação ao baseline"""
+    lines = []
+
+    def line(label: str, now: float, before: float, higher_is_better: bool):
+        if not before:
+            return
+        change = (now - before) / before
+        better = change > 0 if higher_is_better else change < 0
+        mark = "✅" if better or abs(change) < TOLERANCE else "⚠️"
+        lines.append(f"{mark} {label}: {before} → {now} ({change:+.1%})")
+
+    for key, higher_is_better in COMPARED:
+        line(key, current.get(key, 0), baseline.get(key, 0), higher_is_better)
+
+    for stage, stats in current["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        for key in COMPARED_PERCENTILES:
+            line(f"{stage}.{key}", stats[key], previous.get(key, 0), False)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--optimize-svg", action="store_true")
+    parser.add_argument("--svg-macros", action="store_true")
+    parser.add_argument("--lean-preview", action="store_true")
+    parser.add_argument("--no-precompress", action="store_true")
+    parser.add_argument("--sync-writer", action="store_true")
+    parser.add_argument("--backoff-base", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dir", type=Path, default=None, help="Mantém os NFTs gerados neste diretório")
+    parser.add_argument("--output", type=Path, default=None, help="Grava o resultado JSON")
+    parser.add_argument("--baseline", type=Path, default=None, help="JSON de um commit anterior")
+    parser.add_argument("--verbose", action="store_true", help="Mostra a saída do agente")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = args.dir or Path(tempfile.mkdtemp(prefix="nft_e2e_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        result = run_benchmark(args, workdir.resolve())
+    finally:
+        if args.dir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print(f"\n📊 Comparação com {baseline.get('git', {}).get('commit', '?')}:", file=sys.stderr)
+        for line in compare(result, baseline):
+            print(f"   {line}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cauda de latência com e sem hedging (--hedge), jobs caros em sequência
+
+O servidor falso deixa uma fração das respostas várias vezes mais lenta
+(--tail-rate/--tail-slowdown). Mede p50/p95/p99/máximo por raridade, taxa de
+cópias, vitórias da cópia e tokens extras gastos pelas tentativas perdedoras.
+
+Sempre com streaming: sem SSE a cópia perdedora não pode ser cancelada (o agente recusa).
+
+Uso: python benchmarks/bench_hedging.py [--jobs 60] [--output resultado.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from dataclasses import asdict
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import agent
+from bench_e2e import git_revision, summarize
+from fake_deepseek import FakeConfig, FakeDeepSeekServer
+from hedging import parse_budget
+
+MODES = {"off": False, "hedge": True}
+RARITIES = ("Epic", "Legendary")
+
+
+def run_mode(hedge: bool, rarities: Tuple[str, ...], jobs: int, config: FakeConfig,
+             percentile: float, budget: Dict[str, float], workdir: Path) -> Dict:
+    latencies: Dict[str, List[float]] = {rarity: [] for rarity in rarities}
+    with FakeDeepSeekServer(config) as server:
+        agent.DEEPSEEK_API_URL = server.url
+        agent.DEEPSEEK_API_KEY = "bench"
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            nft_agent = agent.HypnoticNFTAgent(hedge=hedge, hedge_percentile=percentile,
+                                               hedge_budget=budget, stream=True,
+                                               async_writer=False, seed=1, nfts_dir=workdir / "nfts")
+            metrics = nft_agent.metrics
+            try:
+                for i in range(jobs):
+                    rarity = rarities[i % len(rarities)]
+                    started = time.perf_counter()
+                    nft_agent.generate_artwork(rarity=rarity)
+                    latencies[rarity].append(time.perf_counter() - started)
+                time.sleep(0.5)  # perdedores cancelados terminam de contabilizar
+            finally:
+                nft_agent.close()
+    out_tokens = metrics.value("nft_tokens_total", direction="out")
+    return {
+        "by_rarity": {rarity: summarize(samples) for rarity, samples in latencies.items()},
+        "all": summarize([s for samples in latencies.values() for s in samples]),
+        "session_cost": round(nft_agent.session_cost, 5),
+        "output_tokens": int(out_tokens),
+        "hedges": nft_agent.hedger.summary() if nft_agent.hedger else {},
+        "server": dict(server.fake.counts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência do DeepSeek falso")
+    parser.add_argument("--tokens-per-second", type=float, default=8000.0)
+    parser.add_argument("--reasoning-tokens", type=int, default=1500)
+    parser.add_argument("--tail-rate", type=float, default=0.08)
+    parser.add_argument("--tail-slowdown", type=float, default=8.0)
+    parser.add_argument("--percentile", type=float, default=90.0)
+    parser.add_argument("--budget", type=parse_budget, default=None, metavar="MIX",
+                        help="Fração de jobs com cópia, ex.: Legendary=0.2,Epic=0.1")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    config = FakeConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                        reasoning_tokens=args.reasoning_tokens, tail_rate=args.tail_rate,
+                        tail_slowdown=args.tail_slowdown, scene="rich", seed=7)
+    budget = args.budget or parse_budget("")
+
+    modes = {}
+    for mode, hedge in MODES.items():
+        workdir = Path(tempfile.mkdtemp(prefix=f"nft_hedge_{mode}_"))
+        try:
+            modes[mode] = run_mode(hedge, RARITIES, args.jobs, config,
+                                   args.percentile / 100, budget, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    off, on = modes["off"]["all"], modes["hedge"]["all"]
+    result = {
+        "benchmark": "hedging",
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "params": {"jobs": args.jobs, "percentile": args.percentile,
+                   "budget": budget, "server": asdict(config)},
+        **modes,
+        "improvement": {
+            "p95_pct": round((1 - on["p95_ms"] / off["p95_ms"]) * 100, 1),
+            "p99_pct": round((1 - on["p99_ms"] / off["p99_ms"]) * 100, 1),
+            "max_pct": round((1 - on["max_ms"] / off["max_ms"]) * 100, 1),
+            "extra_output_tokens_pct": round(
+                (modes["hedge"]["output_tokens"] / modes["off"]["output_tokens"] - 1) * 100, 1),
+        },
+    }
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: custo por operação da camada de métricas (contador, histograma, render)
+
+Uso: python benchmarks/bench_metrics.py [--ops 200000] [--threads 4]
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import Metrics
+
+
+def per_op_ns(fn, ops: int, threads: int = 1) -> float:
+    def work():
+        for _ in range(ops):
+            fn()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (ops * threads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    metrics = Metrics()
+    metrics.gauge("cost", lambda: 1.5)
+    baseline = per_op_ns(lambda: None, args.ops)
+    inc = per_op_ns(lambda: metrics.inc("nft_tokens_total", 1200, direction="in"), args.ops)
+    observe = per_op_ns(lambda: metrics.observe("nft_stage_seconds", 0.042, stage="http"), args.ops)
+    contended = per_op_ns(lambda: metrics.inc("nft_saved_total"), args.ops // args.threads, args.threads)
+
+    start = time.perf_counter()
+    text = metrics.render_prometheus()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    # Por NFT o agente faz ~6 observações e ~8 incrementos
+    per_nft_us = (6 * (observe - baseline) + 8 * (inc - baseline)) / 1000
+
+    print(json.dumps({
+        "inc_ns": round(inc - baseline, 1),
+        "observe_ns": round(observe - baseline, 1),
+        f"inc_contended_{args.threads}_threads_ns": round(contended - baseline, 1),
+        "render_prometheus_ms": round(render_ms, 3),
+        "render_bytes": len(text),
+        "overhead_per_nft_us": round(per_nft_us, 2),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
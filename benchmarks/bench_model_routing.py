@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: reasoner em tudo (--model-routing fixed) vs rotas por raridade (rarity)
+
+O servidor falso cobra e espera os tokens de raciocínio só no reasoner, e pode
+reprovar mais respostas do modelo sem raciocínio (--chat-invalid-rate) para
+exercitar os reparos e o fallback. Mede custo, latência e tokens por NFT e
+a tabela de estatísticas por rota que o agente acumula.
+
+Uso: python benchmarks/bench_model_routing.py [--per-rarity 20] [--output resultado.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from dataclasses import asdict
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import agent
+from bench_e2e import git_revision, summarize
+from fake_deepseek import FakeConfig, FakeDeepSeekServer
+from model_router import CHAT_MODEL, REASONER_MODEL
+
+MODES = ("fixed", "rarity")
+RARITIES = ("Common", "Rare", "Epic", "Legendary")
+
+
+def run_mode(mode: str, rarities: Tuple[str, ...], per_rarity: int, config: FakeConfig,
+             repair_attempts: int, workdir: Path) -> Dict:
+    results = {}
+    with FakeDeepSeekServer(config) as server:
+        agent.DEEPSEEK_API_URL = server.url
+        agent.DEEPSEEK_API_KEY = "bench"
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            nft_agent = agent.HypnoticNFTAgent(model_routing=mode, repair_attempts=repair_attempts,
+                                               async_writer=False, seed=1, nfts_dir=workdir / "nfts")
+            metrics = nft_agent.metrics
+            try:
+                for rarity in rarities:
+                    latencies: List[float] = []
+                    tokens: List[int] = []
+                    spent_before = nft_agent.session_cost
+                    failed = 0
+                    for _ in range(per_rarity):
+                        started = time.perf_counter()
+                        try:
+                            artwork = nft_agent.generate_artwork(rarity=rarity)
+                        except ValueError:
+                            failed += 1
+                            continue
+                        latencies.append(time.perf_counter() - started)
+                        tokens.append(artwork.tokens)
+                    generated = max(len(latencies), 1)
+                    results[rarity] = {
+                        "generated": len(latencies),
+                        "failed": failed,
+                        # Inclui o gasto das tentativas reprovadas
+                        "cost_per_nft": round((nft_agent.session_cost - spent_before) / generated, 6),
+                        "tokens_per_nft": round(sum(tokens) / generated),
+                        "latency": summarize(latencies),
+                        "fallbacks": int(metrics.value("nft_route_fallbacks_total", rarity=rarity,
+                                                       model=CHAT_MODEL, to=REASONER_MODEL)),
+                    }
+            finally:
+                nft_agent.close()
+    return {"routes": {r: asdict(route) for r, route in nft_agent.router.routes.items()},
+            "by_rarity": results, "route_stats": nft_agent.router.summary()}
+
+
+def savings(fixed: Dict, routed: Dict) -> Dict:
+    """Redução relativa (%) das rotas por raridade sobre o reasoner em tudo"""
+    def pct(before: float, after: float) -> float:
+        return round((1 - after / before) * 100, 1) if before else 0.0
+
+    table = {}
+    for rarity, before in fixed["by_rarity"].items():
+        after = routed["by_rarity"][rarity]
+        table[rarity] = {
+            "cost_pct": pct(before["cost_per_nft"], after["cost_per_nft"]),
+            "tokens_pct": pct(before["tokens_per_nft"], after["tokens_per_nft"]),
+            "latency_p50_pct": pct(before["latency"]["p50_ms"], after["latency"]["p50_ms"]),
+        }
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--per-rarity", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência do DeepSeek falso")
+    parser.add_argument("--tokens-per-second", type=float, default=4000.0,
+                        help="Taxa de geração do servidor falso")
+    parser.add_argument("--reasoning-tokens", type=int, default=3000,
+                        help="Tokens de raciocínio por resposta do reasoner")
+    parser.add_argument("--invalid-rate", type=float, default=0.05)
+    parser.add_argument("--chat-invalid-rate", type=float, default=0.15)
+    parser.add_argument("--repair-attempts", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    config = FakeConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                        reasoning_tokens=args.reasoning_tokens, invalid_rate=args.invalid_rate,
+                        chat_invalid_rate=args.chat_invalid_rate, scene="rich", seed=7)
+
+    modes = {}
+    for mode in MODES:
+        workdir = Path(tempfile.mkdtemp(prefix=f"nft_routing_{mode}_"))
+        try:
+            modes[mode] = run_mode(mode, RARITIES, args.per_rarity, config,
+                                   args.repair_attempts, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "benchmark": "model_routing",
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "params": {"per_rarity": args.per_rarity, "repair_attempts": args.repair_attempts,
+                   "server": asdict(config)},
+        **modes,
+        "savings": savings(modes["fixed"], modes["rarity"]),
+    }
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
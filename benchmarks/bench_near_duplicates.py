@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark do índice de quase-duplicatas em escala
+
+1. Impressão digital de SVGs reais do servidor falso (cena "rich"): custo por SVG,
+   detecção de cópias com números/cores alterados e falsos positivos entre cenas.
+2. Escala: N assinaturas sintéticas (famílias de quase-duplicatas + obras
+   distintas), memória do índice, tempo de inserção e latência de consulta.
+3. Carga a partir do SQLite (o que o agente faz ao iniciar).
+
+Uso: python benchmarks/bench_near_duplicates.py [--scale 100000] [--output resultado.json]
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from array import array
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_e2e import git_revision, summarize
+from fake_deepseek import make_rich_svg
+from near_duplicates import DEFAULT_THRESHOLD, NUM_PERM, NearDuplicateIndex, fingerprint
+
+
+def jitter(svg: str, rng: random.Random) -> str:
+    """Mesma obra com coordenadas deslocadas e um tom de cor trocado"""
+    svg = re.sub(r'(c[xy])="(\d+)"',
+                 lambda m: f'{m.group(1)}="{int(m.group(2)) + rng.randint(-9, 9)}"', svg)
+    return svg.replace("#FB5607", "#FA5A08")
+
+
+def measure_fingerprints(samples: int, extra_elements: int, threshold: float) -> Dict:
+    rng = random.Random(3)
+    index = NearDuplicateIndex(threshold=threshold)
+    durations: List[float] = []
+    bases = [make_rich_svg(rng.choice((6, 10, 15, 20)), extra_elements, salt)
+             for salt in range(samples)]
+    for i, svg in enumerate(bases):
+        started = time.perf_counter()
+        signature = fingerprint(svg)
+        durations.append(time.perf_counter() - started)
+        if index.query(signature, refresh=False) is None:
+            index.add(f"base-{i}", signature)
+    distinct = len(index)
+    detected = sum(1 for svg in bases if index.query(fingerprint(jitter(svg, rng))) is not None)
+    return {
+        "fingerprint": summarize(durations),
+        "scenes": samples,
+        # Sementes diferentes, mas o gerador compartilha defs e pontos decorativos:
+        # cenas pequenas são de fato quase o mesmo molde
+        "flagged_between_seeds": samples - distinct,
+        "jittered_copies_detected": detected,
+        "recall": round(detected / samples, 3),
+    }
+
+
+def synthetic_signatures(count: int, family_size: int, mutation: float,
+                         rng: random.Random) -> List[bytes]:
+    """Obras aleatórias; a cada `family_size`, variações de uma mesma base"""
+    signatures = []
+    base = None
+    for i in range(count):
+        if i % family_size == 0:
+            base = array("I", (rng.getrandbits(32) for _ in range(NUM_PERM)))
+            signatures.append(base.tobytes())
+            continue
+        variant = array("I", base)
+        for position in rng.sample(range(NUM_PERM), int(NUM_PERM * mutation)):
+            variant[position] = rng.getrandbits(32)
+        signatures.append(variant.tobytes())
+    return signatures
+
+
+def measure_scale(scale: int, queries: int, threshold: float, workdir: Path) -> Dict:
+    rng = random.Random(11)
+    signatures = synthetic_signatures(scale, family_size=50, mutation=0.05, rng=rng)
+    items = [(f"nft-{i:07d}", sig) for i, sig in enumerate(signatures)]
+
+    # Memória medida num build à parte: tracemalloc deixaria o cronômetro ~3x mais lento
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    index = NearDuplicateIndex(threshold=threshold)
+    index.add_many(items)
+    traced_mb = (tracemalloc.get_traced_memory()[0] - before) / 1024 / 1024
+    tracemalloc.stop()
+    del index
+
+    index = NearDuplicateIndex(threshold=threshold)
+    started = time.perf_counter()
+    for start in range(0, len(items), 10000):
+        index.add_many(items[start:start + 10000])
+    bulk_seconds = time.perf_counter() - started
+
+    # Inserção incremental (caminho do save_nft_package, sem SQLite)
+    insert_times = []
+    for i in range(queries):
+        signature = array("I", (rng.getrandbits(32) for _ in range(NUM_PERM))).tobytes()
+        started = time.perf_counter()
+        index.add(f"new-{i}", signature)
+        insert_times.append(time.perf_counter() - started)
+
+    # Consultas: variações de obras indexadas (devem achar) e obras novas (não devem)
+    hit_times, miss_times, found, false_hits = [], [], 0, 0
+    for _ in range(queries):
+        base = array("I")
+        base.frombytes(signatures[rng.randrange(0, scale, 50)])
+        for position in rng.sample(range(NUM_PERM), int(NUM_PERM * 0.05)):
+            base[position] = rng.getrandbits(32)
+        started = time.perf_counter()
+        match = index.query(base.tobytes(), refresh=False)
+        hit_times.append(time.perf_counter() - started)
+        found += match is not None
+
+        fresh = array("I", (rng.getrandbits(32) for _ in range(NUM_PERM))).tobytes()
+        started = time.perf_counter()
+        false_hits += index.query(fresh, refresh=False) is not None
+        miss_times.append(time.perf_counter() - started)
+
+    result = {
+        "indexed": len(index),
+        "bands": index.bands,
+        "rows_per_band": index.rows_per_band,
+        "bulk_build_s": round(bulk_seconds, 2),
+        "memory_estimate_mb": round(index.memory_bytes() / 1024 / 1024, 1),
+        "memory_traced_mb": round(traced_mb, 1),
+        "insert": summarize(insert_times),
+        "query_near_duplicate": summarize(hit_times),
+        "query_new": summarize(miss_times),
+        "recall": round(found / queries, 3),
+        "false_positive_rate": round(false_hits / queries, 4),
+    }
+
+    # Persistência: gravar tudo e medir a carga inicial (startup do agente/worker)
+    db_path = workdir / "near_duplicates.db"
+    stored = NearDuplicateIndex(db_path, threshold)
+    started = time.perf_counter()
+    for start in range(0, len(items), 10000):
+        stored.add_many(items[start:start + 10000])
+    result["sqlite_write_s"] = round(time.perf_counter() - started, 2)
+    stored.close()
+    started = time.perf_counter()
+    loaded = NearDuplicateIndex(db_path, threshold)
+    result["sqlite_load_s"] = round(time.perf_counter() - started, 2)
+    result["sqlite_mb"] = round(db_path.stat().st_size / 1024 / 1024, 1)
+    loaded.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=200, help="SVGs reais para a etapa 1")
+    parser.add_argument("--extra-elements", type=int, default=10,
+                        help="Elementos decorativos por SVG da etapa 1")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="nft_neardup_"))
+    try:
+        result = {
+            "benchmark": "near_duplicates",
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "params": {"scale": args.scale, "queries": args.queries, "threshold": args.threshold},
+            "svgs": measure_fingerprints(args.samples, args.extra_elements, args.threshold),
+            "scale": measure_scale(args.scale, args.queries, args.threshold, workdir),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SVG cru vs macros SVG compactas (--svg-macros), por raridade
+
+Mesma cena nos dois caminhos (o servidor falso em modo "rich" responde com o
+SMIL verboso ou com as macros equivalentes). Mede tokens de saída, custo e
+latência por NFT, o tempo de expansão local e projeta a latência para uma
+taxa de geração real (--reference-tps).
+
+Uso: python benchmarks/bench_svg_macros.py [--per-rarity 20] [--output resultado.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from dataclasses import asdict
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import agent
+from bench_e2e import git_revision, summarize
+from fake_deepseek import FakeConfig, FakeDeepSeekServer
+
+MODES = {"raw": False, "macros": True}
+RARITIES = ("Common", "Rare", "Epic", "Legendary")
+
+
+def run_mode(macros: bool, rarities: Tuple[str, ...], per_rarity: int, config: FakeConfig,
+             reference_tps: float, workdir: Path) -> Dict:
+    results = {}
+    expand_samples: List[float] = []
+
+    def observe(stage: str, seconds: float):
+        if stage == "macro_expand":
+            expand_samples.append(seconds)
+
+    with FakeDeepSeekServer(config) as server:
+        agent.DEEPSEEK_API_URL = server.url
+        agent.DEEPSEEK_API_KEY = "bench"
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            nft_agent = agent.HypnoticNFTAgent(svg_macros=macros, async_writer=False, seed=1,
+                                               nfts_dir=workdir / "nfts")
+            nft_agent.stage_observer = observe
+            metrics = nft_agent.metrics
+            try:
+                for rarity in rarities:
+                    latencies: List[float] = []
+                    out_tokens: List[float] = []
+                    costs: List[float] = []
+                    svg_bytes: List[int] = []
+                    for _ in range(per_rarity):
+                        before = metrics.value("nft_tokens_total", direction="out")
+                        started = time.perf_counter()
+                        artwork = nft_agent.generate_artwork(rarity=rarity)
+                        latencies.append(time.perf_counter() - started)
+                        out_tokens.append(metrics.value("nft_tokens_total", direction="out") - before)
+                        costs.append(artwork.cost)
+                        svg_bytes.append(len(artwork.svg_code.encode("utf-8")))
+                    mean_out = sum(out_tokens) / len(out_tokens)
+                    results[rarity] = {
+                        "output_tokens_mean": round(mean_out, 1),
+                        "cost_per_nft": round(sum(costs) / len(costs), 6),
+                        "latency": summarize(latencies),
+                        "projected_generation_s": round(mean_out / reference_tps, 2),
+                        "expanded_svg_bytes_mean": round(sum(svg_bytes) / len(svg_bytes)),
+                    }
+            finally:
+                nft_agent.close()
+    return {"by_rarity": results, "expand": summarize(expand_samples)}
+
+
+def savings(raw: Dict, macros: Dict) -> Dict:
+    """Redução relativa (%) do caminho de macros sobre o SVG cru, por raridade"""
+    def pct(before: float, after: float) -> float:
+        return round((1 - after / before) * 100, 1) if before else 0.0
+
+    table = {}
+    for rarity, before in raw["by_rarity"].items():
+        after = macros["by_rarity"][rarity]
+        table[rarity] = {
+            "output_tokens_pct": pct(before["output_tokens_mean"], after["output_tokens_mean"]),
+            "cost_pct": pct(before["cost_per_nft"], after["cost_per_nft"]),
+            "latency_p50_pct": pct(before["latency"]["p50_ms"], after["latency"]["p50_ms"]),
+        }
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--per-rarity", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência do DeepSeek falso")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0,
+                        help="Taxa de geração do servidor falso")
+    parser.add_argument("--reference-tps", type=float, default=40.0,
+                        help="Taxa real (tokens/s) para projetar a latência de geração")
+    parser.add_argument("--extra-elements", type=int, default=40)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    config = FakeConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                        extra_elements=args.extra_elements, scene="rich", seed=7)
+
+    modes = {}
+    for mode, macros in MODES.items():
+        workdir = Path(tempfile.mkdtemp(prefix=f"nft_macros_{mode}_"))
+        try:
+            modes[mode] = run_mode(macros, RARITIES, args.per_rarity, config,
+                                   args.reference_tps, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "benchmark": "svg_macros",
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "params": {"per_rarity": args.per_rarity, "reference_tps": args.reference_tps,
+                   "server": asdict(config)},
+        **modes,
+        "savings": savings(modes["raw"], modes["macros"]),
+    }
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: validador expat vs checagens por substring em SVGs grandes (200 KB+)
+
+Uso: python benchmarks/bench_svg_validator.py [--size-kb 256] [--runs 20]
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from svg_validator import SVGValidator, validate_svg
+
+
+def make_svg(target_bytes: int, seed: int = 7) -> str:
+    """Gera um SVG animado sintético do tamanho aproximado pedido"""
+    rng = random.Random(seed)
+    parts = [
+        '<svg viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg">',
+        '<defs><radialGradient id="g0"><stop offset="0%" stop-color="#FF006E"/></radialGradient>',
+        '<path id="p0" d="M500,500 Q600,400 500,300 T400,400 T500,500"/></defs>',
+        '<rect width="1000" height="1000" fill="url(#g0)"/>',
+    ]
+    size = sum(len(p) for p in parts)
+    i = 0
+    while size < target_bytes:
+        cx, cy, r = rng.randint(0, 1000), rng.randint(0, 1000), rng.randint(5, 80)
+        group = (
+            f'  <g id="layer{i}">\n'
+            f'    <circle cx="{cx}" cy="{cy}" r="{r}" fill="#{rng.randint(0, 0xFFFFFF):06X}">\n'
+            f'      <animate attributeName="r" values="{r};{r * 2};{r}" dur="{rng.randint(3, 30)}s" repeatCount="indefinite"/>\n'
+            f'      <animateTransform attributeName="transform" type="rotate" from="0 500 500" to="360 500 500" dur="{rng.randint(3, 30)}s" repeatCount="indefinite"/>\n'
+            f'    </circle>\n'
+            f'    <circle r="3" fill="#FFF"><animateMotion dur="{rng.randint(3, 30)}s" repeatCount="indefinite"><mpath href="#p0"/></animateMotion></circle>\n'
+            f'  </g>\n'
+        )
+        parts.append(group)
+        size += len(group)
+        i += 1
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def substring_checks(svg_code: str, min_animations: int) -> bool:
+    """Checagens originais de generate_artwork"""
+    if not svg_code or len(svg_code) < 500:
+        return False
+    if not all(tag in svg_code for tag in ["<svg", "<animate", "viewBox=\"0 0 1000 1000\""]):
+        return False
+    return svg_code.count("<animate") >= min_animations
+
+
+def expat_full(svg_code: str, min_animations: int) -> bool:
+    return not validate_svg(svg_code).errors(min_animations)
+
+
+def expat_chunked(svg_bytes: bytes, min_animations: int, chunk_size: int = 64) -> bool:
+    """Simula o stream: pedaços pequenos como os deltas do SSE"""
+    validator = SVGValidator()
+    for i in range(0, len(svg_bytes), chunk_size):
+        validator.feed(svg_bytes[i:i + chunk_size])
+    return not validator.close().errors(min_animations)
+
+
+def timeit(fn, *args, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "min_ms": round(samples[0] * 1000, 3),
+        "median_ms": round(samples[len(samples) // 2] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-kb", type=int, nargs="+", default=[200, 512, 1024])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    results = []
+    for size_kb in args.size_kb:
+        svg = make_svg(size_kb * 1024)
+        svg_bytes = svg.encode("utf-8")
+        results.append({
+            "size_kb": round(len(svg_bytes) / 1024, 1),
+            "animations": validate_svg(svg).animation_total,
+            "substring": timeit(substring_checks, svg, 20, runs=args.runs),
+            "expat_full": timeit(expat_full, svg, 20, runs=args.runs),
+            "expat_chunked_64b": timeit(expat_chunked, svg_bytes, 20, runs=args.runs),
+        })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Teste de caos do modo worker: vários processos consomem a mesma fila e são
+mortos com SIGKILL no meio dos jobs; ao final, nenhuma obra pode ter sido
+perdida nem duplicada
+
+Verifica: todo job concluído tem exatamente uma pasta publicada (com o mesmo
+job_id no metadata.json), nenhum job falhou ou ficou de fora do mix pedido
+(a não ser até --allow-failed), nenhum job falho tem obra publicada, nenhuma
+pasta sem job, nenhum job_id repetido e o catálogo com as mesmas obras do disco.
+Sai com código 1 se algo falhar.
+
+Uso: python benchmarks/chaos_workers.py [--jobs 40] [--workers 3] [--kills 8] [--allow-failed 0]
+"""
+
+import os
+import sys
+import time
+import json
+import signal
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from collections import defaultdict
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from catalog_index import CatalogIndex, iter_metadata_files
+from fake_deepseek import FakeConfig, FakeDeepSeekServer
+from scheduler import JobQueue
+
+
+def spawn_worker(args: argparse.Namespace, workdir: Path, env: Dict[str, str],
+                 serial: int) -> subprocess.Popen:
+    log = open(workdir / f"worker-{serial}.log", "w")
+    command = [sys.executable, str(REPO_ROOT / "worker.py"), "--workdir", str(workdir), "run",
+               "--worker-id", f"chaos-{serial}", "--concurrency", str(args.concurrency),
+               "--lease", str(args.lease), "--heartbeat", str(args.lease / 4),
+               "--poll", "0.2", "--exit-when-empty"]
+    return subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+
+
+def check(workdir: Path, allow_failed: int = 0) -> List[str]:
+    """Problemas encontrados (lista vazia = nenhuma obra perdida, falha ou duplicada)"""
+    nfts_dir = workdir / "nfts"
+    queue = JobQueue(nfts_dir / "schedule.db")
+    with queue._lock:
+        jobs = queue._conn.execute("SELECT id, status, folder, error FROM jobs").fetchall()
+    queue.close()
+
+    on_disk = list(iter_metadata_files(nfts_dir))
+    folders_of: Dict[str, List[str]] = defaultdict(list)
+    for metadata in on_disk:
+        folders_of[str(metadata.get("job_id"))].append(metadata["folder"])
+    problems = []
+    failed = []
+
+    for job_id, status, folder, error in jobs:
+        folders = folders_of.get(str(job_id), [])
+        if status == "done":
+            if not folders:
+                problems.append(f"job {job_id} concluído sem obra no disco (perdido)")
+            elif folder not in folders:
+                problems.append(f"job {job_id}: fila aponta {folder}, disco tem {', '.join(folders)}")
+        elif status == "failed":
+            failed.append(f"job {job_id} falhou ({error})")
+            if folders:
+                problems.append(f"job {job_id} falhou mas tem obra publicada: {', '.join(folders)}")
+        else:
+            problems.append(f"job {job_id} terminou como '{status}' (fora do mix pedido)")
+        if len(folders) > 1:
+            problems.append(f"job {job_id} publicado {len(folders)} vezes (duplicado): "
+                            f"{', '.join(folders)}")
+
+    # Job falho = obra a menos no mix pedido: só é aceito se esperado (--allow-failed)
+    if len(failed) > allow_failed:
+        problems.extend(failed)
+    else:
+        for line in failed:
+            print(f"⚠️ {line} (tolerado por --allow-failed)")
+
+    known = {str(job_id) for job_id, _, _, _ in jobs}
+    for job_id, folders in folders_of.items():
+        if job_id not in known:
+            problems.append(f"{len(folders)} obra(s) sem job correspondente (job_id={job_id}): "
+                            f"{', '.join(folders)}")
+
+    catalog = CatalogIndex(nfts_dir / "catalog.db")
+    indexed = catalog.count()
+    catalog.close()
+    if indexed != len(on_disk):
+        problems.append(f"catálogo com {indexed} obras, disco com {len(on_disk)}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=2, help="Slots por worker")
+    parser.add_argument("--kills", type=int, default=8, help="SIGKILLs ao longo do teste")
+    parser.add_argument("--kill-every", type=float, default=1.5)
+    parser.add_argument("--lease", type=float, default=3.0)
+    parser.add_argument("--latency", type=float, default=0.4, help="Latência do DeepSeek falso")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--allow-failed", type=int, default=0,
+                        help="Jobs com status failed tolerados (padrão: nenhum)")
+    parser.add_argument("--keep", action="store_true", help="Mantém o diretório de trabalho")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="nft_chaos_"))
+    queue = JobQueue(workdir / "nfts" / "schedule.db")
+    rarities = ("Common", "Rare")
+    queue.enqueue({rarity: args.jobs // len(rarities) + (i < args.jobs % len(rarities))
+                   for i, rarity in enumerate(rarities)})
+    queue.close()
+
+    config = FakeConfig(latency=args.latency, tokens_per_second=4000, seed=args.seed)
+    with FakeDeepSeekServer(config) as server:
+        env = dict(os.environ, DEEPSEEK_API_URL=server.url, DEEPSEEK_API_KEY="chaos",
+                   PYTHONUNBUFFERED="1")
+        serial = 0
+        workers: List[subprocess.Popen] = []
+        for _ in range(args.workers):
+            serial += 1
+            workers.append(spawn_worker(args, workdir, env, serial))
+
+        started = time.monotonic()
+        kills = 0
+        next_kill = started + args.kill_every
+        while any(w.poll() is None for w in workers):
+            if time.monotonic() - started > args.timeout:
+                print("❌ Tempo esgotado; encerrando workers")
+                for w in workers:
+                    w.kill()
+                break
+            if kills < args.kills and time.monotonic() >= next_kill:
+                alive = [w for w in workers if w.poll() is None]
+                victim = rng.choice(alive)
+                os.kill(victim.pid, signal.SIGKILL)
+                victim.wait()
+                kills += 1
+                # Substitui o worker morto (o lease dos jobs dele vai vencer)
+                serial += 1
+                workers.append(spawn_worker(args, workdir, env, serial))
+                next_kill = time.monotonic() + args.kill_every * rng.uniform(0.5, 1.5)
+            time.sleep(0.05)
+        elapsed = time.monotonic() - started
+        requests = dict(server.fake.counts)
+
+    problems = check(workdir, args.allow_failed)
+    queue = JobQueue(workdir / "nfts" / "schedule.db")
+    statuses = queue.status_counts()
+    queue.close()
+    leftovers = len(list((workdir / "nfts" / ".tmp").glob("*")))
+
+    print(json.dumps({
+        "jobs": args.jobs, "workers_spawned": serial, "kills": kills,
+        "elapsed_s": round(elapsed, 2), "statuses": statuses, "server": requests,
+        "orphan_tmp_dirs": leftovers,
+    }, indent=2))
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+    else:
+        print(f"✅ {statuses.get('done', 0)} jobs concluídos, nenhuma obra perdida ou duplicada "
+              f"após {kills} SIGKILLs")
+
+    if args.keep or problems:
+        print(f"📁 Diretório mantido: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita POST /v1/chat/completions da DeepSeek (benchmarks)
+Latência, taxa de tokens, erros 5xx/429 e payloads válidos/inválidos configuráveis
+
+Uso: python benchmarks/fake_deepseek.py [--port 8765] [--latency 0.2] [--tokens-per-second 0]
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from svg_macros import expand_macros
+
+MIN_ANIMATIONS_RE = re.compile(r"Mínimo de animações:\s*(\d+)")
+MACROS_MARKER = "MACROS SVG"
+
+# Cena "rich": o vocabulário que o prompt dita (SMIL com splines, filtros, paths)
+SCENES = ("simple", "rich")
+
+# Tipos de payload inválido, em rodízio
+INVALID_KINDS = ("malformed", "few_animations", "bad_viewbox", "short")
+
+CHARS_PER_TOKEN = 4
+
+# Modelo que "pensa" antes de responder (reasoning_tokens na latência e no usage)
+REASONER_MODELS = ("deepseek-reasoner",)
+STREAM_CHUNK_CHARS = 16
+
+
+@dataclass
+class FakeConfig:
+    """Comportamento do servidor falso"""
+    latency: float = 0.05              # segundos até o primeiro byte
+    tokens_per_second: float = 0.0     # 0 = resposta inteira de uma vez
+    error_rate: float = 0.0            # fração de respostas HTTP 500
+    rate_limit_rate: float = 0.0       # fração de respostas HTTP 429
+    retry_after: Optional[float] = 0.0 # header Retry-After nos 429 (None = sem header)
+    invalid_rate: float = 0.0          # fração de SVGs que falham na validação
+    chat_invalid_rate: Optional[float] = None  # idem no modelo sem raciocínio (None = invalid_rate)
+    reasoning_tokens: int = 0          # tokens de raciocínio do reasoner antes da resposta
+    tail_rate: float = 0.0             # fração de respostas lentas (cauda de latência)
+    tail_slowdown: float = 10.0        # quantas vezes mais lentas elas são
+    extra_elements: int = 40           # elementos decorativos (tamanho do SVG)
+    cache_hit_ratio: float = 0.8       # fração do prompt reportada como cache hit
+    scene: str = "simple"              # simple (só rotações) ou rich (SMIL variado)
+    seed: Optional[int] = None
+
+
+class FakeDeepSeek:
+    """Gera as respostas e conta o que foi servido"""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._serial = 0
+        self.counts = {"requests": 0, "ok": 0, "invalid": 0, "errors": 0, "rate_limited": 0,
+                       "slow": 0}
+
+    def _draw(self) -> Tuple[int, float, int]:
+        with self._lock:
+            self._serial += 1
+            self.counts["requests"] += 1
+            return self._serial, self._rng.random(), self._rng.randrange(1 << 30)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def slowdown(self) -> float:
+        """Fator de lentidão desta resposta (1 = normal)"""
+        with self._lock:
+            slow = self._rng.random() < self.config.tail_rate
+        if slow:
+            self._count("slow")
+        return self.config.tail_slowdown if slow else 1.0
+
+    def decide(self, model: Optional[str] = None) -> Tuple[str, int, int]:
+        """Sorteia o desfecho da requisição: ok, invalid, error ou rate_limited"""
+        serial, roll, salt = self._draw()
+        cfg = self.config
+        invalid_rate = cfg.invalid_rate
+        if cfg.chat_invalid_rate is not None and not is_reasoner(model):
+            invalid_rate = cfg.chat_invalid_rate
+        if roll < cfg.rate_limit_rate:
+            outcome = "rate_limited"
+        elif roll < cfg.rate_limit_rate + cfg.error_rate:
+            outcome = "errors"
+        elif roll < cfg.rate_limit_rate + cfg.error_rate + invalid_rate:
+            outcome = "invalid"
+        else:
+            outcome = "ok"
+        self._count(outcome)
+        return outcome, serial, salt
+
+    def build_content(self, messages: List[Dict], valid: bool, serial: int, salt: int) -> str:
+        """JSON no formato pedido pelo prompt, com SVG único por requisição"""
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        match = MIN_ANIMATIONS_RE.search(prompt)
+        min_animations = int(match.group(1)) if match else 6
+        kind = None if valid else INVALID_KINDS[serial % len(INVALID_KINDS)]
+        if self.config.scene == "rich":
+            # Prompt com o vocabulário de macros: responde na forma compacta
+            svg = make_rich_svg(min_animations, self.config.extra_elements, salt, kind,
+                                macros=MACROS_MARKER in prompt)
+        else:
+            svg = make_svg(min_animations, self.config.extra_elements, salt, kind)
+        return json.dumps({
+            "artwork_name": f"Bench Vortex {serial}",
+            "description": "Obra sintética gerada pelo servidor de benchmark",
+            "svg_code": svg,
+        }, ensure_ascii=False)
+
+    def usage(self, messages: List[Dict], content: str, reasoning_tokens: int = 0) -> Dict:
+        prompt_tokens = len(json.dumps(messages, ensure_ascii=False)) // CHARS_PER_TOKEN
+        # Como na API real, o raciocínio é cobrado como saída
+        completion_tokens = max(1, len(content) // CHARS_PER_TOKEN) + reasoning_tokens
+        hit = int(prompt_tokens * self.config.cache_hit_ratio)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_cache_hit_tokens": hit,
+            "prompt_cache_miss_tokens": prompt_tokens - hit,
+            "completion_tokens_details": {"reasoning_tokens": reasoning_tokens},
+        }
+
+
+def is_reasoner(model: Optional[str]) -> bool:
+    return model in REASONER_MODELS
+
+
+def make_svg(min_animations: int, extra_elements: int, salt: int, invalid: Optional[str] = None) -> str:
+    """SVG animado determinístico; `invalid` quebra uma regra rígida do validador"""
+    rng = random.Random(salt)
+    animations = min_animations + 2
+    if invalid == "few_animations":
+        animations = max(0, min_animations - 1)
+    viewbox = "0 0 800 600" if invalid == "bad_viewbox" else "0 0 1000 1000"
+
+    parts = [f'<svg viewBox="{viewbox}" xmlns="http://www.w3.org/2000/svg">',
+             '<defs><radialGradient id="g0"><stop offset="0" stop-color="#FF006E"/>'
+             '<stop offset="1" stop-color="#3A86FF"/></radialGradient></defs>',
+             '<rect width="1000" height="1000" fill="#0B0B1A"/>']
+    for i in range(animations):
+        cx, cy, r = rng.randint(100, 900), rng.randint(100, 900), rng.randint(20, 200)
+        parts.append(
+            f'<circle cx="{cx}" cy="{cy}" r="{r}" fill="url(#g0)" opacity="0.6">'
+            f'<animateTransform attributeName="transform" type="rotate" '
+            f'from="0 500 500" to="360 500 500" dur="{rng.randint(3, 30)}s" repeatCount="indefinite"/>'
+            f'</circle>'
+        )
+    for _ in range(extra_elements):
+        parts.append(f'<circle cx="{rng.randint(0, 1000)}" cy="{rng.randint(0, 1000)}" '
+                     f'r="{rng.randint(1, 6)}" fill="#FFFFFF" opacity="0.{rng.randint(2, 9)}"/>')
+    parts.append("</svg>")
+    svg = "".join(parts)
+
+    if invalid == "malformed":
+        svg = svg.replace("</circle>", "", 1)
+    elif invalid == "short":
+        svg = '<svg viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg"/>'
+    return svg
+
+
+def _rich_element(rng: random.Random, colors: List[str]) -> str:
+    """Elemento com a animação de um dos 8 tipos pedidos no prompt (forma de macro)"""
+    cx, cy, r = rng.randint(100, 900), rng.randint(100, 900), rng.randint(20, 160)
+    kind = rng.randrange(8)
+    dur = rng.randint(3, 30)
+    if kind == 0:
+        reverse = ' rev="1"' if rng.random() < 0.5 else ""
+        animation = f'<spin d="{dur}" c="{cx} {cy}"{reverse}/>'
+    elif kind == 1:
+        animation = f'<ease a="r" v="{r};{r + rng.randint(10, 60)};{r}" d="{dur}"/>'
+    elif kind == 2:
+        cycle = rng.sample(colors, 3)
+        animation = f'<ease a="fill" v="{cycle[0]};{cycle[1]};{cycle[2]};{cycle[0]}" d="{dur}"/>'
+    elif kind == 3:
+        animation = f'<ease a="opacity" v="0.{rng.randint(1, 4)};1;0.{rng.randint(1, 4)}" d="{dur}"/>'
+    elif kind == 4:
+        animation = f'<grow v="1;{1 + rng.randint(2, 8) / 10:g};1" d="{dur}"/>'
+    elif kind == 5:
+        dx, dy = rng.randint(-80, 80), rng.randint(-80, 80)
+        animation = f'<drift v="0,0;{dx},{dy};0,0" d="{dur}"/>'
+    elif kind == 6:
+        animation = f'<orbit p="flow" d="{dur}" rot="auto"/>'
+    else:
+        w = rng.randint(30, 120)
+        square = f"M{cx - w},{cy - w} L{cx + w},{cy - w} L{cx + w},{cy + w} L{cx - w},{cy + w} Z"
+        star = (f"M{cx},{cy - w} L{cx + w // 3},{cy - w // 3} L{cx + w},{cy} "
+                f"L{cx + w // 3},{cy + w // 3} Z")
+        fill = rng.choice(colors)
+        return (f'<path d="{square}" fill="{fill}" opacity="0.7">'
+                f'<ease a="d" v="{square};{star};{square}" d="{dur}"/></path>')
+    fill = rng.choice(colors + ["url(#g0)"])
+    filters = ["", ' filter="url(#glow)"', ' filter="url(#liquid)"']
+    return (f'<circle cx="{cx}" cy="{cy}" r="{r}" fill="{fill}" opacity="0.8"'
+            f'{rng.choice(filters)}>{animation}</circle>')
+
+
+def make_rich_svg(min_animations: int, extra_elements: int, salt: int,
+                  invalid: Optional[str] = None, macros: bool = False) -> str:
+    """Cena com o SMIL verboso que o prompt pede; `macros` devolve a forma compacta"""
+    rng = random.Random(salt)
+    colors = ["#FF006E", "#FB5607", "#FFBE0B", "#8338EC", "#3A86FF"]
+    animations = min_animations + 2
+    if invalid == "few_animations":
+        animations = max(0, min_animations - 1)
+    viewbox = "0 0 800 600" if invalid == "bad_viewbox" else "0 0 1000 1000"
+
+    # defs: gradiente (2 animações), turbulência (1) e brilho (1)
+    parts = [f'<svg viewBox="{viewbox}" xmlns="http://www.w3.org/2000/svg">',
+             '<defs><grad id="g0" c="#FF006E;#3A86FF" d="7"/>'
+             '<liquid id="liquid" f="0.02;0.05;0.02" s="20" d="11"/>'
+             '<glow id="glow" v="2;8;2" d="5"/>'
+             '<path id="flow" d="M500,500 Q700,300 500,150 T300,500 T500,850" fill="none"/></defs>',
+             '<rect width="1000" height="1000" fill="#0B0B1A"/>']
+    for _ in range(max(0, animations - 4)):
+        parts.append(_rich_element(rng, colors))
+    for _ in range(extra_elements):
+        parts.append(f'<circle cx="{rng.randint(0, 1000)}" cy="{rng.randint(0, 1000)}" '
+                     f'r="{rng.randint(1, 6)}" fill="#FFFFFF" opacity="0.{rng.randint(2, 9)}"/>')
+    parts.append("</svg>")
+    svg = "".join(parts)
+    if not macros:
+        svg = expand_macros(svg)
+
+    if invalid == "malformed":
+        svg = svg.replace("</circle>", "", 1)
+    elif invalid == "short":
+        svg = '<svg viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg"/>'
+    return svg
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeDeepSeek/1.0"
+    slowdown = 1.0  # sorteado por requisição
+
+    def log_message(self, format, *args):
+        pass  # silencioso: o benchmark mede, não loga
+
+    def do_POST(self):
+        fake: FakeDeepSeek = self.server.fake
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._send_json(400, {"error": {"message": "JSON inválido"}})
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "rota desconhecida"}})
+
+        cfg = fake.config
+        model = payload.get("model")
+        outcome, serial, salt = fake.decide(model)
+        self.slowdown = fake.slowdown()
+        time.sleep(cfg.latency * self.slowdown)
+
+        if outcome == "rate_limited":
+            headers = {}
+            if cfg.retry_after is not None:
+                headers["Retry-After"] = f"{cfg.retry_after:g}"
+            return self._send_json(429, {"error": {"message": "Rate limit"}}, headers)
+        if outcome == "errors":
+            return self._send_json(500, {"error": {"message": "Erro interno simulado"}})
+
+        messages = payload.get("messages", [])
+        content = fake.build_content(messages, outcome == "ok", serial, salt)
+        reasoning = cfg.reasoning_tokens if is_reasoner(model) else 0
+        usage = fake.usage(messages, content, reasoning)
+
+        if payload.get("stream"):
+            return self._send_stream(payload, content, usage, reasoning)
+
+        # Raciocínio gerado antes do primeiro token da resposta (atrasa o TTFT)
+        self._throttle(reasoning * CHARS_PER_TOKEN + len(content))
+        self._send_json(200, {
+            "id": f"bench-{serial}",
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": usage,
+        })
+
+    def _throttle(self, chars: int):
+        tps = self.server.fake.config.tokens_per_second
+        if tps > 0:
+            time.sleep(chars / CHARS_PER_TOKEN / tps * self.slowdown)
+
+    def _send_json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, payload: Dict, content: str, usage: Dict, reasoning: int = 0):
+        """SSE em chunks; o cliente pode fechar a conexão no meio (cancelamento)"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(body: Dict):
+            self.wfile.write(b"data: " + json.dumps(body, ensure_ascii=False).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        try:
+            # O raciocínio chega antes, em deltas reasoning_content (como na API real)
+            for _ in range(0, reasoning * CHARS_PER_TOKEN, STREAM_CHUNK_CHARS):
+                self._throttle(STREAM_CHUNK_CHARS)
+                event({"choices": [{"index": 0, "delta": {"reasoning_content": "." * STREAM_CHUNK_CHARS}}]})
+            for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                chunk = content[start:start + STREAM_CHUNK_CHARS]
+                self._throttle(len(chunk))
+                event({"choices": [{"index": 0, "delta": {"content": chunk}}]})
+            event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                event({"choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # cliente cancelou o stream
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Cliente que desistiu no meio da resposta (timeout, worker morto) não é erro do servidor
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeDeepSeekServer:
+    """Servidor em thread própria; use como context manager"""
+
+    def __init__(self, config: Optional[FakeConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.fake = FakeDeepSeek(config or FakeConfig())
+        self.httpd = _Server((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self.fake
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> "FakeDeepSeekServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-deepseek", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Argumentos de FakeConfig compartilhados com bench_e2e.py"""
+    defaults = FakeConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--invalid-rate", type=float, default=defaults.invalid_rate)
+    parser.add_argument("--chat-invalid-rate", type=float, default=defaults.chat_invalid_rate)
+    parser.add_argument("--reasoning-tokens", type=int, default=defaults.reasoning_tokens)
+    parser.add_argument("--tail-rate", type=float, default=defaults.tail_rate)
+    parser.add_argument("--tail-slowdown", type=float, default=defaults.tail_slowdown)
+    parser.add_argument("--extra-elements", type=int, default=defaults.extra_elements)
+    parser.add_argument("--cache-hit-ratio", type=float, default=defaults.cache_hit_ratio)
+    parser.add_argument("--scene", choices=SCENES, default=defaults.scene)
+    parser.add_argument("--server-seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        latency=args.latency, tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, invalid_rate=args.invalid_rate,
+        chat_invalid_rate=args.chat_invalid_rate, reasoning_tokens=args.reasoning_tokens,
+        tail_rate=args.tail_rate, tail_slowdown=args.tail_slowdown,
+        extra_elements=args.extra_elements, cache_hit_ratio=args.cache_hit_ratio,
+        scene=args.scene, seed=args.server_seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    server = FakeDeepSeekServer(config, args.host, args.port)
+    print(f"🧪 DeepSeek falso em {server.url}")
+    print(f"   {json.dumps(asdict(config))}")
+    print(f"   Use DEEPSEEK_API_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"📊 {server.fake.counts}")
+
+
+if __name__ == "__main__":
+    main()
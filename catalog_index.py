@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Índice incremental do catálogo de NFTs (SQLite embutido)
+Evita varrer nfts/ e parsear todos os metadata.json para listar/filtrar a coleção
+
+Uso: python catalog_index.py rebuild [nfts_dir]
+"""
+
+import sys
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nfts (
+    id TEXT PRIMARY KEY,
+    folder TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    rarity TEXT NOT NULL,
+    style TEXT NOT NULL,
+    price REAL NOT NULL,
+    animation_count INTEGER,
+    created_at TEXT NOT NULL,
+    content_hash TEXT,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_nfts_rarity ON nfts (rarity, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_nfts_style ON nfts (style, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_nfts_price ON nfts (price, id);
+CREATE INDEX IF NOT EXISTS idx_nfts_created_at ON nfts (created_at, id);
+"""
+
+ORDER_COLUMNS = {"created_at", "price"}
+
+
+@dataclass
+class Page:
+    """Página de resultados com cursor para a próxima"""
+    items: List[Dict]
+    next_cursor: Optional[str]
+
+
+class CatalogIndex:
+    """Índice SQLite com upsert por NFT e consultas paginadas (keyset)"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row(metadata: Dict) -> Tuple:
+        return (
+            metadata["id"], metadata["folder"], metadata["name"],
+            metadata["rarity"], metadata["style"], float(metadata["price"]),
+            metadata.get("animation_count"), metadata["created_at"],
+            metadata.get("content_hash"), json.dumps(metadata, ensure_ascii=False)
+        )
+
+    def upsert(self, metadata: Dict):
+        """Insere ou atualiza um NFT"""
+        self.upsert_many([metadata])
+
+    def upsert_many(self, items: List[Dict]):
+        """Insere/atualiza vários NFTs numa única transação"""
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO nfts (id, folder, name, rarity, style, price, animation_count,
+                                  created_at, content_hash, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    folder = excluded.folder, name = excluded.name, rarity = excluded.rarity,
+                    style = excluded.style, price = excluded.price,
+                    animation_count = excluded.animation_count, created_at = excluded.created_at,
+                    content_hash = excluded.content_hash, metadata = excluded.metadata
+            """, [self._row(m) for m in items])
+
+    def delete(self, nft_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM nfts WHERE id = ?", (nft_id,))
+
+    def count(self, rarity: Optional[str] = None, style: Optional[str] = None) -> int:
+        where, params = self._filters(rarity, style, None, None)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM nfts {where}", params).fetchone()[0]
+
+    def get(self, nft_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT metadata FROM nfts WHERE id = ?", (nft_id,)).fetchone()
+        return json.loads(row["metadata"]) if row else None
+
+    @staticmethod
+    def _filters(rarity, style, min_price, max_price) -> Tuple[str, List]:
+        clauses, params = [], []
+        if rarity:
+            clauses.append("rarity = ?")
+            params.append(rarity)
+        if style:
+            clauses.append("style = ?")
+            params.append(style)
+        if min_price is not None:
+            clauses.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price <= ?")
+            params.append(max_price)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, rarity: Optional[str] = None, style: Optional[str] = None,
+              min_price: Optional[float] = None, max_price: Optional[float] = None,
+              order_by: str = "created_at", descending: bool = True,
+              page_size: int = 50, cursor: Optional[str] = None) -> Page:
+        """
+        Consulta paginada. O cursor (retornado em Page.next_cursor) continua a
+        partir do último item, com custo constante por página.
+        """
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"order_by inválido: {order_by}")
+
+        where, params = self._filters(rarity, style, min_price, max_price)
+        if cursor:
+            last_value, last_id = json.loads(cursor)
+            op = "<" if descending else ">"
+            where += (" AND " if where else "WHERE ") + f"({order_by}, id) {op} (?, ?)"
+            params += [last_value, last_id]
+
+        direction = "DESC" if descending else "ASC"
+        sql = (f"SELECT id, {order_by} AS sort_key, metadata FROM nfts {where} "
+               f"ORDER BY {order_by} {direction}, id {direction} LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(sql, params + [page_size]).fetchall()
+
+        items = [json.loads(row["metadata"]) for row in rows]
+        next_cursor = None
+        if len(rows) == page_size:
+            next_cursor = json.dumps([rows[-1]["sort_key"], rows[-1]["id"]])
+        return Page(items=items, next_cursor=next_cursor)
+
+    def iter_all(self, **filters) -> Iterator[Dict]:
+        """Itera sobre todas as páginas de uma consulta"""
+        cursor = None
+        while True:
+            page = self.query(cursor=cursor, **filters)
+            yield from page.items
+            if not page.next_cursor:
+                return
+            cursor = page.next_cursor
+
+    def rebuild(self, nfts_dir: Path, batch_size: int = 1000) -> int:
+        """Reconstrói o índice a partir dos metadata.json existentes em disco"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM nfts")
+
+        batch, total = [], 0
+        for metadata in iter_metadata_files(Path(nfts_dir)):
+            batch.append(metadata)
+            if len(batch) >= batch_size:
+                self.upsert_many(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            self.upsert_many(batch)
+            total += len(batch)
+        return total
+
+
+def iter_metadata_files(nfts_dir: Path) -> Iterator[Dict]:
+    """Varre o disco: pastas em shards (nfts/ab/cd/<hash>) e pastas antigas (nfts/<pasta>)"""
+    for metadata_file in nfts_dir.glob("**/metadata.json"):
+        if any(part.startswith(".") for part in metadata_file.relative_to(nfts_dir).parts):
+            continue  # diretórios temporários do writer
+        try:
+            with open(metadata_file, encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        # Pastas antigas não tinham 'folder' relativo a partir dos shards
+        metadata.setdefault("folder", metadata_file.parent.relative_to(nfts_dir).as_posix())
+        metadata.setdefault("id", metadata["folder"])
+        yield metadata
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print(__doc__.strip())
+        return 1
+    nfts_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path.cwd() / "nfts"
+    index = CatalogIndex(nfts_dir / "catalog.db")
+    total = index.rebuild(nfts_dir)
+    index.close()
+    print(f"✅ Índice reconstruído: {total} NFTs em {nfts_dir / 'catalog.db'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
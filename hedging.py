@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Requisições "hedged" contra a cauda de latência dos jobs caros
+Quando uma geração passa do percentil aprendido nos jobs recentes, dispara uma
+cópia; a primeira resposta aprovada na validação vence e a outra é cancelada.
+Um orçamento por raridade limita quantos jobs ganham cópia (e o gasto extra)
+"""
+
+import time
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Hashable, Optional, Tuple, TypeVar
+
+from metrics import Metrics
+
+T = TypeVar("T")
+
+# Percentil da latência recente a partir do qual a cópia é disparada
+DEFAULT_PERCENTILE = 0.95
+
+# Amostras necessárias antes de confiar no percentil, e janela de jobs recentes
+MIN_SAMPLES = 10
+LATENCY_WINDOW = 100
+
+# Fração dos jobs de cada raridade que pode ganhar uma cópia
+DEFAULT_BUDGET = {"Common": 0.0, "Rare": 0.05, "Epic": 0.10, "Legendary": 0.20}
+
+# Crédito acumulável: cópias seguidas permitidas após um período calmo
+BUDGET_BURST = 2.0
+
+
+class HedgeCancelled(ValueError):
+    """Tentativa abandonada porque a outra cópia já venceu"""
+
+
+def parse_budget(text: str) -> Dict[str, float]:
+    """'Legendary=0.2,Epic=0.1' -> frações por raridade (as omitidas ficam no padrão)"""
+    budget = dict(DEFAULT_BUDGET)
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        rarity, _, value = part.partition("=")
+        rarity = rarity.strip().capitalize()
+        if rarity not in budget or not value:
+            raise ValueError(f"Orçamento de hedge inválido: {part!r}")
+        budget[rarity] = max(0.0, float(value))
+    return budget
+
+
+class LatencyTracker:
+    """Latências recentes por rota; o percentil vira o gatilho da cópia"""
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: Hashable, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def threshold(self, key: Hashable, percentile: float) -> Optional[float]:
+        """Percentil (nearest-rank) das latências recentes; None enquanto aprende"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        rank = min(len(samples) - 1, max(0, int(percentile * len(samples) + 0.5) - 1))
+        return samples[rank]
+
+
+class HedgeBudget:
+    """Balde de créditos por raridade: cada job rende `fração`, cada cópia gasta 1"""
+
+    def __init__(self, fractions: Dict[str, float], burst: float = BUDGET_BURST):
+        self.fractions = fractions
+        self.burst = burst
+        self._credit: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def credit(self, rarity: str):
+        with self._lock:
+            self._credit[rarity] = min(self.burst, self._credit.get(rarity, 0.0)
+                                       + self.fractions.get(rarity, 0.0))
+
+    def try_spend(self, rarity: str) -> bool:
+        with self._lock:
+            if self._credit.get(rarity, 0.0) < 1.0:
+                return False
+            self._credit[rarity] -= 1.0
+            return True
+
+
+@dataclass
+class HedgeStats:
+    """Acumulado por raridade"""
+    jobs: int = 0
+    fired: int = 0
+    skipped_budget: int = 0
+    hedge_wins: int = 0
+    extra_tokens: int = 0
+    extra_cost: float = 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "jobs": self.jobs,
+            "fired": self.fired,
+            "hedge_rate": round(self.fired / max(self.jobs, 1), 3),
+            "hedge_wins": self.hedge_wins,
+            "skipped_budget": self.skipped_budget,
+            "extra_tokens": self.extra_tokens,
+            "extra_cost": round(self.extra_cost, 5),
+        }
+
+
+class Hedger:
+    """
+    Executa uma tentativa (geração + validação) com cópia opcional.
+    `attempt(cancel)` deve desistir (HedgeCancelled/StreamAborted) quando `cancel`
+    for sinalizado; `spent(valor)` diz quanto (custo, tokens) uma tentativa gastou.
+    """
+
+    def __init__(self, percentile: float = DEFAULT_PERCENTILE,
+                 budget: Optional[Dict[str, float]] = None,
+                 min_samples: int = MIN_SAMPLES, metrics: Optional[Metrics] = None):
+        self.percentile = percentile
+        self.latency = LatencyTracker(min_samples=min_samples)
+        self.budget = HedgeBudget(budget if budget is not None else dict(DEFAULT_BUDGET))
+        self.metrics = metrics
+        self._stats: Dict[str, HedgeStats] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, rarity: str, field: str, value: float = 1):
+        with self._lock:
+            stats = self._stats.setdefault(rarity, HedgeStats())
+            setattr(stats, field, getattr(stats, field) + value)
+
+    def run(self, rarity: str, key: Hashable, attempt: Callable[[threading.Event], T],
+            spent: Callable[[T], Tuple[float, int]]) -> T:
+        self.budget.credit(rarity)
+        self._count(rarity, "jobs")
+        if self.metrics is not None:
+            self.metrics.inc("nft_hedge_jobs_total", rarity=rarity)
+
+        results: "queue.Queue" = queue.Queue()
+        cancels: Dict[str, threading.Event] = {}
+
+        def launch(name: str):
+            cancel = cancels[name] = threading.Event()
+            started = time.perf_counter()
+
+            def target():
+                try:
+                    value = attempt(cancel)
+                except BaseException as e:  # sem resultado na fila, run() esperaria para sempre
+                    results.put((name, None, e, time.perf_counter() - started))
+                else:
+                    results.put((name, value, None, time.perf_counter() - started))
+
+            threading.Thread(target=target, name=f"hedge-{name}", daemon=True).start()
+
+        launch("primary")
+        delay = self.latency.threshold(key, self.percentile)
+        try:
+            first = results.get(timeout=delay) if delay is not None else results.get()
+        except queue.Empty:
+            if self.budget.try_spend(rarity):
+                self._count(rarity, "fired")
+                self._record("fired", rarity)
+                print(f"   🏁 Hedge: {rarity} passou de {delay:.1f}s (p{self.percentile * 100:g}), "
+                      f"disparando cópia")
+                launch("hedge")
+            else:
+                self._count(rarity, "skipped_budget")
+                self._record("skipped_budget", rarity)
+            first = results.get()
+
+        # A primeira aprovada vence; se uma falhar, espera a outra
+        pending = len(cancels) - 1
+        name, value, error, seconds = first
+        while error is not None and pending:
+            # A tentativa reprovada só foi gasto extra porque a cópia existe
+            self._charge_extra(rarity, *_exception_spent(error))
+            name, value, error, seconds = results.get()
+            pending -= 1
+        hedged = len(cancels) > 1
+        if error is not None:
+            raise error
+
+        self.latency.observe(key, seconds)
+        if hedged:
+            if name == "hedge":
+                self._count(rarity, "hedge_wins")
+            if self.metrics is not None:
+                self.metrics.inc("nft_hedge_wins_total", rarity=rarity, winner=name)
+        if pending:
+            for other, cancel in cancels.items():
+                if other != name:
+                    cancel.set()
+            # O perdedor termina em segundo plano; o gasto dele entra como extra
+            threading.Thread(target=self._drain, args=(rarity, key, results, spent),
+                             name="hedge-drain", daemon=True).start()
+        return value
+
+    def _drain(self, rarity: str, key: Hashable, results: "queue.Queue",
+               spent: Callable[[T], Tuple[float, int]]):
+        name, value, error, seconds = results.get()
+        if error is None:
+            self.latency.observe(key, seconds)  # terminou sem ver o cancelamento: amostra válida
+            self._charge_extra(rarity, *spent(value))
+        else:
+            self._charge_extra(rarity, *_exception_spent(error))
+
+    def _charge_extra(self, rarity: str, cost: float, tokens: int):
+        self._count(rarity, "extra_tokens", tokens)
+        self._count(rarity, "extra_cost", cost)
+        if self.metrics is not None:
+            self.metrics.inc("nft_hedge_extra_tokens_total", tokens, rarity=rarity)
+            self.metrics.inc("nft_hedge_extra_cost_dollars_total", cost, rarity=rarity)
+
+    def _record(self, outcome: str, rarity: str):
+        if self.metrics is not None:
+            self.metrics.inc("nft_hedges_total", rarity=rarity, outcome=outcome)
+
+    def summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {rarity: stats.summary() for rarity, stats in sorted(self._stats.items())}
+
+
+def _exception_spent(error: Exception) -> Tuple[float, int]:
+    return getattr(error, "cost", 0.0), getattr(error, "tokens", 0)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Instrumentação leve: contadores, histogramas e gauges calculados sob demanda
+Exposta em texto Prometheus/JSON via HTTP local e num arquivo JSONL periódico
+"""
+
+import json
+import time
+import bisect
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Limites dos buckets em segundos (do parse de JSON até uma geração completa)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Histograma cumulativo de buckets fixos (custo O(log n) por observação)"""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self) -> "Histogram":
+        clone = Histogram(self.bounds)
+        clone.counts = list(self.counts)
+        clone.sum = self.sum
+        clone.count = self.count
+        return clone
+
+    def quantile(self, q: float) -> float:
+        """Estimativa por interpolação linear dentro do bucket (como histogram_quantile)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if i >= len(self.bounds):
+                    return self.bounds[-1]
+                low = self.bounds[i - 1] if i else 0.0
+                return low + (self.bounds[i] - low) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+
+class Metrics:
+    """Registro thread-safe de métricas do agente"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Incrementa um contador"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Registra uma duração (segundos) num histograma"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def gauge(self, name: str, fn: Callable[[], float], help_text: str = ""):
+        """Gauge calculado apenas na leitura (custo zero no caminho quente)"""
+        self._gauges[name] = fn
+        if help_text:
+            self.describe(name, help_text)
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def _read_gauges(self) -> Dict[str, Optional[float]]:
+        values = {}
+        for name, fn in list(self._gauges.items()):
+            try:
+                values[name] = float(fn())
+            except Exception:
+                values[name] = None
+        return values
+
+    def _copy(self):
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {key: h.copy() for key, h in series.items()}
+                          for name, series in self._histograms.items()}
+        return counters, histograms
+
+    def snapshot(self) -> Dict:
+        """Estado atual em formato JSON (uma linha do arquivo de estatísticas)"""
+        counters, histograms = self._copy()
+        result = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "uptime_s": round(time.time() - self.started, 3),
+            "counters": {},
+            "gauges": self._read_gauges(),
+            "histograms": {},
+        }
+        for name, series in sorted(counters.items()):
+            for key, value in sorted(series.items()):
+                result["counters"][name + _format_labels(key)] = value
+        for name, series in sorted(histograms.items()):
+            for key, histogram in sorted(series.items(), key=lambda i: i[0]):
+                result["histograms"][name + _format_labels(key)] = {
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "p50": round(histogram.quantile(0.50), 6),
+                    "p95": round(histogram.quantile(0.95), 6),
+                    "p99": round(histogram.quantile(0.99), 6),
+                }
+        return result
+
+    def render_prometheus(self) -> str:
+        """Formato texto de exposição do Prometheus (0.0.4)"""
+        counters, histograms = self._copy()
+        lines: List[str] = []
+
+        def header(name: str, kind: str):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(counters.items()):
+            header(name, "counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+        for name, value in sorted(self._read_gauges().items()):
+            header(name, "gauge")
+            lines.append(f"{name} {'NaN' if value is None else format(value, 'g')}")
+
+        for name, series in sorted(histograms.items()):
+            header(name, "histogram")
+            for key, histogram in sorted(series.items(), key=lambda i: i[0]):
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                inf = 'le="+Inf"'
+                lines.append(f"{name}_bucket{_format_labels(key, inf)} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:g}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _handler_class():
+    """Handler HTTP criado sob demanda: http.server só é importado se o endpoint for usado"""
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            metrics: Metrics = self.server.metrics
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body = metrics.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/metrics.json":
+                body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return _MetricsHandler
+
+
+class MetricsServer:
+    """Endpoint HTTP local: /metrics (Prometheus) e /metrics.json"""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = "127.0.0.1"):
+        from http.server import ThreadingHTTPServer
+        self.httpd = ThreadingHTTPServer((host, port), _handler_class())
+        self.httpd.daemon_threads = True
+        self.httpd.metrics = metrics
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name="metrics-http", daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+
+
+class StatsFileReporter:
+    """Anexa um snapshot JSON por linha a cada `interval` segundos"""
+
+    def __init__(self, metrics: Metrics, path: Path, interval: float = 60.0):
+        self.metrics = metrics
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-jsonl", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        line = json.dumps(self.metrics.snapshot(), ensure_ascii=False)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def close(self):
+        """Para a thread e grava o snapshot final da sessão"""
+        self._stop.set()
+        self._thread.join()
+        self.write_snapshot()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Roteamento de modelo por raridade: modelo, max_tokens e temperatura por job
+Common/Rare vão para o modelo sem raciocínio (mais rápido, menos tokens);
+Epic/Legendary seguem no reasoner. Estatísticas por rota (latência, aprovação
+na validação, custo) orientam o ajuste da tabela
+"""
+
+import json
+import threading
+from pathlib import Path
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from metrics import Histogram, Metrics
+
+REASONER_MODEL = "deepseek-reasoner"
+CHAT_MODEL = "deepseek-chat"
+
+# fixed = todos os jobs no reasoner (comportamento anterior); rarity = tabela por raridade
+ROUTING_MODES = ("fixed", "rarity")
+
+# Rota única do modo fixed e rota de fallback do modo rarity
+REASONER_MAX_TOKENS = 20000
+DEFAULT_TEMPERATURE = 0.9
+
+# Complexidade a partir da qual o raciocínio compensa (Epic/Legendary)
+REASONER_MIN_COMPLEXITY = 8
+
+# Saída do modelo sem raciocínio: base (JSON + estrutura) + folga por animação exigida
+CHAT_BASE_TOKENS = 2000
+CHAT_TOKENS_PER_ANIMATION = 500
+CHAT_MAX_TOKENS = 8192  # teto de saída do deepseek-chat
+
+# Desfechos de uma tentativa numa rota (cancelled = cópia perdedora do hedge)
+OUTCOMES = ("ok", "repaired", "failed", "cancelled")
+
+
+@dataclass(frozen=True)
+class Route:
+    """Parâmetros de geração de um job"""
+    model: str
+    max_tokens: int
+    temperature: float
+
+    def payload(self, messages: List[Dict]) -> Dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "response_format": {"type": "json_object"}
+        }
+
+
+REASONER_ROUTE = Route(REASONER_MODEL, REASONER_MAX_TOKENS, DEFAULT_TEMPERATURE)
+
+
+@dataclass
+class RouteStats:
+    """Acumulado de uma rota (raridade, modelo)"""
+    attempts: int = 0
+    outcomes: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(OUTCOMES, 0))
+    cost: float = 0.0
+    tokens: int = 0
+    latency: Histogram = field(default_factory=Histogram)
+
+    def summary(self) -> Dict:
+        attempts = max(self.attempts, 1)
+        decided = max(self.attempts - self.outcomes["cancelled"], 1)  # canceladas não foram validadas
+        return {
+            "attempts": self.attempts,
+            **self.outcomes,
+            "pass_rate": round(self.outcomes["ok"] / decided, 3),
+            "success_rate": round((self.outcomes["ok"] + self.outcomes["repaired"]) / decided, 3),
+            "latency_p50_s": round(self.latency.quantile(0.5), 2),
+            "latency_p95_s": round(self.latency.quantile(0.95), 2),
+            "cost_per_attempt": round(self.cost / attempts, 5),
+            "tokens_per_attempt": round(self.tokens / attempts),
+        }
+
+
+def build_routes(complexity_map: Dict[str, Dict], mode: str = "fixed") -> Dict[str, Route]:
+    """Tabela raridade -> rota a partir do complexity_map do agente"""
+    if mode not in ROUTING_MODES:
+        raise ValueError(f"Modo de roteamento desconhecido: {mode}")
+    routes = {}
+    for rarity, reqs in complexity_map.items():
+        if mode == "fixed" or reqs["complexity"] >= REASONER_MIN_COMPLEXITY:
+            routes[rarity] = REASONER_ROUTE
+            continue
+        budget = CHAT_BASE_TOKENS + CHAT_TOKENS_PER_ANIMATION * reqs["min_animations"]
+        # Peças simples toleram menos variação: temperatura cresce com a complexidade
+        routes[rarity] = Route(CHAT_MODEL, min(budget, CHAT_MAX_TOKENS),
+                               round(0.6 + reqs["complexity"] / 25, 2))
+    return routes
+
+
+def load_overrides(path: Path, routes: Dict[str, Route]) -> Dict[str, Route]:
+    """Aplica um JSON {"Common": {"model": ..., "max_tokens": ...}} sobre a tabela"""
+    overrides = json.loads(Path(path).read_text(encoding="utf-8"))
+    merged = dict(routes)
+    for rarity, fields in overrides.items():
+        if rarity not in merged:
+            raise ValueError(f"Raridade desconhecida em {path}: {rarity}")
+        unknown = set(fields) - set(Route.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"Campos desconhecidos em {path} ({rarity}): {', '.join(sorted(unknown))}")
+        merged[rarity] = Route(**{**asdict(merged[rarity]), **fields})
+    return merged
+
+
+class ModelRouter:
+    """Escolhe a rota de cada job e contabiliza o desempenho por rota"""
+
+    def __init__(self, complexity_map: Dict[str, Dict], mode: str = "fixed",
+                 fallback: bool = True, routes_file: Optional[Path] = None,
+                 metrics: Optional[Metrics] = None):
+        self.mode = mode
+        self.routes = build_routes(complexity_map, mode)
+        if routes_file:
+            self.routes = load_overrides(routes_file, self.routes)
+        self.fallback = fallback
+        self.metrics = metrics
+        self._stats: Dict[Tuple[str, str], RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def route(self, rarity: str) -> Route:
+        return self.routes[rarity]
+
+    def models(self) -> Dict[str, str]:
+        """Raridade -> modelo, para a estimativa de custo por modelo do agendador"""
+        return {rarity: route.model for rarity, route in self.routes.items()}
+
+    def fallback_for(self, route: Route) -> Optional[Route]:
+        """Rota mais forte para repetir um job reprovado na validação (None = sem fallback)"""
+        if not self.fallback or route.model == REASONER_ROUTE.model:
+            return None
+        return REASONER_ROUTE
+
+    def record(self, rarity: str, route: Route, outcome: str, seconds: float,
+               cost: float, tokens: int):
+        """Registra uma tentativa (geração + reparos) numa rota"""
+        with self._lock:
+            stats = self._stats.setdefault((rarity, route.model), RouteStats())
+            stats.attempts += 1
+            stats.outcomes[outcome] += 1
+            stats.cost += cost
+            stats.tokens += tokens
+            stats.latency.observe(seconds)
+        if self.metrics is not None:
+            labels = {"rarity": rarity, "model": route.model}
+            self.metrics.inc("nft_route_attempts_total", outcome=outcome, **labels)
+            self.metrics.observe("nft_route_seconds", seconds, **labels)
+            self.metrics.inc("nft_route_cost_dollars_total", cost, **labels)
+
+    def record_fallback(self, rarity: str, route: Route, fallback: Route):
+        if self.metrics is not None:
+            self.metrics.inc("nft_route_fallbacks_total", rarity=rarity,
+                             model=route.model, to=fallback.model)
+
+    def summary(self) -> List[Dict]:
+        with self._lock:
+            items = sorted(self._stats.items())
+            return [{"rarity": rarity, "model": model, **stats.summary()}
+                    for (rarity, model), stats in items]
+
+    def format_summary(self) -> List[str]:
+        lines = []
+        for row in self.summary():
+            lines.append(
+                f"{row['rarity']:<10} {row['model']:<18} {row['attempts']:>4} tentativas | "
+                f"aprovação {row['pass_rate']:.0%} (com reparo {row['success_rate']:.0%}) | "
+                f"p50 {row['latency_p50_s']:.1f}s | ${row['cost_per_attempt']:.4f}/tentativa"
+            )
+        return lines
+
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Detecção de quase-duplicatas na coleção inteira (MinHash + LSH)
+A impressão digital é estrutural: k-gramas da sequência de elementos/animações,
+geometria grosseira e paleta quantizada. SVGs com a mesma estrutura e números
+ou cores ligeiramente diferentes colidem; o hash exato (nft_store) não pega isso.
+
+Uso: python near_duplicates.py build [nfts_dir] [--threshold 0.85] [--workers N]
+     python near_duplicates.py check arte.svg [nfts_dir] [--threshold 0.85]
+"""
+
+import sys
+import math
+import time
+import zlib
+import sqlite3
+import argparse
+import threading
+from array import array
+from bisect import bisect_left
+from operator import eq
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from xml.parsers import expat
+
+from svg_analyzer import normalize_color, parse_duration
+from svg_validator import ANIMATION_TAGS
+
+# Versão da impressão digital: mudou a extração, o índice precisa de rebuild
+FINGERPRINT_VERSION = 1
+NUM_PERM = 64
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.85
+
+# Geometria em grade de 100 unidades (viewBox 1000): deslocamentos pequenos não contam
+GEOMETRY_ATTRIBUTES = ("cx", "cy", "r", "x", "y", "width", "height", "rx", "ry")
+GEOMETRY_GRID = 100.0
+
+# Atributos de onde sai a paleta (values: cores animadas)
+COLOR_SOURCES = ("fill", "stroke", "stop-color", "values")
+
+# MinHash de uma permutação (OPH): o hash de cada shingle escolhe um dos NUM_PERM
+# compartimentos (bits altos) e disputa o mínimo nele (bits baixos); O(shingles)
+_BIN_SHIFT = 64 - (NUM_PERM.bit_length() - 1)
+_MASK32 = 0xFFFFFFFF
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_EMPTY = 1 << 32
+_ROTATION = 0x9E3779B1  # deslocamento por distância na densificação
+
+# Inserções recentes ficam num dict; acima disso são fundidas nos arrays ordenados
+MERGE_THRESHOLD = 2048
+
+# Entrada do bucket: chave da banda (40 bits) e número da linha (24 bits) num inteiro
+_ROW_BITS = 24
+_ROW_MASK = (1 << _ROW_BITS) - 1
+_KEY_MASK = (1 << 40) - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- nunca reutilizado: leitura incremental
+    folder TEXT NOT NULL UNIQUE,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+@dataclass
+class Match:
+    """Obra já indexada parecida com a consultada"""
+    folder: str
+    similarity: float  # Jaccard estimado pelas assinaturas
+
+
+def _token_hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def _duration_bucket(value: Optional[str]) -> str:
+    """Duração em faixas log2 (3s e 3.2s são a mesma faixa; 3s e 12s não)"""
+    seconds = parse_duration(value)
+    return str(round(math.log2(seconds))) if seconds else "-"
+
+
+def svg_shingles(svg_code: str) -> Set[int]:
+    """Conjunto de shingles estruturais (hashes de 32 bits) de um SVG"""
+    sequence: List[str] = []
+    features: Set[str] = set()
+    stack: List[str] = []
+
+    def start(name: str, attrs: Dict[str, str]):
+        tag = name.rsplit(":", 1)[-1]
+        parent = stack[-1] if stack else ""
+        stack.append(tag)
+        if tag in ANIMATION_TAGS:
+            target = attrs.get("type") or attrs.get("attributeName", "")
+            token = f"{parent}>{tag}:{target}@{_duration_bucket(attrs.get('dur'))}"
+        else:
+            token = f"{parent}>{tag}"
+            for attr in GEOMETRY_ATTRIBUTES:
+                value = attrs.get(attr)
+                if value:
+                    try:
+                        features.add(f"{tag}.{attr}={round(float(value) / GEOMETRY_GRID)}")
+                    except ValueError:
+                        pass
+        sequence.append(token)
+        features.add(f"{tag}[{','.join(sorted(attrs))}]")
+        for attr in COLOR_SOURCES:
+            value = attrs.get(attr)
+            if not value or value[0] == "u" or value == "none":
+                continue  # url(#...) e none não são cores
+            for color in normalize_color(value):
+                # 3 bits por canal: variações de tom caem na mesma célula
+                features.add(f"color:{int(color[1:], 16) >> 5 & 0x70707:x}")
+
+    def end(name: str):
+        stack.pop()
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    try:
+        parser.Parse(svg_code.encode("utf-8") if isinstance(svg_code, str) else svg_code, True)
+    except expat.ExpatError:
+        pass  # impressão do que foi lido
+
+    # k-gramas da sequência de elementos; repetições consecutivas idênticas contam uma vez
+    compact = [t for i, t in enumerate(sequence) if i == 0 or t != sequence[i - 1]]
+    for i in range(max(1, len(compact) - SHINGLE_SIZE + 1)):
+        features.add("|".join(compact[i:i + SHINGLE_SIZE]))
+    return {_token_hash(f) for f in features}
+
+
+def _mix64(x: int) -> int:
+    """Finalizador splitmix64: espalha os bits do crc32 pelos 64 bits"""
+    z = (x + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def minhash(shingles: Iterable[int]) -> array:
+    """Assinatura com NUM_PERM valores de 32 bits (OPH + densificação por rotação)"""
+    bins = [_EMPTY] * NUM_PERM
+    for shingle in shingles:
+        z = _mix64(shingle)
+        index, value = z >> _BIN_SHIFT, z & _MASK32
+        if value < bins[index]:
+            bins[index] = value
+    if _EMPTY not in bins:
+        return array("I", bins)
+    signature = array("I", [0] * NUM_PERM)
+    if all(v == _EMPTY for v in bins):
+        return signature
+    # Compartimento vazio herda o próximo não vazio (circular), marcado pela distância
+    for i in range(NUM_PERM):
+        distance = 0
+        while bins[(i + distance) % NUM_PERM] == _EMPTY:
+            distance += 1
+        signature[i] = (bins[(i + distance) % NUM_PERM] + distance * _ROTATION) & _MASK32
+    return signature
+
+
+def fingerprint(svg_code: str) -> bytes:
+    """Assinatura serializada (bytes) de um SVG; picklable para pools de processos"""
+    return minhash(svg_shingles(svg_code)).tobytes()
+
+
+def _agreement(a: array, b: array) -> float:
+    """Fração de posições iguais: estimativa do Jaccard entre os conjuntos de shingles"""
+    return sum(map(eq, a, b)) / NUM_PERM
+
+
+def bands_for(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    (bandas, linhas) com b*r = num_perm e ponto de inflexão (1/b)^(1/r) um pouco
+    abaixo do limiar: poucos falsos negativos; os candidatos são conferidos depois
+    """
+    target = threshold * 0.85
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - target))
+
+
+class _Band:
+    """
+    Buckets de uma banda: array ordenado de inteiros (chave de 40 bits << 24 | linha),
+    8 bytes por obra, consultado por bisect; inserções recentes num dict até a fusão
+    """
+
+    __slots__ = ("entries", "recent", "recent_count")
+
+    def __init__(self):
+        self.entries = array("Q")
+        self.recent: Dict[int, List[int]] = {}
+        self.recent_count = 0
+
+    def add(self, key: int, row: int):
+        self.recent.setdefault(key, []).append(row)
+        self.recent_count += 1
+
+    def lookup(self, key: int) -> Iterator[int]:
+        entries = self.entries
+        i = bisect_left(entries, key << _ROW_BITS)
+        while i < len(entries) and entries[i] >> _ROW_BITS == key:
+            yield entries[i] & _ROW_MASK
+            i += 1
+        yield from self.recent.get(key, ())
+
+    def merge(self):
+        if not self.recent_count:
+            return
+        packed = [key << _ROW_BITS | row for key, rows in self.recent.items() for row in rows]
+        self.entries.extend(packed)
+        self.entries = array("Q", sorted(self.entries))  # Timsort: duas sequências ordenadas
+        self.recent.clear()
+        self.recent_count = 0
+
+    def nbytes(self) -> int:
+        return self.entries.itemsize * len(self.entries) + self.recent_count * 40
+
+
+class NearDuplicateIndex:
+    """
+    Índice LSH em memória, persistido em SQLite (só as assinaturas).
+    Seguro entre threads; vários processos compartilham o arquivo e cada
+    consulta primeiro lê as assinaturas gravadas pelos outros (incremental).
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.bands, self.rows_per_band = bands_for(threshold)
+        self._band_width = self.rows_per_band * 4  # bytes por banda
+        self._lock = threading.Lock()
+        self._folders: List[str] = []
+        self._known: Set[str] = set()
+        self._signatures = array("I")
+        self._buckets = [_Band() for _ in range(self.bands)]
+        self._pending: Dict[str, bytes] = {}  # aceitas, ainda não publicadas
+        self._last_seq = 0
+
+        self._conn = None
+        if db_path is not None:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._check_version()
+            self._refresh()
+
+    def _check_version(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        version = f"{FINGERPRINT_VERSION}:{NUM_PERM}"
+        if row is None:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+        elif row[0] != version:
+            # Assinaturas de outra versão não são comparáveis: recomeça (rode `build`)
+            print(f"⚠️ Índice de quase-duplicatas na versão {row[0]}; reconstruindo vazio")
+            with self._conn:
+                self._conn.execute("DELETE FROM signatures")
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self) -> int:
+        return len(self._folders)
+
+    # --- estrutura em memória ------------------------------------------------
+
+    def _band_keys(self, signature: bytes) -> Iterator[Tuple[int, int]]:
+        width = self._band_width
+        for band in range(self.bands):
+            # hash() de bytes é estável dentro do processo; os buckets são reconstruídos no load
+            yield band, hash(signature[band * width:(band + 1) * width]) & _KEY_MASK
+
+    def _insert_memory(self, folder: str, signature: bytes, merge: bool = True):
+        if folder in self._known:
+            return
+        row = len(self._folders)
+        if row > _ROW_MASK:
+            raise OverflowError(f"Índice limitado a {_ROW_MASK + 1} obras")
+        self._folders.append(folder)
+        self._known.add(folder)
+        self._signatures.frombytes(signature)
+        for band, key in self._band_keys(signature):
+            bucket = self._buckets[band]
+            bucket.add(key, row)
+            if merge and bucket.recent_count >= max(MERGE_THRESHOLD, len(bucket.entries) // 8):
+                bucket.merge()
+
+    def _refresh(self):
+        """Carrega assinaturas gravadas (por este ou outros processos) desde a última leitura"""
+        if self._conn is None:
+            return
+        rows = self._conn.execute(
+            "SELECT seq, folder, signature FROM signatures WHERE seq > ? ORDER BY seq",
+            (self._last_seq,)).fetchall()
+        bulk = len(rows) > MERGE_THRESHOLD
+        for seq, folder, signature in rows:
+            self._insert_memory(folder, signature, merge=not bulk)
+            self._last_seq = seq
+        if bulk:
+            for bucket in self._buckets:
+                bucket.merge()
+
+    def _similarity(self, signature: array, row: int) -> float:
+        start = row * NUM_PERM
+        return _agreement(signature, self._signatures[start:start + NUM_PERM])
+
+    # --- API -----------------------------------------------------------------
+
+    def query(self, signature: bytes, refresh: bool = True) -> Optional[Match]:
+        """Obra mais parecida com similaridade >= limiar (ou None)"""
+        values = array("I")
+        values.frombytes(signature)
+        with self._lock:
+            if refresh:
+                self._refresh()
+            best: Optional[Match] = None
+            seen: Set[int] = set()
+            for band, key in self._band_keys(signature):
+                for row in self._buckets[band].lookup(key):
+                    if row in seen:
+                        continue
+                    seen.add(row)
+                    similarity = self._similarity(values, row)
+                    if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                        best = Match(self._folders[row], similarity)
+            # Obras aceitas por outras threads que ainda estão sendo publicadas
+            for folder, pending in self._pending.items():
+                other = array("I")
+                other.frombytes(pending)
+                similarity = _agreement(values, other)
+                if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                    best = Match(folder, similarity)
+            return best
+
+    def reserve(self, folder: str, signature: bytes):
+        """Marca uma obra aceita e em publicação (visível para consultas concorrentes)"""
+        with self._lock:
+            self._pending[folder] = signature
+
+    def release(self, folder: str):
+        """Desiste da reserva (publicação cancelada ou duplicata exata)"""
+        with self._lock:
+            self._pending.pop(folder, None)
+
+    def commit(self, folder: str):
+        """A obra reservada foi publicada: entra no índice"""
+        with self._lock:
+            signature = self._pending.get(folder)
+        if signature is not None:
+            self.add(folder, signature)
+
+    def add(self, folder: str, signature: bytes):
+        """Indexa uma obra publicada (memória + SQLite)"""
+        with self._lock:
+            self._pending.pop(folder, None)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("INSERT OR IGNORE INTO signatures (folder, signature) "
+                                       "VALUES (?, ?)", (folder, signature))
+                self._refresh()
+            else:
+                self._insert_memory(folder, signature)
+
+    def add_many(self, items: Iterable[Tuple[str, bytes]]):
+        """Inserção em lote (bulk build): uma transação e uma fusão no final"""
+        with self._lock:
+            items = list(items)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.executemany("INSERT OR IGNORE INTO signatures (folder, signature) "
+                                           "VALUES (?, ?)", items)
+                self._refresh()
+            else:
+                for folder, signature in items:
+                    self._insert_memory(folder, signature, merge=False)
+            for bucket in self._buckets:
+                bucket.merge()
+
+    def clear(self):
+        with self._lock:
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM signatures")
+            self._folders.clear()
+            self._known.clear()
+            self._signatures = array("I")
+            self._buckets = [_Band() for _ in range(self.bands)]
+
+    def memory_bytes(self) -> int:
+        """Estimativa do que o índice ocupa em memória (arrays + nomes das pastas)"""
+        folders = sum(sys.getsizeof(f) for f in self._folders) + sys.getsizeof(self._folders)
+        return (self._signatures.itemsize * len(self._signatures) + folders
+                + sys.getsizeof(self._known)
+                + sum(bucket.nbytes() for bucket in self._buckets))
+
+    def stats(self) -> Dict:
+        return {"indexed": len(self._folders), "threshold": self.threshold,
+                "bands": self.bands, "rows_per_band": self.rows_per_band,
+                "memory_mb": round(self.memory_bytes() / 1024 / 1024, 2)}
+
+
+def _fingerprint_folder(folder_path: str) -> Optional[bytes]:
+    try:
+        return fingerprint((Path(folder_path) / "artwork.svg").read_text(encoding="utf-8"))
+    except OSError:
+        return None
+
+
+def build(nfts_dir: Path, threshold: float = DEFAULT_THRESHOLD, workers: int = 0,
+          batch_size: int = 1000) -> Dict:
+    """
+    Reconstrói o índice a partir das obras em disco. Retorna estatísticas e os pares
+    de quase-duplicatas já existentes (cada obra comparada com as anteriores)
+    """
+    from catalog_index import iter_metadata_files
+
+    folders = [m["folder"] for m in iter_metadata_files(nfts_dir)]
+    paths = [str(nfts_dir / folder) for folder in folders]
+    started = time.perf_counter()
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers) as pool:
+            signatures = list(pool.map(_fingerprint_folder, paths, chunksize=64))
+    else:
+        signatures = [_fingerprint_folder(p) for p in paths]
+    fingerprint_seconds = time.perf_counter() - started
+
+    # Cada obra é comparada com as anteriores num índice em memória; o SQLite
+    # recebe todas as assinaturas numa única transação no final
+    memory = NearDuplicateIndex(threshold=threshold)
+    pairs: List[Tuple[str, str, float]] = []
+    items: List[Tuple[str, bytes]] = []
+    for folder, signature in zip(folders, signatures):
+        if signature is None:
+            continue
+        match = memory.query(signature, refresh=False)
+        if match is not None:
+            pairs.append((folder, match.folder, match.similarity))
+        memory.add(folder, signature)
+        items.append((folder, signature))
+
+    index = NearDuplicateIndex(nfts_dir / "near_duplicates.db", threshold)
+    index.clear()
+    for start in range(0, len(items), batch_size):
+        index.add_many(items[start:start + batch_size])
+    result = {**index.stats(), "fingerprint_s": round(fingerprint_seconds, 2),
+              "total_s": round(time.perf_counter() - started, 2), "near_duplicates": pairs}
+    index.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="Reconstrói o índice a partir de nfts/")
+    build_cmd.add_argument("nfts_dir", nargs="?", type=Path, default=Path.cwd() / "nfts")
+    build_cmd.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    build_cmd.add_argument("--workers", type=int, default=0, help="Processos (0 = sequencial)")
+    check_cmd = commands.add_parser("check", help="Procura quase-duplicatas de um SVG")
+    check_cmd.add_argument("svg", type=Path)
+    check_cmd.add_argument("nfts_dir", nargs="?", type=Path, default=Path.cwd() / "nfts")
+    check_cmd.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        result = build(args.nfts_dir, args.threshold, args.workers)
+        print(f"✅ {result['indexed']} obras indexadas em {result['total_s']}s "
+              f"(impressões: {result['fingerprint_s']}s, memória ~{result['memory_mb']} MB, "
+              f"{result['bands']} bandas x {result['rows_per_band']} linhas)")
+        for folder, other, similarity in result["near_duplicates"]:
+            print(f"   🔁 {folder} ≈ {other} ({similarity:.0%})")
+        print(f"🔁 Quase-duplicatas na coleção: {len(result['near_duplicates'])}")
+        return 0
+
+    index = NearDuplicateIndex(args.nfts_dir / "near_duplicates.db", args.threshold)
+    started = time.perf_counter()
+    signature = fingerprint(args.svg.read_text(encoding="utf-8"))
+    fingerprinted = time.perf_counter()
+    match = index.query(signature)
+    finished = time.perf_counter()
+    index.close()
+    print(f"⏱️ Impressão {1000 * (fingerprinted - started):.2f} ms, "
+          f"consulta {1000 * (finished - fingerprinted):.3f} ms ({len(index)} obras)")
+    if match is None:
+        print("✅ Nenhuma quase-duplicata")
+        return 0
+    print(f"🔁 Quase-duplicata de {match.folder} ({match.similarity:.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Coleção empacotada num único arquivo append-only com índice de offsets
+Em vez de dezenas de milhares de pastas pequenas (inodes, metadados, listagens
+a frio), um bundle nfts/collection.bundle e o índice collection.bundle.idx
+(id/pasta -> offset, tamanho). A leitura é por mmap: os arquivos saem como
+memoryview sobre o bundle, sem cópia, e o layout de pastas pode ser refeito.
+
+Uso: python nft_bundle.py export [nfts_dir] [--bundle arquivo]
+     python nft_bundle.py unpack destino [--bundle arquivo]
+     python nft_bundle.py verify [nfts_dir] [--bundle arquivo] [--compare]
+     python nft_bundle.py cat id|hash|pasta [arquivo] [--bundle arquivo]
+"""
+
+import os
+import sys
+import mmap
+import zlib
+import struct
+import hashlib
+import argparse
+import threading
+import contextlib
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl  # trava entre processos: workers apontando para o mesmo nfts/
+except ImportError:  # Windows: só a trava entre threads
+    fcntl = None
+
+from catalog_index import iter_metadata_files
+from preview import ASSETS_DIR
+
+BUNDLE_NAME = "collection.bundle"
+INDEX_SUFFIX = ".idx"
+
+# Cabeçalhos dos arquivos: mudou o formato, muda a versão
+BUNDLE_MAGIC = b"NFTBDL01"
+INDEX_MAGIC = b"NFTIDX01"
+
+# Registro: marca, tamanho do corpo e crc32 do corpo. O corpo traz id, pasta,
+# o diretório (nome, tamanho) de cada arquivo e depois os bytes em sequência
+RECORD_HEADER = struct.Struct("<4sQI")
+RECORD_MAGIC = b"NREC"
+_U16 = struct.Struct("<H")
+_U64 = struct.Struct("<Q")
+
+# Entrada do índice de tamanho fixo: id, pasta, offset e tamanho do registro
+# (pastas antigas usam a própria pasta como id, por isso o id tem a mesma largura)
+KEY_WIDTH = 48
+INDEX_ENTRY = struct.Struct(f"<{KEY_WIDTH}s{KEY_WIDTH}sQQ")
+# Chaves maiores que KEY_WIDTH (nfts/<raridade>_<nome>_<ts>/ com nome longo) vão
+# para o índice como marca + sha256; o texto completo é lido do próprio registro
+LONG_KEY_MARK = b"\xff"  # nunca inicia um texto UTF-8 válido
+LONG_KEY_SIZE = len(LONG_KEY_MARK) + hashlib.sha256().digest_size
+
+# Pacotes por fsync no export
+EXPORT_BATCH = 500
+
+
+@dataclass(frozen=True)
+class BundleEntry:
+    """Posição de um pacote no bundle (registro inteiro, cabeçalho incluso)"""
+    nft_id: str
+    folder: str
+    offset: int
+    length: int
+
+
+def _pack_str(text: str) -> bytes:
+    data = text.encode("utf-8")
+    return _U16.pack(len(data)) + data
+
+
+def _unpack_str(buf, pos: int) -> Tuple[str, int]:
+    (size,) = _U16.unpack_from(buf, pos)
+    pos += _U16.size
+    return bytes(buf[pos:pos + size]).decode("utf-8"), pos + size
+
+
+def encode_record(nft_id: str, folder: str, files: Dict[str, bytes]) -> bytes:
+    """Registro completo (cabeçalho + corpo) de um pacote"""
+    parts = [_pack_str(nft_id), _pack_str(folder), _U16.pack(len(files))]
+    for name, data in files.items():
+        parts.append(_pack_str(name))
+        parts.append(_U64.pack(len(data)))
+    parts.extend(files.values())
+    body = b"".join(parts)
+    return RECORD_HEADER.pack(RECORD_MAGIC, len(body), zlib.crc32(body)) + body
+
+
+def decode_directory(buf, offset: int) -> Tuple[str, str, List[Tuple[str, int, int]]]:
+    """(id, pasta, [(arquivo, offset absoluto, tamanho)]) do registro em `offset`"""
+    magic, _, _ = RECORD_HEADER.unpack_from(buf, offset)
+    if magic != RECORD_MAGIC:
+        raise ValueError(f"Registro inválido no offset {offset}")
+    pos = offset + RECORD_HEADER.size
+    nft_id, pos = _unpack_str(buf, pos)
+    folder, pos = _unpack_str(buf, pos)
+    (count,) = _U16.unpack_from(buf, pos)
+    pos += _U16.size
+    sizes = []
+    for _ in range(count):
+        name, pos = _unpack_str(buf, pos)
+        (size,) = _U64.unpack_from(buf, pos)
+        pos += _U64.size
+        sizes.append((name, size))
+    files = []
+    for name, size in sizes:
+        files.append((name, pos, size))
+        pos += size
+    return nft_id, folder, files
+
+
+def read_folder(path: Path) -> Dict[str, bytes]:
+    """Arquivos de uma pasta de NFT (subpastas e temporários ficam de fora)"""
+    files = {}
+    for child in sorted(path.iterdir()):
+        if child.is_file() and not child.name.startswith("."):
+            files[child.name] = child.read_bytes()
+    return files
+
+
+class CollectionBundle:
+    """
+    Bundle append-only + índice. Escritas sob trava (threads e processos):
+    o registro é gravado e sincronizado antes da entrada do índice, então um
+    leitor nunca vê no índice um pacote incompleto. Leituras são por mmap.
+    """
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        self.fsync = fsync
+        self._entries: List[BundleEntry] = []
+        self._by_key: Dict[str, BundleEntry] = {}
+        self._index_pos = len(INDEX_MAGIC)
+        self._map: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._lock = threading.RLock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Modo append: toda escrita vai para o fim, mesmo entre processos
+        self._data = open(self.path, "a+b")
+        self._index = open(self.index_path, "a+b")
+        with self._locked():
+            for handle, magic in ((self._data, BUNDLE_MAGIC), (self._index, INDEX_MAGIC)):
+                if _file_size(handle) == 0:
+                    handle.write(magic)
+                    self._sync(handle)
+                handle.seek(0)
+                if handle.read(len(magic)) != magic:
+                    raise ValueError(f"{handle.name} não é um bundle/índice compatível")
+            self._recover()
+
+    # --- trava e durabilidade ---
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._data.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._data.fileno(), fcntl.LOCK_UN)
+
+    def _sync(self, handle):
+        handle.flush()
+        if self.fsync:
+            os.fsync(handle.fileno())
+
+    # --- índice ---
+
+    def _add(self, entry: BundleEntry):
+        self._entries.append(entry)
+        self._by_key[entry.nft_id] = entry
+        self._by_key[entry.folder] = entry
+        self._by_key[entry.folder.rsplit("/", 1)[-1]] = entry  # hash do conteúdo
+
+    def _load_index(self, data_size: int) -> int:
+        """Lê entradas novas do índice; devolve o offset de uma entrada inválida (ou -1)"""
+        self._index.seek(self._index_pos)
+        raw = self._index.read()
+        whole = len(raw) - len(raw) % INDEX_ENTRY.size
+        for nft_id, folder, offset, length in INDEX_ENTRY.iter_unpack(raw[:whole]):
+            if offset + length > data_size:
+                return self._index_pos
+            if nft_id.startswith(LONG_KEY_MARK) or folder.startswith(LONG_KEY_MARK):
+                full_id, full_folder = self._read_keys(offset)
+            else:
+                full_id, full_folder = (nft_id.rstrip(b"\0").decode("utf-8"),
+                                        folder.rstrip(b"\0").decode("utf-8"))
+            self._add(BundleEntry(full_id, full_folder, offset, length))
+            self._index_pos += INDEX_ENTRY.size
+        return -1 if whole == len(raw) else self._index_pos
+
+    def _read_keys(self, offset: int) -> Tuple[str, str]:
+        """id e pasta completos do registro em `offset` (entradas com chave longa)"""
+        fd = self._data.fileno()
+        pos = offset + RECORD_HEADER.size
+        keys = []
+        for _ in range(2):
+            (size,) = _U16.unpack(os.pread(fd, _U16.size, pos))
+            keys.append(os.pread(fd, size, pos + _U16.size).decode("utf-8"))
+            pos += _U16.size + size
+        return keys[0], keys[1]
+
+    def refresh(self) -> int:
+        """Incorpora pacotes adicionados por outros processos; devolve quantos"""
+        with self._lock:
+            before = len(self._entries)
+            self._load_index(_file_size(self._data))
+            return len(self._entries) - before
+
+    def _recover(self):
+        """
+        Sob a trava: descarta entradas/registros incompletos de uma gravação
+        interrompida e reindexa registros íntegros que ficaram sem entrada
+        """
+        data_size = _file_size(self._data)
+        torn = self._load_index(data_size)
+        if torn >= 0:
+            self._index.truncate(torn)
+            self._sync(self._index)
+
+        tail = self._entries[-1].offset + self._entries[-1].length if self._entries else len(BUNDLE_MAGIC)
+        recovered = []
+        while tail < data_size:
+            self._data.seek(tail)
+            header = self._data.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            magic, body_size, crc = RECORD_HEADER.unpack(header)
+            body = self._data.read(body_size) if magic == RECORD_MAGIC else b""
+            if len(body) != body_size or zlib.crc32(body) != crc:
+                break
+            nft_id, folder, _ = decode_directory(header + body, 0)
+            recovered.append(BundleEntry(nft_id, folder, tail, RECORD_HEADER.size + body_size))
+            tail += RECORD_HEADER.size + body_size
+        if tail < data_size:
+            print(f"⚠️ Bundle: {data_size - tail} bytes de uma gravação incompleta descartados")
+            self._data.truncate(tail)
+            self._sync(self._data)
+        if recovered:
+            self._write_index(recovered, b"".join(map(_pack_entry, recovered)))
+            print(f"♻️ Bundle: {len(recovered)} pacotes reindexados")
+
+    def _write_index(self, entries: List[BundleEntry], packed: bytes):
+        self._index.write(packed)
+        self._sync(self._index)
+        self._index_pos += len(entries) * INDEX_ENTRY.size
+        for entry in entries:
+            self._add(entry)
+
+    # --- escrita ---
+
+    def append(self, nft_id: str, folder: str, files: Dict[str, bytes]) -> Optional[BundleEntry]:
+        """Acrescenta um pacote; None se a pasta/id já estiver no bundle"""
+        added = self.append_many([(nft_id, folder, files)])
+        return added[0] if added else None
+
+    def append_many(self, packages: Iterable[Tuple[str, str, Dict[str, bytes]]]) -> List[BundleEntry]:
+        """Acrescenta os pacotes ausentes com um único fsync de dados e um de índice"""
+        with self._locked():
+            self._recover()  # outro processo pode ter escrito (ou morrido escrevendo)
+            offset = _file_size(self._data)
+            records, entries, packed, seen = [], [], [], set()
+            for nft_id, folder, files in packages:
+                if nft_id in self._by_key or folder in self._by_key or folder in seen:
+                    continue
+                seen.add(folder)
+                record = encode_record(nft_id, folder, files)
+                entry = BundleEntry(nft_id, folder, offset, len(record))
+                packed.append(_pack_entry(entry))  # valida antes de gravar qualquer byte
+                entries.append(entry)
+                records.append(record)
+                offset += len(record)
+            if not records:
+                return []
+            self._data.write(b"".join(records))
+            self._sync(self._data)
+            self._write_index(entries, b"".join(packed))
+        return entries
+
+    # --- leitura ---
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._by_key
+
+    def __iter__(self) -> Iterator[BundleEntry]:
+        return iter(list(self._entries))
+
+    @property
+    def size(self) -> int:
+        return _file_size(self._data)
+
+    def get(self, key: str) -> Optional[BundleEntry]:
+        """Entrada por id, pasta (ab/cd/<hash>) ou hash do conteúdo"""
+        return self._by_key.get(key)
+
+    def _buffer(self, end: int) -> memoryview:
+        """Mapeamento que cobre até `end`; cresce junto com o bundle"""
+        view = self._view
+        if view is None or len(view) < end:
+            with self._lock:
+                if self._view is None or len(self._view) < end:
+                    # O mapa antigo só fecha quando as memoryviews entregues forem soltas
+                    self._map = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._view = memoryview(self._map)
+                view = self._view
+        return view
+
+    def files(self, key: str) -> Dict[str, memoryview]:
+        """Arquivos do pacote como memoryview sobre o mmap (sem cópia)"""
+        entry = self._by_key.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return self._entry_files(entry)
+
+    def _entry_files(self, entry: BundleEntry) -> Dict[str, memoryview]:
+        view = self._buffer(entry.offset + entry.length)
+        _, _, files = decode_directory(view, entry.offset)
+        return {name: view[start:start + size] for name, start, size in files}
+
+    def read(self, key: str, name: str) -> memoryview:
+        """Um arquivo do pacote (ex.: artwork.svg) sem cópia"""
+        try:
+            return self.files(key)[name]
+        except KeyError:
+            raise KeyError(f"{key}/{name}") from None
+
+    def locate(self, key: str, name: str) -> Tuple[int, int]:
+        """(offset, tamanho) do arquivo dentro do bundle, para os.sendfile"""
+        entry = self._by_key.get(key)
+        if entry is None:
+            raise KeyError(key)
+        _, _, files = decode_directory(self._buffer(entry.offset + entry.length), entry.offset)
+        for file_name, start, size in files:
+            if file_name == name:
+                return start, size
+        raise KeyError(f"{key}/{name}")
+
+    def iter_packages(self) -> Iterator[Tuple[BundleEntry, Dict[str, memoryview]]]:
+        """Varredura completa, na ordem do arquivo (leitura sequencial)"""
+        entries = list(self._entries)
+        if not entries:
+            return
+        self._buffer(entries[-1].offset + entries[-1].length)
+        if hasattr(self._map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        for entry in entries:
+            yield entry, self._entry_files(entry)
+
+    def verify(self) -> List[str]:
+        """Confere o crc32 de todos os registros; devolve os problemas encontrados"""
+        problems = []
+        for entry in list(self._entries):
+            view = self._buffer(entry.offset + entry.length)
+            magic, body_size, crc = RECORD_HEADER.unpack_from(view, entry.offset)
+            start = entry.offset + RECORD_HEADER.size
+            if magic != RECORD_MAGIC or RECORD_HEADER.size + body_size != entry.length:
+                problems.append(f"{entry.folder}: cabeçalho inválido")
+            elif zlib.crc32(view[start:start + body_size]) != crc:
+                problems.append(f"{entry.folder}: crc32 não confere")
+        return problems
+
+    def close(self):
+        with self._lock:
+            if self._view is not None:
+                self._view.release()
+                self._view = None
+            if self._map is not None:
+                with contextlib.suppress(BufferError):  # memoryviews ainda em uso
+                    self._map.close()
+                self._map = None
+            self._data.close()
+            self._index.close()
+
+
+def _pack_entry(entry: BundleEntry) -> bytes:
+    keys = []
+    for text in (entry.nft_id, entry.folder):
+        data = text.encode("utf-8")
+        if len(data) > 0xFFFF:
+            raise ValueError(f"'{text[:40]}...' excede o tamanho máximo de chave do bundle")
+        if len(data) > KEY_WIDTH:
+            data = LONG_KEY_MARK + hashlib.sha256(data).digest()
+        keys.append(data)
+    return INDEX_ENTRY.pack(*keys, entry.offset, entry.length)
+
+
+def _file_size(handle) -> int:
+    return os.fstat(handle.fileno()).st_size
+
+
+def export(nfts_dir: Path, bundle: CollectionBundle, batch_size: int = EXPORT_BATCH) -> Tuple[int, int]:
+    """
+    Empacota as pastas ainda ausentes do bundle; devolve (adicionados, já presentes).
+    Mesmo conjunto do catálogo: shards (nfts/ab/cd/<hash>) e pastas antigas (nfts/<pasta>)
+    """
+    nfts_dir = Path(nfts_dir)
+    packages = sorted((m["folder"], m["id"]) for m in iter_metadata_files(nfts_dir))
+    if (nfts_dir / ASSETS_DIR).is_dir():
+        packages.insert(0, (ASSETS_DIR, ASSETS_DIR))
+
+    added = present = 0
+    batch = []
+    for folder, nft_id in packages:
+        if folder in bundle:
+            present += 1
+            continue
+        batch.append((nft_id, folder, read_folder(nfts_dir / folder)))
+        if len(batch) >= batch_size:
+            added += len(bundle.append_many(batch))
+            batch = []
+    if batch:
+        added += len(bundle.append_many(batch))
+    return added, present
+
+
+def unpack(bundle: CollectionBundle, dest: Path) -> Tuple[int, int]:
+    """Refaz o layout de pastas em `dest`; devolve (pastas criadas, já existentes)"""
+    dest = Path(dest)
+    created = existing = 0
+    for entry, files in bundle.iter_packages():
+        target = dest / entry.folder
+        if target.exists():
+            existing += 1
+            continue
+        # Pasta temporária + rename: a pasta aparece completa ou não aparece
+        staging = target.parent / f".unpack-{target.name}"
+        staging.mkdir(parents=True, exist_ok=True)
+        for name, data in files.items():
+            with open(staging / name, "wb") as f:
+                f.write(data)
+        os.rename(staging, target)
+        created += 1
+    return created, existing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--bundle", type=Path, default=None,
+                        help=f"Arquivo do bundle (padrão: <nfts_dir>/{BUNDLE_NAME})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_cmd = commands.add_parser("export", parents=[common], help="Empacota nfts/ (incremental)")
+    export_cmd.add_argument("nfts_dir", nargs="?", type=Path, default=Path.cwd() / "nfts")
+    unpack_cmd = commands.add_parser("unpack", parents=[common],
+                                     help="Refaz o layout de pastas a partir do bundle")
+    unpack_cmd.add_argument("dest", type=Path)
+    verify_cmd = commands.add_parser("verify", parents=[common],
+                                     help="Confere crc32 (e, com --compare, as pastas)")
+    verify_cmd.add_argument("nfts_dir", nargs="?", type=Path, default=Path.cwd() / "nfts")
+    verify_cmd.add_argument("--compare", action="store_true",
+                            help="Compara byte a byte com as pastas em nfts_dir")
+    cat_cmd = commands.add_parser("cat", parents=[common],
+                                  help="Escreve um arquivo do bundle na saída padrão")
+    cat_cmd.add_argument("key", help="id, hash do conteúdo ou pasta")
+    cat_cmd.add_argument("name", nargs="?", default="metadata.json")
+    args = parser.parse_args()
+
+    nfts_dir = getattr(args, "nfts_dir", Path.cwd() / "nfts")
+    bundle = CollectionBundle(args.bundle or nfts_dir / BUNDLE_NAME)
+    try:
+        if args.command == "export":
+            added, present = export(nfts_dir, bundle)
+            print(f"✅ {added} pacotes adicionados ({present} já presentes), "
+                  f"{len(bundle)} no bundle, {bundle.size / 1e6:.1f} MB em {bundle.path}")
+        elif args.command == "unpack":
+            created, existing = unpack(bundle, args.dest)
+            print(f"✅ {created} pastas criadas em {args.dest} ({existing} já existiam)")
+        elif args.command == "verify":
+            problems = bundle.verify()
+            if args.compare:
+                for entry, files in bundle.iter_packages():
+                    path = nfts_dir / entry.folder
+                    on_disk = read_folder(path) if path.is_dir() else {}
+                    for name, data in files.items():
+                        if on_disk.get(name) != data:
+                            problems.append(f"{entry.folder}/{name}: difere da pasta")
+            for problem in problems:
+                print(f"   ❌ {problem}")
+            print(f"{'❌' if problems else '✅'} {len(bundle)} pacotes verificados, "
+                  f"{len(problems)} problemas")
+            return 1 if problems else 0
+        else:
+            try:
+                data = bundle.read(args.key, args.name)
+            except KeyError as e:
+                print(f"❌ Não encontrado no bundle: {e.args[0]}", file=sys.stderr)
+                return 1
+            sys.stdout.buffer.write(data)
+            data.release()
+    finally:
+        bundle.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Armazenamento endereçado por conteúdo para os pacotes NFT
+Pastas derivadas do hash do SVG, distribuídas em shards: nfts/ab/cd/<hash>/
+"""
+
+import os
+import time
+import errno
+import hashlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Alfabeto Crockford base32 (ULID)
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+HASH_LENGTH = 32  # 128 bits do sha256 identificam a pasta
+
+
+def new_nft_id() -> str:
+    """
+    ID único entre processos sem coordenação (ULID): 48 bits de timestamp em ms
+    + 80 bits aleatórios, ordenável pelo momento de criação
+    """
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(26):
+        chars.append(_ULID_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def content_hash(data: bytes) -> str:
+    """Hash do conteúdo (sha256 truncado) usado como chave da pasta"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+class ContentStore:
+    """Mapeia hash do SVG -> pasta do NFT, com detecção O(1) de duplicatas"""
+
+    def __init__(self, root: Path, shard_levels: int = 2, shard_width: int = 2):
+        self.root = Path(root)
+        self.shard_levels = shard_levels
+        self.shard_width = shard_width
+
+    def relative_folder(self, digest: str) -> str:
+        """Caminho relativo à raiz (formato posix, como gravado no metadata)"""
+        w = self.shard_width
+        shards = [digest[i * w:(i + 1) * w] for i in range(self.shard_levels)]
+        return "/".join(shards + [digest])
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / self.relative_folder(digest)
+
+    def contains(self, digest: str) -> bool:
+        """Duplicata exata: um único stat, independente do tamanho da coleção"""
+        return self.path_for(digest).is_dir()
+
+    def publish(self, staged_dir: Path, digest: str) -> Optional[Path]:
+        """
+        Publica um diretório já escrito com um único rename atômico.
+        Retorna None se outro processo/thread já publicou o mesmo SVG.
+        """
+        path = self.path_for(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.rename(staged_dir, path)
+        except OSError as e:
+            # Destino existente e não vazio: duplicata exata
+            if e.errno in (errno.EEXIST, errno.ENOTEMPTY) or path.is_dir():
+                return None
+            raise
+        return path
+
+    def iter_folders(self) -> Iterator[Path]:
+        """Percorre as pastas de NFT presentes nos shards"""
+        pattern = "/".join(["?" * self.shard_width] * self.shard_levels + ["*"])
+        for path in self.root.glob(pattern):
+            if path.is_dir() and len(path.name) == HASH_LENGTH:
+                yield path
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Pós-processamento em pool de processos (não bloqueia o loop de geração)
+Gera thumbnails estáticos (primeiro frame) e hospeda etapas pesadas de CPU,
+como validação e minificação do SVG
+
+Uso: python postprocess.py backfill [nfts_dir] [--workers N] [--force]
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import cairosvg
+except ImportError:
+    cairosvg = None
+
+THUMBNAIL_SIZES = (128, 256)
+
+
+def thumbnail_name(size: int) -> str:
+    return f"thumb_{size}.png"
+
+
+def rasterizer_available() -> Optional[str]:
+    """Rasterizador disponível: cairosvg (Python) ou rsvg-convert (CLI)"""
+    if cairosvg is not None:
+        return "cairosvg"
+    if shutil.which("rsvg-convert"):
+        return "rsvg-convert"
+    return None
+
+
+def make_thumbnails(folder: str, sizes: Iterable[int] = THUMBNAIL_SIZES,
+                    force: bool = False) -> Dict:
+    """
+    Rasteriza artwork.svg em PNGs quadrados. Os rasterizadores ignoram SMIL,
+    então o resultado é o estado inicial da arte (aproximação do primeiro frame).
+    Executa dentro do processo worker.
+    """
+    folder_path = Path(folder)
+    svg_file = folder_path / "artwork.svg"
+    backend = rasterizer_available()
+    if backend is None:
+        return {"folder": folder, "thumbnails": [], "error": "nenhum rasterizador disponível"}
+
+    created = []
+    svg_bytes = svg_file.read_bytes()
+    for size in sizes:
+        target = folder_path / thumbnail_name(size)
+        if target.exists() and not force:
+            continue
+        tmp = target.with_name(target.name + ".tmp")
+        if backend == "cairosvg":
+            cairosvg.svg2png(bytestring=svg_bytes, write_to=str(tmp),
+                             output_width=size, output_height=size)
+        else:
+            subprocess.run(["rsvg-convert", "-w", str(size), "-h", str(size),
+                            "-o", str(tmp), str(svg_file)], check=True, capture_output=True)
+        os.replace(tmp, target)
+        created.append(target.name)
+
+    return {"folder": folder, "thumbnails": created, "error": None}
+
+
+class PostProcessor:
+    """
+    Pool de processos com métrica de profundidade de fila. As etapas inline da
+    geração (run: validação, análise, impressão digital) usam um pool próprio,
+    para não esperar atrás de uma fila de thumbnails.
+    """
+
+    def __init__(self, workers: Optional[int] = None, sizes: Iterable[int] = THUMBNAIL_SIZES):
+        self.workers = workers or os.cpu_count() or 1
+        self.sizes = tuple(sizes)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._inline: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Tarefas enviadas ainda não concluídas (em fila ou executando)"""
+        with self._lock:
+            return self._pending
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"queue_depth": self._pending, "completed": self.completed,
+                    "failed": self.failed, "workers": self.workers}
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Envia qualquer função picklável (validação, minificação...) ao pool"""
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Executa no pool inline e aguarda o resultado (libera o GIL das threads de geração)"""
+        with self._lock:
+            if self._inline is None:
+                self._inline = ProcessPoolExecutor(max_workers=self.workers)
+            executor = self._inline
+        return executor.submit(fn, *args, **kwargs).result()
+
+    def submit_thumbnails(self, folder: Path, force: bool = False) -> Future:
+        """
+        Thumbnails entram na pasta já publicada (rename atômico por arquivo):
+        a pasta continua endereçada pelo hash do SVG, do qual os PNGs derivam
+        """
+        return self.submit(make_thumbnails, str(folder), self.sizes, force)
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        if self._inline is not None:
+            self._inline.shutdown(wait=wait)
+
+
+def iter_nft_folders(nfts_dir: Path) -> Iterable[Path]:
+    """Pastas com artwork.svg (layout em shards e layout antigo)"""
+    for svg_file in nfts_dir.glob("**/artwork.svg"):
+        if any(part.startswith(".") for part in svg_file.relative_to(nfts_dir).parts):
+            continue  # diretórios temporários do writer
+        yield svg_file.parent
+
+
+def backfill(nfts_dir: Path, workers: Optional[int] = None, force: bool = False) -> Dict[str, int]:
+    """Gera thumbnails para todas as pastas existentes em nfts/"""
+    if rasterizer_available() is None:
+        print("❌ Instale cairosvg ou rsvg-convert para gerar thumbnails")
+        return {"submitted": 0, "created": 0, "failed": 0}
+
+    processor = PostProcessor(workers)
+    futures: List[Future] = []
+    for folder in iter_nft_folders(nfts_dir):
+        if not force and all((folder / thumbnail_name(s)).exists() for s in processor.sizes):
+            continue
+        futures.append(processor.submit_thumbnails(folder, force))
+
+    created = failed = 0
+    for future in futures:
+        try:
+            result = future.result()
+        except Exception as e:
+            failed += 1
+            print(f"   ⚠️ Falha: {e}")
+            continue
+        created += len(result["thumbnails"])
+    processor.shutdown()
+
+    return {"submitted": len(futures), "created": created, "failed": failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pós-processamento de NFTs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmd = sub.add_parser("backfill", help="Gera thumbnails para pastas existentes")
+    cmd.add_argument("nfts_dir", nargs="?", type=Path, default=Path.cwd() / "nfts")
+    cmd.add_argument("--workers", type=int, default=None)
+    cmd.add_argument("--force", action="store_true", help="Regera thumbnails existentes")
+    args = parser.parse_args()
+
+    result = backfill(args.nfts_dir, args.workers, args.force)
+    print(f"✅ Backfill: {result['submitted']} pastas, {result['created']} thumbnails, "
+          f"{result['failed']} falhas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Preview HTML dos NFTs e variantes pré-comprimidas dos arquivos
+CSS/JS do preview podem ser compartilhados como um único asset em cache
+"""
+
+import gzip
+import html
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSETS_DIR = "_assets"
+
+PREVIEW_CSS = """* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+    -webkit-user-select: none;
+    -moz-user-select: none;
+    -ms-user-select: none;
+    user-select: none;
+}
+
+body {
+    background: #ffffff;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    min-height: 100vh;
+    position: relative;
+}
+
+.container {
+    width: 90vmin;
+    height: 90vmin;
+    max-width: 800px;
+    max-height: 800px;
+    position: relative;
+    background: #fff;
+    border-radius: 20px;
+    box-shadow: 0 10px 40px rgba(0,0,0,0.1);
+    overflow: hidden;
+}
+
+svg, .artwork {
+    width: 100%;
+    height: 100%;
+    pointer-events: none;
+}
+
+.watermark {
+    position: absolute;
+    bottom: 20px;
+    right: 20px;
+    background: rgba(0,0,0,0.8);
+    color: white;
+    padding: 8px 16px;
+    border-radius: 8px;
+    font-family: Arial, sans-serif;
+    font-size: 14px;
+    pointer-events: none;
+}
+
+.info {
+    position: absolute;
+    top: 20px;
+    left: 20px;
+    background: rgba(255,255,255,0.95);
+    padding: 15px;
+    border-radius: 10px;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+    font-family: Arial, sans-serif;
+}
+
+.info h3 {
+    margin: 0 0 5px 0;
+    color: #333;
+    font-size: 18px;
+}
+
+.info p {
+    margin: 0;
+    color: #666;
+    font-size: 14px;
+}
+
+.rarity {
+    display: inline-block;
+    padding: 3px 10px;
+    border-radius: 15px;
+    font-size: 12px;
+    font-weight: bold;
+    margin-top: 5px;
+}
+
+.rarity.common { background: #e5e7eb; color: #374151; }
+.rarity.rare { background: #dbeafe; color: #1e40af; }
+.rarity.epic { background: #e9d5ff; color: #6b21a8; }
+.rarity.legendary { background: #fed7aa; color: #92400e; }
+"""
+
+PREVIEW_JS = """// Proteções
+document.addEventListener('contextmenu', e => e.preventDefault());
+document.addEventListener('selectstart', e => e.preventDefault());
+document.addEventListener('dragstart', e => e.preventDefault());
+
+document.addEventListener('keydown', e => {
+    if ((e.ctrlKey || e.metaKey) && (e.key === 's' || e.key === 'S')) {
+        e.preventDefault();
+        return false;
+    }
+});
+"""
+
+
+def _asset_name(stem: str, content: str, ext: str) -> str:
+    # Nome com hash do conteúdo: pode ser servido com cache imutável
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:8]
+    return f"{stem}.{digest}.{ext}"
+
+
+CSS_ASSET = _asset_name("preview", PREVIEW_CSS, "css")
+JS_ASSET = _asset_name("preview", PREVIEW_JS, "js")
+
+
+def compressed_variants(name: str, data: bytes) -> Dict[str, bytes]:
+    """Variantes .gz (e .br, se brotli estiver instalado) de um arquivo em memória"""
+    # mtime=0 deixa a saída determinística (mesmo conteúdo, mesmos bytes)
+    variants = {f"{name}.gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[f"{name}.br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+def write_precompressed(path: Path) -> Dict[str, int]:
+    """Grava irmãos pré-comprimidos de um arquivo e retorna os tamanhos"""
+    sizes = {}
+    for name, data in compressed_variants(path.name, path.read_bytes()).items():
+        path.with_name(name).write_bytes(data)
+        sizes[name] = len(data)
+    return sizes
+
+
+def ensure_shared_assets(nfts_dir: Path, precompress: bool = True) -> Path:
+    """Grava CSS/JS compartilhados uma única vez em nfts/_assets/"""
+    assets_dir = Path(nfts_dir) / ASSETS_DIR
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    for name, content in ((CSS_ASSET, PREVIEW_CSS), (JS_ASSET, PREVIEW_JS)):
+        asset = assets_dir / name
+        if not asset.exists():
+            asset.write_text(content, encoding="utf-8")
+            if precompress:
+                write_precompressed(asset)
+    return assets_dir
+
+
+def render_preview(name: str, style: str, rarity: str, svg_code: Optional[str] = None,
+                   assets_prefix: Optional[str] = None) -> str:
+    """
+    Monta o preview.html. Com `assets_prefix` (ex.: "../../../_assets/") o HTML
+    referencia artwork.svg e os assets compartilhados em vez de embutir tudo.
+    """
+    if assets_prefix is None:
+        head_assets = f"<style>\n{PREVIEW_CSS}</style>"
+        body_assets = f"<script>\n{PREVIEW_JS}</script>"
+        artwork = svg_code
+    else:
+        head_assets = f'<link rel="stylesheet" href="{assets_prefix}{CSS_ASSET}">'
+        body_assets = f'<script src="{assets_prefix}{JS_ASSET}" defer></script>'
+        artwork = f'<img class="artwork" src="artwork.svg" alt="{html.escape(name)}" draggable="false">'
+
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{html.escape(name)} - NFT Preview</title>
+    {head_assets}
+</head>
+<body oncontextmenu="return false;">
+    <div class="container">
+        {artwork}
+        <div class="watermark">PREVIEW</div>
+        <div class="info">
+            <h3>{html.escape(name)}</h3>
+            <p>{html.escape(style)}</p>
+            <span class="rarity {rarity.lower()}">{rarity}</span>
+        </div>
+    </div>
+    {body_assets}
+</body>
+</html>"""
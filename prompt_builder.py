@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Montagem de prompts amigável ao cache de contexto do provedor
+Todo conteúdo estático vem primeiro; campos variáveis ficam no final
+"""
+
+from typing import Callable, Dict, List, Tuple
+
+from svg_macros import MACRO_REFERENCE
+
+SYSTEM_PROMPT = (
+    "Você é um gênio criativo especializado em arte SVG surreal e hipnotizante. "
+    "Você domina completamente a sintaxe SVG, animações SMIL, filtros, gradientes e "
+    "transformações. Suas criações são portais visuais para outras dimensões. "
+    "SEMPRE retorne JSON válido com SVG sintaticamente perfeito."
+)
+
+# Blocos fixos: idênticos em todas as chamadas, formam o prefixo cacheável
+_HEADER = """
+Você é um MESTRE em criar arte SVG SURREAL, HIPNOTIZANTE e PROFUNDAMENTE ANIMADA.
+Os parâmetros específicos desta obra (estilo, raridade, mínimo de animações,
+complexidade, nome e cores) estão na seção PARÂMETROS DA OBRA ao final.
+
+REQUISITOS TÉCNICOS OBRIGATÓRIOS:
+1. ViewBox: EXATAMENTE viewBox="0 0 1000 1000"
+2. Background: Cor sólida ou gradiente radial/linear (NUNCA transparente)
+3. Pelo menos o MÍNIMO DE ANIMAÇÕES indicado, todas DIFERENTES e SINCRONIZADAS
+4. TODAS as animações com repeatCount="indefinite"
+5. Duração das animações: Varie entre 3s e 30s para criar polirritmia hipnótica
+6. Use calcMode="spline" com keySplines para movimentos orgânicos
+
+"""
+
+_SMIL_TECHNIQUES = """TÉCNICAS DE ANIMAÇÃO OBRIGATÓRIAS (use TODAS):
+
+1. ROTAÇÕES HIPNÓTICAS:
+   <animateTransform attributeName="transform" type="rotate"
+    from="0 500 500" to="360 500 500" dur="20s" repeatCount="indefinite"/>
+   - Varie: direção (360 ou -360), centro de rotação, duração
+
+2. MORPHING DE FORMAS:
+   <animate attributeName="d" values="path1;path2;path3;path1"
+    dur="10s" repeatCount="indefinite" calcMode="spline"
+    keySplines="0.5 0 0.5 1;0.5 0 0.5 1"/>
+   - Transforme círculos em estrelas, quadrados em espirais
+
+3. PULSAÇÕES ORGÂNICAS:
+   <animate attributeName="r" values="50;80;50" dur="4s"
+    repeatCount="indefinite" calcMode="spline"/>
+   - Aplique em raios, larguras, alturas
+
+4. ONDULAÇÕES DE COR:
+   <animate attributeName="fill" values="cor1;cor2;cor3;cor1"
+    dur="8s" repeatCount="indefinite"/>
+   - Use nas cores base fornecidas
+
+5. MOVIMENTOS EM PATHS:
+   <animateMotion dur="15s" repeatCount="indefinite">
+     <mpath href="#pathId"/>
+   </animateMotion>
+   - Crie paths sinuosos, espirais, lemniscatas
+
+6. OPACIDADE FANTASMAGÓRICA:
+   <animate attributeName="opacity" values="0;1;0"
+    dur="6s" repeatCount="indefinite"/>
+
+7. TRANSFORMAÇÕES DE ESCALA:
+   <animateTransform attributeName="transform" type="scale"
+    values="1;1.5;1" dur="7s" repeatCount="indefinite" additive="sum"/>
+
+8. FILTROS DINÂMICOS:
+   - Use feTurbulence com baseFrequency animado
+   - feGaussianBlur com stdDeviation variável
+   - feDisplacementMap para distorções líquidas
+
+"""
+
+_STRUCTURE = """ESTRUTURA SURREAL OBRIGATÓRIA:
+1. PROFUNDIDADE: Mínimo 5 camadas com diferentes velocidades (parallax)
+2. ELEMENTOS IMPOSSÍVEIS: Geometrias não-euclidianas, ilusões de ótica
+3. FLUXO LÍQUIDO: Tudo deve fluir como se estivesse submerso
+4. SINCRONIZAÇÃO: Crie "momentos" onde várias animações se alinham
+5. SURPRESAS VISUAIS: Elementos que aparecem/desaparecem periodicamente
+
+"""
+
+_SVG_EXAMPLE = """EXEMPLO DE ESTRUTURA SVG:
+```svg
+<svg viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg">
+  <defs>
+    <!-- Gradientes animados -->
+    <radialGradient id="grad1">
+      <stop offset="0%" stop-color="#FF006E">
+        <animate attributeName="stop-color" values="#FF006E;#FB5607;#FF006E" dur="5s" repeatCount="indefinite"/>
+      </stop>
+      <stop offset="100%" stop-color="#3A86FF">
+        <animate attributeName="stop-color" values="#3A86FF;#8338EC;#3A86FF" dur="7s" repeatCount="indefinite"/>
+      </stop>
+    </radialGradient>
+
+    <!-- Filtros complexos -->
+    <filter id="liquid">
+      <feTurbulence baseFrequency="0.02" numOctaves="3">
+        <animate attributeName="baseFrequency" values="0.02;0.05;0.02" dur="10s" repeatCount="indefinite"/>
+      </feTurbulence>
+      <feDisplacementMap in="SourceGraphic" scale="20"/>
+    </filter>
+
+    <!-- Paths para movimento -->
+    <path id="spiral" d="M500,500 Q600,400 500,300 T400,400 T500,500" opacity="0"/>
+  </defs>
+
+  <!-- Background animado -->
+  <rect width="1000" height="1000" fill="url(#grad1)"/>
+
+  <!-- Camadas com diferentes velocidades e filtros -->
+  <!-- ... elementos surreais aqui ... -->
+</svg>
+```
+
+"""
+
+_FOOTER = """PROIBIDO:
+- Elementos estáticos (TUDO deve se mover)
+- Animações abruptas (use sempre easing/splines)
+- Cores muito escuras ou muito claras (mantenha vibrante)
+- Repetições óbvias (varie durações para criar polirritmia)
+- SVG com erro de sintaxe
+
+Retorne um JSON VÁLIDO:
+{
+    "artwork_name": "nome da obra (ou uma variação poética)",
+    "description": "Descrição surreal e poética que capture a essência hipnótica da obra (3-4 frases)",
+    "svg_code": "<!-- SVG COMPLETO E VÁLIDO COM TODAS AS ANIMAÇÕES -->"
+}
+Não inclua outros campos: animações, cores, duração do loop e filtros são extraídos do próprio SVG.
+
+LEMBRE-SE: Esta arte deve ser um PORTAL VISUAL que HIPNOTIZA e TRANSCENDE. Cada elemento deve DANÇAR em harmonia surreal. O observador deve sentir que está olhando para outra dimensão!
+"""
+
+# Modo --svg-macros: o modelo escreve macros compactas no lugar do SMIL verboso
+_MACRO_TECHNIQUES = f"""TÉCNICAS DE ANIMAÇÃO OBRIGATÓRIAS (use TODAS, de preferência via macros):
+rotações, morphing de formas, pulsações, ondulações de cor, movimento em paths,
+opacidade fantasmagórica, escala e filtros dinâmicos.
+
+{MACRO_REFERENCE}
+
+"""
+
+_MACRO_EXAMPLE = """EXEMPLO DE ESTRUTURA COM MACROS:
+```svg
+<svg viewBox="0 0 1000 1000" xmlns="http://www.w3.org/2000/svg">
+  <defs>
+    <grad id="grad1" c="#FF006E;#FB5607;#3A86FF" d="6"/>
+    <liquid id="liquid" f="0.02;0.05;0.02" s="20" d="10"/>
+    <glow id="glow" v="2;8;2" d="5"/>
+    <path id="spiral" d="M500,500 Q600,400 500,300 T400,400 T500,500" opacity="0"/>
+  </defs>
+  <rect width="1000" height="1000" fill="url(#grad1)"/>
+  <g filter="url(#liquid)"><spin d="30"/>
+    <circle cx="500" cy="300" r="80" fill="#8338EC" filter="url(#glow)">
+      <ease a="r" v="80;120;80" d="4"/><ease a="opacity" v="0.4;1;0.4" d="7"/>
+    </circle>
+  </g>
+  <circle r="12" fill="#FFBE0B"><orbit p="spiral" d="15" rot="auto"/><grow v="1;1.8;1" d="3"/></circle>
+  <!-- ... elementos surreais aqui ... -->
+</svg>
+```
+
+"""
+
+STATIC_INSTRUCTIONS = _HEADER + _SMIL_TECHNIQUES + _STRUCTURE + _SVG_EXAMPLE + _FOOTER
+MACRO_INSTRUCTIONS = _HEADER + _MACRO_TECHNIQUES + _STRUCTURE + _MACRO_EXAMPLE + _FOOTER
+
+RARITY_FOCUS = {
+    "Common": "Foco em loops perfeitos e harmonia visual",
+    "Rare": "Adicione elementos que quebram o padrão periodicamente",
+    "Epic": "Múltiplas dimensões visuais interagindo",
+    "Legendary": "Transcenda a percepção normal, crie portais visuais"
+}
+
+
+class PromptBuilder:
+    """Pré-compila as variantes (estilo, raridade) e anexa os campos por obra no final"""
+
+    def __init__(self, styles: List[str], complexity_map: Dict[str, Dict],
+                 style_requirements: Callable[[str], str], macros: bool = False):
+        self.complexity_map = complexity_map
+        self.style_requirements = style_requirements
+        self.instructions = MACRO_INSTRUCTIONS if macros else STATIC_INSTRUCTIONS
+        self._variants: Dict[Tuple[str, str], str] = {}
+
+        for style in styles:
+            for rarity in complexity_map:
+                self._variants[(style, rarity)] = self._compile_variant(style, rarity)
+
+    def _compile_variant(self, style: str, rarity: str) -> str:
+        reqs = self.complexity_map[rarity]
+        return f"""{self.instructions}
+=== PARÂMETROS DA OBRA ===
+- Estilo: {style}
+- Raridade: {rarity}
+- Mínimo de animações: {reqs['min_animations']}
+- Complexidade: {reqs['complexity']}
+
+ELEMENTOS VISUAIS OBRIGATÓRIOS PARA {style}:
+{self.style_requirements(style).strip()}
+
+IMPORTANTE PARA {rarity}:
+- {RARITY_FOCUS.get(rarity, RARITY_FOCUS['Common'])}
+"""
+
+    def variant(self, style: str, rarity: str) -> str:
+        """Retorna a variante pré-compilada (compila sob demanda estilos novos)"""
+        key = (style, rarity)
+        if key not in self._variants:
+            self._variants[key] = self._compile_variant(style, rarity)
+        return self._variants[key]
+
+    def build_messages(self, name: str, style: str, rarity: str,
+                       colors: List[str]) -> List[Dict[str, str]]:
+        """Monta as mensagens: prefixo estável + campos variáveis no final"""
+        prompt = (
+            f"{self.variant(style, rarity)}"
+            f"\nDETALHES DESTA OBRA:\n"
+            f"- Nome da obra: {name}\n"
+            f"- Cores base sugeridas: {', '.join(colors)}\n"
+        )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
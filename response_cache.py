@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Cache de gravação/reprodução das respostas da API DeepSeek
+Permite rodar o pipeline completo offline, reproduzindo respostas gravadas
+
+Modos: off, record, replay, replay-or-record
+"""
+
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+CACHE_MODES = ("off", "record", "replay", "replay-or-record")
+
+# Campos do payload que definem a resposta (stream não muda o conteúdo)
+KEY_FIELDS = ("model", "messages", "temperature", "max_tokens")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+
+class CacheMiss(LookupError):
+    """Resposta não gravada (modo replay)"""
+
+
+def cache_key(payload: Dict) -> str:
+    """Hash estável dos campos que determinam a resposta"""
+    canonical = json.dumps({k: payload.get(k) for k in KEY_FIELDS},
+                           sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Armazenamento compacto (SQLite + zlib) com despejo LRU por tamanho"""
+
+    def __init__(self, path: Path, mode: str = "replay-or-record", max_bytes: int = 256 * 1024 * 1024):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Modo de cache inválido: {mode} (use {', '.join(CACHE_MODES)})")
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    @property
+    def replays(self) -> bool:
+        return self.mode in ("replay", "replay-or-record")
+
+    @property
+    def records(self) -> bool:
+        return self.mode in ("record", "replay-or-record")
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict]]:
+        """Retorna (content, usage) gravados ou None"""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?",
+                                   (time.time(), key))
+            self.hits += 1
+        entry = json.loads(zlib.decompress(row[0]))
+        return entry["content"], entry["usage"]
+
+    def put(self, key: str, content: str, usage: Dict):
+        """Grava a resposta (com usage, para manter o cálculo de custo no replay)"""
+        body = zlib.compress(json.dumps({"content": content, "usage": usage},
+                                        ensure_ascii=False).encode("utf-8"), 9)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO responses (key, body, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET body = excluded.body, size = excluded.size,
+                                               last_access = excluded.last_access
+            """, (key, body, len(body), now, now))
+            self._evict()
+
+    def _evict(self):
+        """Remove as entradas menos usadas até caber em max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
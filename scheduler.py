@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Agendador ciente de custo: obras caras (Epic/Legendary) só na janela de desconto
+Fila persistente em SQLite (pausa/retomada sem perder jobs, leases para vários
+workers), orçamento, limite de tokens por minuto e projeção de custo/término
+
+Uso: python scheduler.py status [nfts_dir]
+"""
+
+import os
+import sys
+import time
+import socket
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from model_router import CHAT_MODEL, REASONER_MODEL
+
+# Preço por 1k tokens e desconto fora do horário de pico (16:00–00:59 UTC)
+COST_PER_1K = 0.014
+# Preço por modelo (o chat custa cerca de metade do reasoner); modelos fora da
+# tabela (ex.: vindos de --routes) são cobrados como o reasoner, por segurança
+MODEL_COST_PER_1K = {REASONER_MODEL: COST_PER_1K, CHAT_MODEL: 0.007}
+DISCOUNT_RATIO = 0.25
+DISCOUNT_START_HOUR = 16
+DISCOUNT_END_HOUR = 0
+
+# Na janela, as mais caras primeiro; fora dela, só as baratas
+RARITY_ORDER = ("Legendary", "Epic", "Rare", "Common")
+EXPENSIVE_RARITIES = ("Legendary", "Epic")
+
+# Estimativas iniciais por job (substituídas pelas médias dos jobs concluídos)
+DEFAULT_TOKENS = {"Common": 7000, "Rare": 10000, "Epic": 14000, "Legendary": 19000}
+DEFAULT_SECONDS = {"Common": 60.0, "Rare": 90.0, "Epic": 120.0, "Legendary": 180.0}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rarity TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    tokens INTEGER,
+    cost REAL,
+    seconds REAL,
+    folder TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result_digest TEXT,
+    reserved REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, rarity);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Colunas acrescentadas a filas antigas (criadas antes dos leases)
+LEASE_COLUMNS = (("lease_owner", "TEXT"), ("lease_expires", "REAL"), ("result_digest", "TEXT"),
+                 ("reserved", "REAL"))
+
+# Sem heartbeat por este tempo, o job volta a ser de quem pedir
+DEFAULT_LEASE_SECONDS = 120.0
+
+# Jobs que um claim() pode pegar (o parâmetro é o instante atual; sem lease = vencido)
+CLAIMABLE = "(status = 'pending' OR (status = 'running' AND IFNULL(lease_expires, 0) < ?))"
+
+# Desfecho de fail() para o log (None = lease perdido: a falha não foi registrada)
+FAIL_OUTCOMES = {"pending": "voltou para a fila", "failed": "desistindo",
+                 None: "lease perdido, o job segue com outro worker"}
+
+# Custo estimado reservado por jobs em voo, de todos os workers. Reservas de um worker
+# morto (ou que concluiu e não chegou a acertar o gasto) vencem junto com o lease
+RESERVED_SUM = "(SELECT IFNULL(SUM(reserved), 0) FROM jobs WHERE reserved IS NOT NULL AND lease_expires >= ?)"
+SPENT_VALUE = "IFNULL((SELECT CAST(value AS REAL) FROM meta WHERE key = 'spent'), 0)"
+
+
+def default_owner() -> str:
+    """Identidade do processo na fila: host:pid"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def in_discount_window(when: Optional[float] = None) -> bool:
+    """Horário com desconto (UTC)"""
+    hour = time.gmtime(when).tm_hour
+    return hour >= DISCOUNT_START_HOUR or hour <= DISCOUNT_END_HOUR
+
+
+def next_window_change(when: Optional[float] = None) -> float:
+    """Próximo instante (epoch) em que a janela de desconto abre ou fecha"""
+    when = time.time() if when is None else when
+    current = in_discount_window(when)
+    hour_start = when - when % 3600
+    for hours in range(1, 25):
+        candidate = hour_start + hours * 3600
+        if in_discount_window(candidate) != current:
+            return candidate
+    return when + 3600
+
+
+def model_cost_per_1k(model: Optional[str]) -> float:
+    return MODEL_COST_PER_1K.get(model, COST_PER_1K)
+
+
+def token_cost(tokens: float, discounted: bool, model: Optional[str] = None) -> float:
+    per_1k = model_cost_per_1k(model) * (DISCOUNT_RATIO if discounted else 1)
+    return tokens / 1000 * per_1k
+
+
+@dataclass
+class Job:
+    id: int
+    rarity: str
+    attempts: int
+    result_digest: Optional[str] = None  # publicação registrada por um worker anterior
+    folder: Optional[str] = None
+
+
+@dataclass
+class Projection:
+    """Estimativa feita antes de iniciar (ou retomar) a fila"""
+    jobs: Dict[str, int]
+    cost: float
+    peak_cost: float
+    window_cost: float
+    finish_at: float
+    spent: float
+    budget: Optional[float]
+    affordable: int = 0
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def within_budget(self) -> bool:
+        return self.budget is None or self.spent + self.cost <= self.budget
+
+
+class BudgetExceeded(Exception):
+    """Nenhum job pendente cabe no orçamento (gasto + reservas dos jobs em voo)"""
+
+
+class JobQueue:
+    """
+    Fila de jobs por raridade compartilhável entre processos/hosts
+    Cada job em execução tem um lease (dono + validade) renovado por heartbeat;
+    lease vencido (worker morto) devolve o job a quem pedir o próximo.
+    Requer um sistema de arquivos com locks POSIX funcionais (SQLite).
+    """
+
+    def __init__(self, db_path: Path, max_attempts: int = 3, owner: Optional[str] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.owner = owner or default_owner()
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        # Jobs com lease vencido (Ctrl+C, crash) são retomados pelo próximo claim()
+        with self._lock:
+            self.recovered = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'running' AND IFNULL(lease_expires, 0) < ?",
+                (time.time(),)).fetchone()[0]
+
+    def _migrate(self):
+        """Filas criadas antes dos leases ganham as colunas novas"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        with self._conn:
+            for name, kind in LEASE_COLUMNS:
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def close(self):
+        self.stop_heartbeat()
+        with self._lock:
+            self._conn.close()
+
+    def start_heartbeat(self, interval: Optional[float] = None):
+        """Thread que renova os leases deste dono enquanto o processo vive"""
+        if self._heartbeat is not None:
+            return
+        interval = interval or self.lease_seconds / 3
+        self._stop.clear()
+
+        def beat():
+            while not self._stop.wait(interval):
+                try:
+                    self.renew()
+                except sqlite3.Error as e:
+                    print(f"   ⚠️ Heartbeat falhou: {e}")
+
+        self._heartbeat = threading.Thread(target=beat, name="queue-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        if self._heartbeat is not None:
+            self._stop.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def renew(self) -> int:
+        """Estende todos os leases deste dono; retorna quantos"""
+        now = time.time()
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE status = 'running' AND lease_owner = ?",
+                (now + self.lease_seconds, self.owner)).rowcount
+
+    def _counts(self, where: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT rarity, COUNT(*) FROM jobs WHERE {where} GROUP BY rarity",
+                (time.time(),) if "?" in where else ()).fetchall()
+        return {rarity: count for rarity, count in rows}
+
+    def pending_counts(self) -> Dict[str, int]:
+        """Jobs que um claim() pode pegar agora (inclui leases vencidos)"""
+        return self._counts(CLAIMABLE)
+
+    def unfinished_counts(self) -> Dict[str, int]:
+        return self._counts("status IN ('pending', 'running')")
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def lease_owners(self) -> Dict[str, int]:
+        """Jobs em execução com lease válido, por dono"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lease_owner, COUNT(*) FROM jobs WHERE status = 'running' "
+                "AND lease_expires >= ? GROUP BY lease_owner", (time.time(),)).fetchall()
+        return dict(rows)
+
+    def plan(self, targets: Dict[str, int], budget: Optional[float] = None) -> bool:
+        """Cria os jobs do mix pedido; False se já existe uma fila inacabada (retomada)"""
+        if self.unfinished_counts():
+            return False
+        now = time.time()
+        rows = [(rarity, now, now) for rarity, count in targets.items() for _ in range(count)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO jobs (rarity, created_at, updated_at) VALUES (?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('spent', '0')")
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('budget', ?)",
+                               ("" if budget is None else repr(budget),))
+        return True
+
+    def enqueue(self, targets: Dict[str, int]) -> int:
+        """Acrescenta jobs a uma fila existente (modo worker); retorna quantos"""
+        now = time.time()
+        rows = [(rarity, now, now) for rarity, count in targets.items() for _ in range(count)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO jobs (rarity, created_at, updated_at) VALUES (?, ?, ?)", rows)
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('spent', '0')")
+        return len(rows)
+
+    def claim(self, rarities: Iterable[str], estimate: Optional[Callable[[str], float]] = None,
+              budget: Optional[float] = None) -> Optional[Job]:
+        """
+        Reserva o próximo job (pendente ou com lease vencido), na ordem de
+        preferência dada. O UPDATE condicional torna o claim atômico entre
+        processos: quem perde a corrida tenta o próximo candidato.
+        Com `estimate`, o custo estimado do job fica reservado até add_spent(settle=job);
+        com `budget`, só pega o job se gasto + reservas + estimativa couberem nele
+        (BudgetExceeded se algum candidato ficou de fora só pelo orçamento).
+        """
+        blocked = False
+        for rarity in rarities:
+            cost = estimate(rarity) if estimate else None
+            while True:
+                now = time.time()
+                with self._lock, self._conn:
+                    row = self._conn.execute(
+                        f"SELECT id, attempts, status, result_digest, folder FROM jobs "
+                        f"WHERE {CLAIMABLE} AND rarity = ? ORDER BY id LIMIT 1",
+                        (now, rarity)).fetchone()
+                    if row is None:
+                        break
+                    job_id, attempts, status, digest, folder = row
+                    # Lease vencido = worker morreu no meio do job: conta como tentativa
+                    if status == "running":
+                        attempts += 1
+                    if attempts >= self.max_attempts:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = 'failed', attempts = ?, lease_owner = NULL, "
+                            "error = 'lease expirado', updated_at = ? WHERE id = ?",
+                            (attempts, now, job_id))
+                        continue
+                    condition, params = "", []
+                    if budget is not None:
+                        condition = f" AND ? + {SPENT_VALUE} + {RESERVED_SUM} <= ?"
+                        params = [cost or 0.0, now, budget]
+                    claimed = self._conn.execute(
+                        f"UPDATE jobs SET status = 'running', attempts = ?, lease_owner = ?, "
+                        f"lease_expires = ?, updated_at = ?, reserved = ? "
+                        f"WHERE id = ? AND {CLAIMABLE}{condition}",
+                        [attempts, self.owner, now + self.lease_seconds, now, cost,
+                         job_id, now] + params).rowcount
+                    if not claimed and budget is not None and self._conn.execute(
+                            f"SELECT 1 FROM jobs WHERE id = ? AND {CLAIMABLE}",
+                            (job_id, now)).fetchone():
+                        blocked = True  # ainda livre: ficou de fora pelo orçamento
+                        break
+                if claimed:
+                    return Job(id=job_id, rarity=rarity, attempts=attempts,
+                               result_digest=digest, folder=folder)
+        if blocked:
+            raise BudgetExceeded(f"Orçamento de ${budget:.2f} comprometido")
+        return None
+
+    def release(self, job: Job):
+        """Devolve à fila sem contar tentativa (ex.: orçamento esgotado)"""
+        self._update(job, "pending", lease_owner=None, reserved=None)
+
+    def release_owned(self) -> int:
+        """Devolve os jobs deste dono (encerramento limpo, sem esperar o lease vencer)"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'pending', lease_owner = NULL, reserved = NULL, "
+                "updated_at = ? WHERE status = 'running' AND lease_owner = ?",
+                (time.time(), self.owner)).rowcount
+
+    def record_intent(self, job: Job, digest: str, folder: str) -> bool:
+        """
+        Registra o hash que o job vai publicar, antes da publicação. Se o worker
+        morrer depois disso, quem retomar o job confere o disco em vez de gerar
+        outra obra. O lease é renovado aqui para cobrir a publicação que vem a
+        seguir. False se o lease já não é deste dono.
+        """
+        if self._update(job, "running", result_digest=digest, folder=folder,
+                        lease_expires=time.time() + self.lease_seconds, require_live_lease=True):
+            job.result_digest, job.folder = digest, folder
+            return True
+        return False
+
+    def complete(self, job: Job, tokens: int, cost: float, seconds: float,
+                 folder: Optional[str]) -> bool:
+        """Registro único de conclusão: False se o job já não pertence a este dono"""
+        return self._update(job, "done", tokens=tokens, cost=cost, seconds=seconds,
+                            folder=folder, lease_owner=None)
+
+    def fail(self, job: Job, error: str) -> Optional[str]:
+        """
+        Registra a falha; retorna o novo status ('pending' = voltou para a fila,
+        'failed' = desistiu) ou None se o lease já não era deste dono (nada mudou)
+        """
+        attempts = job.attempts + 1
+        status = "pending" if attempts < self.max_attempts else "failed"
+        if not self._update(job, status, attempts=attempts, error=error[:500], lease_owner=None):
+            return None
+        return status
+
+    def _update(self, job: Job, status: str, require_live_lease: bool = False, **columns) -> bool:
+        """Só altera jobs cujo lease é deste dono (um worker retomado não sobrescreve outro)"""
+        now = time.time()
+        columns.update(status=status, updated_at=now)
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        condition = "id = ? AND status = 'running' AND lease_owner = ?"
+        params = list(columns.values()) + [job.id, self.owner]
+        if require_live_lease:
+            condition += " AND lease_expires >= ?"
+            params.append(now)
+        with self._lock, self._conn:
+            return self._conn.execute(f"UPDATE jobs SET {assignments} WHERE {condition}",
+                                      params).rowcount == 1
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def spent(self) -> float:
+        """Gasto acumulado da fila atual, inclusive de sessões e workers anteriores"""
+        return float(self._meta("spent") or 0)
+
+    def add_spent(self, delta: float, settle: Optional[Job] = None):
+        """
+        Soma atômica: vários processos podem registrar gasto na mesma fila.
+        Com `settle`, a reserva do job sai na mesma transação em que o gasto real entra
+        """
+        if not delta and settle is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('spent', '0')")
+            self._conn.execute(
+                "UPDATE meta SET value = CAST(CAST(value AS REAL) + ? AS TEXT) WHERE key = 'spent'",
+                (delta,))
+            if settle is not None:
+                self._conn.execute("UPDATE jobs SET reserved = NULL WHERE id = ?", (settle.id,))
+
+    @property
+    def reserved(self) -> float:
+        """Custo estimado dos jobs em voo (todos os workers), ainda não acertado"""
+        with self._lock:
+            return self._conn.execute(f"SELECT {RESERVED_SUM}", (time.time(),)).fetchone()[0]
+
+    @property
+    def budget(self) -> Optional[float]:
+        value = self._meta("budget")
+        return float(value) if value else None
+
+    def averages(self) -> Dict[str, Tuple[float, float]]:
+        """(tokens, segundos) médios por raridade dos jobs concluídos"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rarity, AVG(tokens), AVG(seconds) FROM jobs "
+                "WHERE status = 'done' AND tokens > 0 GROUP BY rarity").fetchall()
+        return {rarity: (tokens, seconds) for rarity, tokens, seconds in rows}
+
+
+class TokenRateLimiter:
+    """Token bucket de tokens/minuto da API: acquire() bloqueia até haver saldo"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float) -> float:
+        """Retorna quanto tempo esperou"""
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return waited
+                delay = (tokens - self.available) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class CostAwareScheduler:
+    """Política: quais raridades rodar agora, com quanta concorrência e até qual orçamento"""
+
+    def __init__(self, queue: JobQueue, budget: Optional[float] = None,
+                 peak_concurrency: int = 1, window_concurrency: int = 4,
+                 tokens_per_minute: Optional[int] = None,
+                 models: Optional[Dict[str, str]] = None):
+        self.queue = queue
+        self.models = models or {}  # raridade -> modelo da rota (preço por modelo)
+        self.budget = budget
+        self.peak_concurrency = max(1, peak_concurrency)
+        self.window_concurrency = max(1, window_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.limiter = TokenRateLimiter(tokens_per_minute) if tokens_per_minute else None
+        self._averages = queue.averages()
+
+    @property
+    def max_concurrency(self) -> int:
+        return max(self.peak_concurrency, self.window_concurrency)
+
+    def allowed_rarities(self, when: Optional[float] = None) -> Tuple[str, ...]:
+        if in_discount_window(when):
+            return RARITY_ORDER
+        return tuple(r for r in RARITY_ORDER if r not in EXPENSIVE_RARITIES)
+
+    def concurrency_limit(self, when: Optional[float] = None) -> int:
+        return self.window_concurrency if in_discount_window(when) else self.peak_concurrency
+
+    def refresh_estimates(self):
+        self._averages = self.queue.averages()
+
+    def job_estimate(self, rarity: str) -> Tuple[float, float]:
+        """(tokens, segundos) esperados para um job da raridade"""
+        return self._averages.get(rarity, (DEFAULT_TOKENS[rarity], DEFAULT_SECONDS[rarity]))
+
+    def job_cost(self, rarity: str, discounted: bool) -> float:
+        return token_cost(self.job_estimate(rarity)[0], discounted, self.models.get(rarity))
+
+    def exceeds_budget(self, projected_spend: float) -> bool:
+        return self.budget is not None and projected_spend > self.budget
+
+    def project(self, now: Optional[float] = None) -> Projection:
+        """Simula a política sobre a fila inacabada: custo, término e jobs cabíveis no orçamento"""
+        clock = time.time() if now is None else now
+        remaining = self.queue.unfinished_counts()
+        jobs = dict(remaining)
+        spent = self.queue.spent
+        peak_cost = window_cost = 0.0
+        affordable = 0
+        tail = 0.0
+        notes = []
+
+        while any(remaining.values()):
+            window = in_discount_window(clock)
+            allowed = [r for r in self.allowed_rarities(clock) if remaining.get(r)]
+            if not allowed:
+                # Só restam obras caras fora da janela: espera a abertura
+                clock = next_window_change(clock)
+                continue
+            rarity = allowed[0]
+            tokens, seconds = self.job_estimate(rarity)
+            step = seconds / self.concurrency_limit(clock)
+            if self.tokens_per_minute:
+                step = max(step, tokens / self.tokens_per_minute * 60)
+            cost = token_cost(tokens, window, self.models.get(rarity))
+            if window:
+                window_cost += cost
+            else:
+                peak_cost += cost
+            if not self.exceeds_budget(spent + peak_cost + window_cost):
+                affordable += 1
+            remaining[rarity] -= 1
+            tail = max(0.0, seconds - step)
+            clock += step
+
+        if self.tokens_per_minute:
+            notes.append(f"limite de {self.tokens_per_minute} tokens/min")
+        return Projection(jobs=jobs, cost=peak_cost + window_cost, peak_cost=peak_cost,
+                          window_cost=window_cost, finish_at=clock + tail, spent=spent,
+                          budget=self.budget, affordable=affordable, notes=notes)
+
+
+def format_projection(projection: Projection) -> str:
+    """Resumo legível da projeção"""
+    finish = datetime.fromtimestamp(projection.finish_at, timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    total = sum(projection.jobs.values())
+    mix = ", ".join(f"{r}={projection.jobs[r]}" for r in RARITY_ORDER if projection.jobs.get(r))
+    lines = [
+        f"📅 Projeção: {total} jobs ({mix or 'fila vazia'})",
+        f"   💰 Custo estimado: ${projection.cost:.2f} "
+        f"(pico ${projection.peak_cost:.2f} | janela ${projection.window_cost:.2f})",
+        f"   🏁 Término estimado: {finish}",
+    ]
+    if projection.spent:
+        lines.append(f"   💵 Já gasto nesta fila: ${projection.spent:.2f}")
+    if projection.budget is not None:
+        status = "✅ dentro do orçamento" if projection.within_budget else \
+            f"⚠️ orçamento cobre ~{projection.affordable} de {total} jobs"
+        lines.append(f"   🎯 Orçamento: ${projection.budget:.2f} — {status}")
+    for note in projection.notes:
+        lines.append(f"   ℹ️ {note}")
+    return "\n".join(lines)
+
+
+def parse_targets(text: str) -> Dict[str, int]:
+    """'Common=10,Legendary=2' -> {'Common': 10, 'Legendary': 2}"""
+    targets = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        rarity = name.strip().capitalize()
+        if rarity not in RARITY_ORDER:
+            raise ValueError(f"Raridade desconhecida: {name.strip()}")
+        targets[rarity] = targets.get(rarity, 0) + int(value)
+    return targets
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "status":
+        print(__doc__.strip())
+        return 1
+    nfts_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path.cwd() / "nfts"
+    queue = JobQueue(nfts_dir / "schedule.db")
+    print(f"📋 Jobs: {queue.status_counts() or 'nenhum'}")
+    for owner, count in sorted(queue.lease_owners().items()):
+        print(f"   👷 {owner}: {count} em execução")
+    scheduler = CostAwareScheduler(queue, queue.budget)
+    print(format_projection(scheduler.project()))
+    queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
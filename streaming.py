@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Streaming (SSE) da API DeepSeek
+Extrai o svg_code incrementalmente e aborta cedo quando uma regra rígida falha
+no meio do SVG (viewBox da raiz, XML malformado). Defeitos só visíveis com o SVG
+completo não abortam: a resposta segue inteira para o reparo.
+"""
+
+import json
+import time
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from svg_validator import SVGValidator, validate_svg
+
+# Escapes JSON simples (\uXXXX é tratado à parte)
+_JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b',
+                 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class StreamAborted(ValueError):
+    """Stream cancelado porque uma regra de validação foi violada"""
+
+    def __init__(self, message: str, reason: str = "invalid"):
+        super().__init__(message)
+        self.reason = reason
+
+
+class JSONFieldStreamer:
+    """Decodifica incrementalmente o valor string de uma chave top-level de um JSON parcial"""
+
+    def __init__(self, field: str, on_text: Callable[[str], None]):
+        self.field = field
+        self.on_text = on_text
+        self.done = False
+
+        self._depth = 0
+        self._expect_key = False
+        self._last_key = None
+        self._in_string = False
+        self._is_key = False
+        self._capturing = False
+        self._escape = False
+        self._unicode = None
+        self._high_surrogate = None
+        self._key_buf: List[str] = []
+
+    def _emit(self, text: str):
+        if not text:
+            return
+        if self._capturing:
+            self.on_text(text)
+        elif self._is_key:
+            self._key_buf.append(text)
+
+    def _emit_codepoint(self, code: int):
+        # Junta pares surrogate (\\ud83c\\udf00) num único caractere
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._emit(chr(code))
+
+    def _close_string(self):
+        self._in_string = False
+        if self._is_key:
+            self._last_key = "".join(self._key_buf)
+            self._key_buf = []
+        elif self._capturing:
+            self._capturing = False
+            self.done = True
+
+    def feed(self, text: str):
+        """Processa mais um pedaço do JSON"""
+        i, n = 0, len(text)
+        while i < n:
+            if self._in_string:
+                if self._unicode is not None:
+                    take = text[i:i + 4 - len(self._unicode)]
+                    self._unicode += take
+                    i += len(take)
+                    if len(self._unicode) == 4:
+                        code = int(self._unicode, 16)
+                        self._unicode = None
+                        self._emit_codepoint(code)
+                    continue
+                if self._escape:
+                    c = text[i]
+                    i += 1
+                    self._escape = False
+                    if c == 'u':
+                        self._unicode = ""
+                    else:
+                        self._emit(_JSON_ESCAPES.get(c, c))
+                    continue
+
+                # Copia em bloco até a próxima aspa ou barra invertida
+                quote = text.find('"', i)
+                backslash = text.find('\\', i)
+                if quote < 0 and backslash < 0:
+                    self._emit(text[i:])
+                    break
+                if quote < 0 or (0 <= backslash < quote):
+                    self._emit(text[i:backslash])
+                    self._escape = True
+                    i = backslash + 1
+                else:
+                    self._emit(text[i:quote])
+                    self._close_string()
+                    i = quote + 1
+                continue
+
+            c = text[i]
+            i += 1
+            if c == '"':
+                self._in_string = True
+                self._is_key = self._depth == 1 and self._expect_key
+                self._capturing = (not self._is_key and self._depth == 1
+                                   and self._last_key == self.field and not self.done)
+            elif c == '{' or c == '[':
+                self._depth += 1
+                self._expect_key = c == '{' and self._depth == 1
+            elif c == '}' or c == ']':
+                self._depth -= 1
+            elif c == ',' and self._depth == 1:
+                self._expect_key = True
+            elif c == ':' and self._depth == 1:
+                self._expect_key = False
+
+
+class StreamingSVGCheck:
+    """Validação incremental das regras rígidas do SVG"""
+
+    def __init__(self, min_animations: int, min_length: int = 500,
+                 expand: Optional[Callable[[str], str]] = None):
+        self.min_animations = min_animations
+        self.min_length = min_length
+        self.expand = expand  # macros SVG: as regras finais valem para o SVG expandido
+        self.length = 0
+        self.validator = SVGValidator()
+        self._parts: List[str] = []
+        self._root_checked = False
+        self.violations: List[Tuple[str, str]] = []
+
+    @property
+    def animation_count(self) -> int:
+        return self.validator.report.animation_total
+
+    def feed(self, text: str):
+        self._parts.append(text)
+        self.length += len(text)
+
+        if not self.validator.feed(text):
+            raise StreamAborted(f"SVG malformado: {self.validator.report.parse_error}", "malformed")
+
+        # A tag raiz chega cedo: viewBox errado já é violação definitiva
+        if not self._root_checked and self.validator.root_seen:
+            self._root_checked = True
+            violations = self.validator.report.violations()
+            if violations:
+                reason, message = violations[0]
+                raise StreamAborted(message, reason)
+
+    def finish(self) -> str:
+        """
+        Chamado quando o svg_code terminou; retorna o SVG completo e guarda as
+        violações em `violations`. Um SVG completo é reparável, então não aborta.
+        """
+        report = self.validator.close()
+        svg_code = "".join(self._parts)
+        if self.expand is not None:
+            try:
+                svg_code = self.expand(svg_code)
+            except ValueError as e:
+                self.violations = [("invalid_macro", str(e))]
+                return svg_code
+            report = validate_svg(svg_code)
+        if len(svg_code) < self.min_length:
+            self.violations = [("too_short", "SVG muito curto")]
+        else:
+            self.violations = report.violations(self.min_animations)
+        return svg_code
+
+
+def iter_sse_data(response) -> Iterator[Dict]:
+    """Itera sobre os eventos `data:` de uma resposta SSE"""
+    for raw_line in response.iter_lines():
+        if not raw_line:
+            continue
+        line = raw_line.decode("utf-8") if isinstance(raw_line, bytes) else raw_line
+        if not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            return
+        yield json.loads(payload)
+
+
+def consume_completion_stream(response, min_animations: int,
+                              started: Optional[float] = None,
+                              expand: Optional[Callable[[str], str]] = None,
+                              cancel: Optional[threading.Event] = None) -> Dict:
+    """
+    Consome o stream de chat/completions validando o svg_code em tempo real.
+    Retorna content, usage, métricas (ttft, tokens/s) e as violações do SVG
+    completo; levanta StreamAborted e fecha a conexão assim que uma regra rígida
+    é violada no meio do SVG ou `cancel` é sinalizado.
+    """
+    if started is None:
+        started = time.perf_counter()
+    first_token_at = None
+    chunks = 0
+    reasoning_chunks = 0
+    usage: Dict = {}
+    content_parts: List[str] = []
+
+    svg_check = StreamingSVGCheck(min_animations, expand=expand)
+    extractor = JSONFieldStreamer("svg_code", svg_check.feed)
+
+    try:
+        for event in iter_sse_data(response):
+            if cancel is not None and cancel.is_set():
+                raise StreamAborted("Cancelado: outra requisição já venceu", "cancelled")
+            if event.get("usage"):
+                usage = event["usage"]
+            for choice in event.get("choices", []):
+                delta = choice.get("delta") or {}
+                text = delta.get("content") or ""
+                if (text or delta.get("reasoning_content")) and first_token_at is None:
+                    first_token_at = time.perf_counter()
+                if not text:
+                    reasoning_chunks += bool(delta.get("reasoning_content"))
+                    continue
+                chunks += 1
+                content_parts.append(text)
+
+                was_done = extractor.done
+                extractor.feed(text)
+                if extractor.done and not was_done:
+                    # svg_code fechado: contagem final; os defeitos vão para o reparo
+                    svg_check.finish()
+
+        if not extractor.done:
+            svg_check.finish()
+    except StreamAborted as e:
+        # Tokens já pagos até o cancelamento (aproximação por chunks, raciocínio incluído)
+        e.completion_tokens = usage.get("completion_tokens") or chunks + reasoning_chunks
+        raise
+    finally:
+        response.close()
+
+    finished = time.perf_counter()
+    completion_tokens = usage.get("completion_tokens") or chunks
+    generation_time = finished - (first_token_at or started)
+
+    return {
+        "content": "".join(content_parts),
+        "usage": usage,
+        "ttft": (first_token_at or finished) - started,
+        "tokens_per_second": completion_tokens / generation_time if generation_time > 0 else 0.0,
+        "animation_count": svg_check.animation_count,
+        "violations": svg_check.violations,
+    }
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Supervisor de processo filho (marketplace)
+Drena stdout/stderr para um log rotativo (o filho nunca trava escrevendo num
+pipe cheio), detecta prontidão por HTTP em vez de sleeps fixos e reinicia
+com backoff exponencial quando o processo morre
+"""
+
+import os
+import time
+import random
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Intervalo entre sondagens de prontidão: começa curto e cresce até o teto
+PROBE_INITIAL_INTERVAL = 0.05
+PROBE_MAX_INTERVAL = 0.5
+
+# Leitura do pipe em blocos: custo por bloco, não por linha
+DRAIN_CHUNK = 64 * 1024
+
+
+class RotatingLog:
+    """Arquivo de log em bytes com rotação por tamanho (log, log.1, ... log.N)"""
+
+    def __init__(self, path: Path, max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def write(self, data: bytes):
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._size and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+
+    def note(self, message: str):
+        """Linha do próprio supervisor, com horário"""
+        stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.write(f"{stamp} [supervisor] {message}\n".encode("utf-8"))
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        self._file = open(self.path, "wb")
+        self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class ProcessSupervisor:
+    """Mantém um processo filho rodando; seguro para chamar de qualquer thread"""
+
+    def __init__(self, name: str, command: List[str], ready_url: Optional[str] = None,
+                 log_path: Optional[Path] = None, log_max_bytes: int = 5 * 1024 * 1024,
+                 log_backups: int = 3, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 stable_after: float = 60.0, ready_timeout: float = 30.0,
+                 cwd: Optional[Path] = None):
+        self.name = name
+        self.command = command
+        self.ready_url = ready_url
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after  # uptime que zera o backoff
+        self.ready_timeout = ready_timeout
+        self.cwd = cwd
+
+        self.restarts = 0
+        self.last_exit_code: Optional[int] = None
+        self.log_path = Path(log_path) if log_path else None
+        self._log = RotatingLog(self.log_path, log_max_bytes, log_backups) if log_path else None
+        self._process: Optional[subprocess.Popen] = None
+        self._started_at: Optional[float] = None
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._monitor: Optional[threading.Thread] = None
+        self._drain: Optional[threading.Thread] = None
+
+    def _note(self, message: str):
+        if self._log:
+            self._log.note(message)
+
+    # --- ciclo de vida -------------------------------------------------------
+
+    def start(self):
+        """Inicia o filho e a thread que o vigia (não bloqueia)"""
+        with self._lock:
+            if self._monitor is not None:
+                return
+            self._stopping.clear()
+            self._spawn()
+            self._monitor = threading.Thread(target=self._watch, name=f"{self.name}-supervisor",
+                                             daemon=True)
+            self._monitor.start()
+
+    def _spawn(self):
+        self._ready.clear()
+        self._process = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,  # um único pipe para drenar
+            stdin=subprocess.DEVNULL,
+            cwd=self.cwd
+        )
+        self._started_at = time.monotonic()
+        self._note(f"{self.name} iniciado (pid {self._process.pid})")
+        self._drain = threading.Thread(target=self._drain_output, args=(self._process,),
+                                       name=f"{self.name}-log", daemon=True)
+        self._drain.start()
+        if self.ready_url:
+            threading.Thread(target=self._probe, args=(self._process,),
+                             name=f"{self.name}-probe", daemon=True).start()
+        else:
+            self._ready.set()
+
+    def _drain_output(self, process: subprocess.Popen):
+        """Lê o pipe até EOF; sem isso o filho bloqueia quando o buffer enche"""
+        for chunk in iter(lambda: process.stdout.read1(DRAIN_CHUNK), b""):
+            if self._log:
+                self._log.write(chunk)
+        process.stdout.close()
+
+    def _probe(self, process: subprocess.Popen):
+        """Sonda ready_url até responder (qualquer status < 500) ou o processo morrer"""
+        interval = PROBE_INITIAL_INTERVAL
+        deadline = time.monotonic() + self.ready_timeout
+        while process.poll() is None and not self._stopping.is_set():
+            if self._is_responding():
+                elapsed = time.monotonic() - self._started_at
+                self._note(f"{self.name} pronto em {elapsed:.2f}s")
+                self._ready.set()
+                return
+            if time.monotonic() > deadline:
+                print(f"⚠️ {self.name} não respondeu em {self.ready_timeout:.0f}s "
+                      f"(log: {self.log_path})")
+                deadline = float("inf")  # avisa uma vez e continua sondando
+            time.sleep(interval)
+            interval = min(interval * 2, PROBE_MAX_INTERVAL)
+
+    def _is_responding(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.ready_url, timeout=1) as response:
+                return response.status < 500
+        except urllib.error.HTTPError as e:
+            return e.code < 500
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def _watch(self):
+        """Espera o filho terminar; se não foi pedido, reinicia com backoff"""
+        failures = 0
+        while True:
+            process = self._process
+            exit_code = process.wait()
+            if self._drain is not None:
+                self._drain.join(timeout=5)
+            uptime = time.monotonic() - self._started_at
+            self.last_exit_code = exit_code
+            self._ready.clear()
+            if self._stopping.is_set():
+                return
+
+            # Rodou tempo suficiente: a queda não faz parte de um loop de crash
+            failures = 0 if uptime >= self.stable_after else failures + 1
+            delay = min(self.backoff_max, self.backoff_base * (2 ** failures))
+            delay = random.uniform(delay / 2, delay)
+            print(f"💥 {self.name} caiu (código {exit_code}, após {uptime:.1f}s); "
+                  f"reiniciando em {delay:.1f}s")
+            self._note(f"saída {exit_code}; reinício em {delay:.1f}s")
+            if self._stopping.wait(delay):
+                return
+            with self._lock:
+                if self._stopping.is_set():
+                    return
+                self.restarts += 1
+                self._spawn()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até a sonda de prontidão passar (ou o timeout)"""
+        return self._ready.wait(timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """Encerra o filho (SIGTERM, depois SIGKILL) sem reiniciá-lo"""
+        self._stopping.set()
+        with self._lock:
+            process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+            self._monitor = None
+        if self._drain is not None:
+            self._drain.join(timeout)
+        if self._log:
+            self._log.close()
+
+    # --- estado --------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self.running else None
+
+    @property
+    def uptime(self) -> float:
+        """Segundos desde o último (re)início; 0 se parado"""
+        if not self.running or self._started_at is None:
+            return 0.0
+        return time.monotonic() - self._started_at
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "running": self.running,
+            "ready": self.ready,
+            "pid": self.pid,
+            "uptime_s": round(self.uptime, 1),
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "log": str(self.log_path) if self.log_path else None,
+        }
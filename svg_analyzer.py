@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Análise local do SVG para os metadados da obra
+Contagem de animações por tipo, duração do loop mestre (MMC das durações),
+paleta realmente usada e filtros presentes: valores exatos, sem pedir ao modelo
+
+Uso: python svg_analyzer.py arte.svg
+"""
+
+import re
+import sys
+import json
+import math
+from fractions import Fraction
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Union
+from xml.parsers import expat
+
+from svg_validator import ANIMATION_TAGS
+
+# Atributos de apresentação que carregam cor
+COLOR_ATTRIBUTES = ("fill", "stroke", "stop-color", "flood-color", "lighting-color", "color")
+
+# Resolução das durações: 1 ms (durações como 3.3333s não explodem o MMC)
+DURATION_RESOLUTION = 1000
+
+# Acima disso o loop mestre é reportado, mas a obra é "aperiódica" na prática
+MAX_PERCEIVED_LOOP = 3600.0
+
+# Cores nomeadas mais comuns em SVGs gerados (o resto é ignorado)
+NAMED_COLORS = {
+    "black": "#000000", "white": "#FFFFFF", "red": "#FF0000", "green": "#008000",
+    "blue": "#0000FF", "yellow": "#FFFF00", "cyan": "#00FFFF", "aqua": "#00FFFF",
+    "magenta": "#FF00FF", "fuchsia": "#FF00FF", "orange": "#FFA500", "purple": "#800080",
+    "pink": "#FFC0CB", "gold": "#FFD700", "silver": "#C0C0C0", "gray": "#808080",
+    "grey": "#808080", "navy": "#000080", "teal": "#008080", "lime": "#00FF00",
+    "indigo": "#4B0082", "violet": "#EE82EE", "crimson": "#DC143C", "turquoise": "#40E0D0",
+}
+
+HEX_RE = re.compile(r"#(?:[0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b")
+RGB_RE = re.compile(r"rgba?\(\s*(\d{1,3}%?)\s*[, ]\s*(\d{1,3}%?)\s*[, ]\s*(\d{1,3}%?)")
+NAME_RE = re.compile(r"\b(" + "|".join(NAMED_COLORS) + r")\b", re.IGNORECASE)
+CLOCK_RE = re.compile(r"^(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)$")
+TIMECOUNT_RE = re.compile(r"^(\d+(?:\.\d+)?|\.\d+)(h|min|s|ms)?$")
+
+TIMECOUNT_UNITS = {"h": 3600.0, "min": 60.0, "s": 1.0, "ms": 0.001, None: 1.0}
+
+# Recursos reconhecíveis -> rótulo em special_features
+FEATURE_LABELS = {
+    "morphing": "Morphing de formas",
+    "motion_path": "Movimento em trajetória",
+    "rotation": "Rotações hipnóticas",
+    "scale": "Pulsação de escala",
+    "color_shift": "Ondulação de cor",
+    "gradient_animation": "Gradientes animados",
+    "opacity": "Opacidade fantasmagórica",
+    "feTurbulence": "Turbulência orgânica",
+    "feDisplacementMap": "Distorção líquida",
+    "feGaussianBlur": "Desfoque dinâmico",
+    "polyrhythm": "Polirritmia",
+}
+
+
+@dataclass
+class SVGAnalysis:
+    """Atributos derivados do próprio SVG"""
+    animation_counts: Dict[str, int] = field(default_factory=dict)
+    animated_attributes: Dict[str, int] = field(default_factory=dict)
+    durations: List[float] = field(default_factory=list)  # só animações em loop
+    loop_duration: Optional[float] = None
+    palette: List[str] = field(default_factory=list)
+    filters: Dict[str, int] = field(default_factory=dict)
+    gradients: int = 0
+    element_count: int = 0
+
+    @property
+    def animation_count(self) -> int:
+        return sum(self.animation_counts.values())
+
+    @property
+    def longest_cycle(self) -> Optional[float]:
+        return max(self.durations) if self.durations else None
+
+    @property
+    def distinct_durations(self) -> int:
+        return len(set(self.durations))
+
+    @property
+    def special_features(self) -> List[str]:
+        found = []
+        attrs = self.animated_attributes
+        if attrs.get("d"):
+            found.append("morphing")
+        if self.animation_counts.get("animateMotion"):
+            found.append("motion_path")
+        if attrs.get("transform:rotate"):
+            found.append("rotation")
+        if attrs.get("transform:scale"):
+            found.append("scale")
+        if any(attrs.get(a) for a in ("fill", "stroke", "color", "flood-color")):
+            found.append("color_shift")
+        if attrs.get("stop-color") or attrs.get("offset"):
+            found.append("gradient_animation")
+        if attrs.get("opacity") or attrs.get("fill-opacity") or attrs.get("stroke-opacity"):
+            found.append("opacity")
+        found.extend(f for f in ("feTurbulence", "feDisplacementMap", "feGaussianBlur")
+                     if self.filters.get(f))
+        if self.distinct_durations >= 3:
+            found.append("polyrhythm")
+        return [FEATURE_LABELS[f] for f in found]
+
+    @property
+    def hypnotic_factor(self) -> int:
+        """1-10: densidade de movimento, variedade de ritmos, filtros e recursos"""
+        score = (min(self.animation_count, 40) / 40 * 4
+                 + min(self.distinct_durations, 8) / 8 * 3
+                 + min(len(self.filters), 3) / 3 * 1.5
+                 + min(len(self.special_features), 6) / 6 * 1.5)
+        return max(1, min(10, round(score)))
+
+    def attributes(self, complexity: int, colors: int = 6) -> Dict:
+        """Campo `attributes` da obra (antes pedido ao modelo)"""
+        loop = self.loop_duration
+        return {
+            "animation_count": self.animation_count,
+            "animation_types": {k: v for k, v in self.animation_counts.items() if v},
+            "complexity": complexity,
+            "hypnotic_factor": self.hypnotic_factor,
+            "primary_colors": self.palette[:colors],
+            "palette_size": len(self.palette),
+            "loop_duration": _round(loop),
+            "perceived_loop": _round(loop if loop is not None and loop <= MAX_PERCEIVED_LOOP
+                                     else self.longest_cycle),
+            "filters": sorted(self.filters),
+            "special_features": self.special_features,
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 3)
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Clock value SMIL ('3s', '500ms', '1.5min', '00:02.5', '4') em segundos"""
+    if not value:
+        return None
+    value = value.strip()
+    match = TIMECOUNT_RE.match(value)
+    if match:
+        seconds = float(match.group(1)) * TIMECOUNT_UNITS[match.group(2)]
+        return seconds if seconds > 0 else None
+    match = CLOCK_RE.match(value)
+    if match:
+        hours, minutes, seconds = match.groups()
+        total = int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds)
+        return total if total > 0 else None
+    return None  # 'indefinite', 'media' ou inválido
+
+
+def master_loop(durations: List[float]) -> Optional[float]:
+    """MMC das durações: instante em que todas as animações voltam juntas ao início"""
+    if not durations:
+        return None
+    fractions = {Fraction(d).limit_denominator(DURATION_RESOLUTION) for d in durations}
+    denominator = 1
+    for f in fractions:
+        denominator = denominator * f.denominator // math.gcd(denominator, f.denominator)
+    period = 1
+    for f in fractions:
+        ticks = f.numerator * (denominator // f.denominator)
+        period = period * ticks // math.gcd(period, ticks)
+    return period / denominator
+
+
+def normalize_color(value: str) -> List[str]:
+    """Cores (#RRGGBB) encontradas num valor de atributo ou lista de valores"""
+    if not value:
+        return []
+    value = re.sub(r"url\([^)]*\)", "", value)  # referência a gradiente, não cor
+    colors = []
+    for hex_color in HEX_RE.findall(value):
+        digits = hex_color[1:]
+        if len(digits) == 3:
+            digits = "".join(c * 2 for c in digits)
+        colors.append("#" + digits.upper())
+    for r, g, b in RGB_RE.findall(value):
+        channels = [round(int(c[:-1]) * 2.55) if c.endswith("%") else int(c) for c in (r, g, b)]
+        colors.append("#" + "".join(f"{min(c, 255):02X}" for c in channels))
+    for name in NAME_RE.findall(value):
+        colors.append(NAMED_COLORS[name.lower()])
+    return colors
+
+
+def _local_name(name: str) -> str:
+    return name.rsplit(":", 1)[-1]
+
+
+def _style_declarations(style: str) -> Dict[str, str]:
+    declarations = {}
+    for part in style.split(";"):
+        prop, _, value = part.partition(":")
+        if value:
+            declarations[prop.strip()] = value.strip()
+    return declarations
+
+
+class _Collector:
+    def __init__(self):
+        self.analysis = SVGAnalysis(animation_counts={t: 0 for t in ANIMATION_TAGS})
+        self.colors: Counter = Counter()
+        self.animated: Counter = Counter()
+        self.filters: Counter = Counter()
+        self.in_style = False
+
+    def start(self, name: str, attrs: Dict[str, str]):
+        tag = _local_name(name)
+        analysis = self.analysis
+        analysis.element_count += 1
+
+        if tag in analysis.animation_counts:
+            analysis.animation_counts[tag] += 1
+            attribute = attrs.get("attributeName", "")
+            if tag == "animateTransform":
+                attribute = f"transform:{attrs.get('type', 'translate')}"
+            elif tag == "animateMotion":
+                attribute = "motion"
+            self.animated[attribute] += 1
+            duration = parse_duration(attrs.get("dur"))
+            if duration and attrs.get("repeatCount") == "indefinite":
+                analysis.durations.append(duration)
+            if attribute in COLOR_ATTRIBUTES:
+                for key in ("values", "from", "to", "by"):
+                    self.colors.update(normalize_color(attrs.get(key, "")))
+        elif tag.startswith("fe") and len(tag) > 2:
+            self.filters[tag] += 1
+        elif tag in ("linearGradient", "radialGradient"):
+            analysis.gradients += 1
+        elif tag == "style":
+            self.in_style = True
+
+        for attr in COLOR_ATTRIBUTES:
+            if attr in attrs:
+                self.colors.update(normalize_color(attrs[attr]))
+        if "style" in attrs:
+            for prop, value in _style_declarations(attrs["style"]).items():
+                if prop in COLOR_ATTRIBUTES:
+                    self.colors.update(normalize_color(value))
+
+    def end(self, name: str):
+        if _local_name(name) == "style":
+            self.in_style = False
+
+    def text(self, data: str):
+        if self.in_style:
+            self.colors.update(normalize_color(data))
+
+    def finish(self) -> SVGAnalysis:
+        analysis = self.analysis
+        analysis.animated_attributes = dict(self.animated)
+        analysis.filters = dict(self.filters)
+        analysis.palette = [color for color, _ in self.colors.most_common()]
+        analysis.loop_duration = master_loop(analysis.durations)
+        return analysis
+
+
+def analyze_svg(svg_code: Union[str, bytes]) -> SVGAnalysis:
+    """Analisa um SVG completo (mesmo parser do validador; tolera SVG truncado)"""
+    collector = _Collector()
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = collector.start
+    parser.EndElementHandler = collector.end
+    parser.CharacterDataHandler = collector.text
+    if isinstance(svg_code, str):
+        svg_code = svg_code.encode("utf-8")
+    try:
+        parser.Parse(svg_code.lstrip(), True)
+    except expat.ExpatError:
+        pass  # o que foi lido até o erro ainda vale
+    return collector.finish()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return 1
+    with open(sys.argv[1], "rb") as f:
+        analysis = analyze_svg(f.read())
+    print(json.dumps({**asdict(analysis), **analysis.attributes(complexity=0)},
+                     indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Vocabulário compacto de macros SVG, expandido localmente
+O modelo escreve <spin d="20"/> em vez de ~150 caracteres de SMIL; o expansor
+troca cada macro pelo SVG completo antes da validação e do salvamento
+
+Uso: python svg_macros.py arte_com_macros.svg > arte.svg
+"""
+
+import re
+import sys
+from typing import Callable, Dict, List
+
+from svg_analyzer import parse_duration
+
+# Curva de easing padrão (ease-in-out) para calcMode="spline"
+EASE_SPLINE = "0.42 0 0.58 1"
+
+# Referência do formato: vai no prompt (modo --svg-macros) e documenta o expansor
+MACRO_REFERENCE = """MACROS SVG (use no lugar do SMIL verboso; são expandidas para SVG completo):
+Todas são tags autofechadas. d = duração (número = segundos). Todas as animações
+já saem com repeatCount="indefinite" e easing spline; atributos extras (begin,
+id, ...) são copiados para o elemento gerado.
+
+Animações (filhas do elemento animado, como no SMIL):
+- <spin d="20" c="500 500" rev="1"/>       rotação completa em torno de c (padrão 500 500); rev inverte
+- <ease a="r" v="50;80;50" d="4"/>        anima qualquer atributo (r, d, fill, opacity, stroke-width...)
+- <grow v="1;1.4;1" d="7"/>               pulsação de escala
+- <drift v="0,0;40,-20;0,0" d="9"/>       translação entre pontos
+- <orbit p="spiral" d="15" rot="auto"/>   movimento no path de id "spiral" (ou p="M..." inline)
+
+Definições (dentro de <defs>):
+- <liquid id="liquid" f="0.02;0.05;0.02" s="20" d="10" o="3"/>  turbulência animada + feDisplacementMap
+- <glow id="glow" v="2;8;2" d="6"/>                               desfoque animado somado ao original
+- <grad id="g1" c="#FF006E;#3A86FF;#8338EC" d="5" kind="radial"/> gradiente com cores em ciclo
+
+Exemplo: <circle cx="500" cy="500" r="60" fill="url(#g1)" filter="url(#glow)">
+<ease a="r" v="60;90;60" d="4"/><spin d="20"/></circle>
+Tags SVG/SMIL normais continuam válidas e podem ser misturadas às macros."""
+
+
+class MacroError(ValueError):
+    """Macro com atributo obrigatório ausente ou valor inválido"""
+
+
+def _attrs(text: str) -> Dict[str, str]:
+    return dict(ATTR_RE.findall(text))
+
+
+def _render(tag: str, attrs: Dict[str, str], body: str = "") -> str:
+    rendered = "".join(f' {k}="{v}"' for k, v in attrs.items() if v is not None)
+    if body:
+        return f"<{tag}{rendered}>{body}</{tag}>"
+    return f"<{tag}{rendered}/>"
+
+
+def _require(macro: str, attrs: Dict[str, str], *names: str):
+    missing = [n for n in names if not attrs.get(n)]
+    if missing:
+        raise MacroError(f"Macro <{macro}> sem o atributo obrigatório: {', '.join(missing)}")
+
+
+def _dur(macro: str, attrs: Dict[str, str], default: str = None) -> str:
+    value = attrs.pop("d", default)
+    if value is None:
+        raise MacroError(f"Macro <{macro}> sem o atributo obrigatório: d")
+    seconds = parse_duration(value)
+    if seconds is None:
+        raise MacroError(f"Macro <{macro}>: duração inválida d=\"{value}\"")
+    return f"{value}s" if value.replace(".", "", 1).isdigit() else value
+
+
+def _values(macro: str, value: str) -> List[str]:
+    values = [v.strip() for v in value.split(";") if v.strip()]
+    if len(values) < 2:
+        raise MacroError(f"Macro <{macro}>: v precisa de pelo menos 2 valores separados por ';'")
+    return values
+
+
+def _spline(count: int) -> Dict[str, str]:
+    """keyTimes uniformes + keySplines ease-in-out para `count` valores"""
+    segments = count - 1
+    times = ";".join(f"{i / segments:.4g}" for i in range(count))
+    return {"calcMode": "spline", "keyTimes": times,
+            "keySplines": ";".join([EASE_SPLINE] * segments)}
+
+
+def _animated(macro: str, attrs: Dict[str, str], values: str) -> Dict[str, str]:
+    """Atributos comuns de uma animação em loop com easing"""
+    steps = _values(macro, values)
+    return {"values": ";".join(steps), "dur": _dur(macro, attrs),
+            "repeatCount": "indefinite", **_spline(len(steps))}
+
+
+def _spin(attrs: Dict[str, str]) -> str:
+    center = attrs.pop("c", "500 500")
+    turn = "-360" if attrs.pop("rev", None) not in (None, "0", "false") else "360"
+    return _render("animateTransform", {
+        "attributeName": "transform", "type": "rotate", "from": f"0 {center}",
+        "to": f"{turn} {center}", "dur": _dur("spin", attrs), "repeatCount": "indefinite",
+        "additive": "sum", **attrs})
+
+
+def _ease(attrs: Dict[str, str]) -> str:
+    _require("ease", attrs, "a", "v")
+    name = attrs.pop("a")
+    return _render("animate", {"attributeName": name,
+                               **_animated("ease", attrs, attrs.pop("v")), **attrs})
+
+
+def _transform(macro: str, kind: str) -> Callable[[Dict[str, str]], str]:
+    def expand(attrs: Dict[str, str]) -> str:
+        _require(macro, attrs, "v")
+        return _render("animateTransform", {
+            "attributeName": "transform", "type": kind,
+            **_animated(macro, attrs, attrs.pop("v")), "additive": "sum", **attrs})
+    return expand
+
+
+def _orbit(attrs: Dict[str, str]) -> str:
+    _require("orbit", attrs, "p")
+    path = attrs.pop("p")
+    motion = {"dur": _dur("orbit", attrs), "repeatCount": "indefinite",
+              "rotate": attrs.pop("rot", None)}
+    if path[:1] in "Mm":
+        return _render("animateMotion", {**motion, "path": path, **attrs})
+    return _render("animateMotion", {**motion, **attrs},
+                   f'<mpath href="#{path.lstrip("#")}"/>')
+
+
+def _liquid(attrs: Dict[str, str]) -> str:
+    _require("liquid", attrs, "id")
+    frequencies = _values("liquid", attrs.pop("f", "0.02;0.05;0.02"))
+    turbulence = _render("feTurbulence", {
+        "type": "fractalNoise", "baseFrequency": frequencies[0],
+        "numOctaves": attrs.pop("o", "3"), "result": "noise"},
+        _render("animate", {"attributeName": "baseFrequency", "values": ";".join(frequencies),
+                            "dur": _dur("liquid", attrs, "10"), "repeatCount": "indefinite",
+                            **_spline(len(frequencies))}))
+    displacement = _render("feDisplacementMap", {
+        "in": "SourceGraphic", "in2": "noise", "scale": attrs.pop("s", "20"),
+        "xChannelSelector": "R", "yChannelSelector": "G"})
+    return _render("filter", {"x": "-20%", "y": "-20%", "width": "140%", "height": "140%",
+                              **attrs}, turbulence + displacement)
+
+
+def _glow(attrs: Dict[str, str]) -> str:
+    _require("glow", attrs, "id")
+    deviations = _values("glow", attrs.pop("v", "2;8;2"))
+    blur = _render("feGaussianBlur", {"in": "SourceGraphic", "stdDeviation": deviations[0],
+                                      "result": "blur"},
+                   _render("animate", {"attributeName": "stdDeviation",
+                                       **_animated("glow", attrs, ";".join(deviations))}))
+    merge = "<feMerge><feMergeNode in=\"blur\"/><feMergeNode in=\"SourceGraphic\"/></feMerge>"
+    return _render("filter", {"x": "-50%", "y": "-50%", "width": "200%", "height": "200%",
+                              **attrs}, blur + merge)
+
+
+def _grad(attrs: Dict[str, str]) -> str:
+    _require("grad", attrs, "id", "c")
+    colors = _values("grad", attrs.pop("c"))
+    kind = "linearGradient" if attrs.pop("kind", "radial") == "linear" else "radialGradient"
+    duration = _dur("grad", attrs) if "d" in attrs else None
+    stops = []
+    for i, color in enumerate(colors):
+        animation = ""
+        if duration:
+            # Cada parada percorre o ciclo de cores a partir da sua própria cor
+            cycle = colors[i:] + colors[:i] + [color]
+            animation = _render("animate", {"attributeName": "stop-color",
+                                            "values": ";".join(cycle), "dur": duration,
+                                            "repeatCount": "indefinite"})
+        offset = f"{i / (len(colors) - 1) * 100:.4g}%"
+        stops.append(_render("stop", {"offset": offset, "stop-color": color}, animation))
+    return _render(kind, attrs, "".join(stops))
+
+
+EXPANDERS: Dict[str, Callable[[Dict[str, str]], str]] = {
+    "spin": _spin,
+    "ease": _ease,
+    "grow": _transform("grow", "scale"),
+    "drift": _transform("drift", "translate"),
+    "orbit": _orbit,
+    "liquid": _liquid,
+    "glow": _glow,
+    "grad": _grad,
+}
+
+MACRO_RE = re.compile(r"<(" + "|".join(EXPANDERS) + r")\b([^<>]*?)(?:/>|>\s*</\1\s*>)")
+ATTR_RE = re.compile(r"([\w:-]+)\s*=\s*\"([^\"]*)\"")
+
+
+def has_macros(svg_code: str) -> bool:
+    return MACRO_RE.search(svg_code) is not None
+
+
+def expand_macros(svg_code: str) -> str:
+    """SVG com macros -> SVG puro; levanta MacroError na primeira macro inválida"""
+    if not has_macros(svg_code):
+        return svg_code  # caminho rápido: SVG já expandido ou escrito à mão
+    return MACRO_RE.sub(lambda m: EXPANDERS[m.group(1)](_attrs(m.group(2))), svg_code)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return 1
+    with open(sys.argv[1], encoding="utf-8") as f:
+        svg_code = f.read()
+    try:
+        sys.stdout.write(expand_macros(svg_code))
+    except MacroError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Otimização/minificação de SVG antes de salvar
+Remove comentários e espaços, arredonda números, deduplica gradientes/filtros
+e encurta ids preservando href/url(#id) e o conjunto de animações
+"""
+
+import re
+import math
+import xml.etree.ElementTree as ET
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+from svg_validator import ANIMATION_TAGS, validate_svg
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+NUMBER_RE = re.compile(r"-?\d*\.\d+(?:[eE][-+]?\d+)?")
+URL_REF_RE = re.compile(r"url\(\s*(['\"]?)#([^'\")\s]+)\1\s*\)")
+SYNCBASE_RE = re.compile(
+    r"([A-Za-z_][\w-]*)\.(begin|end|repeat|click|mouseover|mouseout|mousedown|mouseup|focusin|focusout|activate)\b"
+)
+
+# Atributos de tempo ficam intactos para não alterar o ritmo das animações
+TIMING_ATTRS = {"dur", "begin", "end", "repeatDur", "repeatCount", "keyTimes", "keySplines", "min", "max"}
+SKIP_ROUNDING = TIMING_ATTRS | {"id", "href", "class", "version", "attributeName", "type"}
+# Valores animados ficam exatos: entram na assinatura que garante animações intactas
+ANIMATION_VALUE_ATTRS = {"values", "from", "to", "by"}
+
+# Valores padrão não herdados que podem ser omitidos com segurança
+DEFAULT_ATTRS = {
+    None: {"opacity": "1"},
+    "rect": {"x": "0", "y": "0"},
+    "use": {"x": "0", "y": "0"},
+    "image": {"x": "0", "y": "0"},
+    "circle": {"cx": "0", "cy": "0"},
+    "ellipse": {"cx": "0", "cy": "0"},
+}
+
+DEDUPE_TAGS = {"linearGradient", "radialGradient", "filter"}
+TEXT_TAGS = {"text", "tspan", "textPath", "title", "desc", "style", "script"}
+
+
+@dataclass
+class OptimizationResult:
+    """SVG otimizado e estatísticas do processo"""
+    svg_code: str
+    original_bytes: int
+    optimized_bytes: int
+    applied: bool = True
+    stats: Dict[str, int] = field(default_factory=dict)
+    reason: Optional[str] = None
+
+    @property
+    def saved_ratio(self) -> float:
+        if not self.original_bytes:
+            return 0.0
+        return 1 - self.optimized_bytes / self.original_bytes
+
+
+def _local(name: str) -> str:
+    return name.rsplit("}", 1)[-1]
+
+
+def _short_ids() -> Iterator[str]:
+    """a, b, ..., z, aa, ab, ..., a0, ... (sempre começando com letra)"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    tail = letters + "0123456789"
+    width = 0
+    while True:
+        if width == 0:
+            yield from letters
+        else:
+            for first in letters:
+                for suffix in _product(tail, width):
+                    yield first + suffix
+        width += 1
+
+
+def _product(alphabet: str, width: int) -> Iterator[str]:
+    if width == 0:
+        yield ""
+        return
+    for head in alphabet:
+        for rest in _product(alphabet, width - 1):
+            yield head + rest
+
+
+def _animation_signature(root: ET.Element) -> Counter:
+    """Multiconjunto de animações: tipo, atributo animado, duração, repetição e valores"""
+    signature = Counter()
+    for el in root.iter():
+        if not isinstance(el.tag, str):
+            continue
+        tag = _local(el.tag)
+        if tag in ANIMATION_TAGS:
+            signature[(tag, el.get("attributeName"), el.get("type"),
+                       el.get("dur"), el.get("repeatCount"),
+                       *(el.get(attr) for attr in sorted(ANIMATION_VALUE_ATTRS)))] += 1
+    return signature
+
+
+class SVGOptimizer:
+    """Pipeline de otimização configurável"""
+
+    def __init__(self, precision: int = 3, dedupe: bool = True, shorten_ids: bool = True):
+        self.precision = precision
+        self.dedupe = dedupe
+        self.shorten_ids = shorten_ids
+
+    def optimize(self, svg_code: str) -> OptimizationResult:
+        """Otimiza o SVG; devolve o original se algo puder alterar as animações"""
+        original_bytes = len(svg_code.encode("utf-8"))
+        stats = Counter()
+
+        try:
+            root = ET.fromstring(svg_code)
+        except ET.ParseError as e:
+            return OptimizationResult(svg_code, original_bytes, original_bytes,
+                                      applied=False, reason=f"parse: {e}")
+
+        before = _animation_signature(root)
+        parents = {child: parent for parent in root.iter() for child in parent}
+
+        self._strip_whitespace(root, stats)
+        self._round_numbers(root, stats)
+        self._remove_defaults(root, stats)
+        if self.dedupe:
+            self._dedupe_definitions(root, parents, stats)
+        if self.shorten_ids and not any(_local(el.tag) in ("style", "script") for el in root.iter()):
+            self._shorten_ids(root, stats)
+        self._remove_empty_defs(root, parents, stats)
+
+        # ET escapa ">" em atributos, então " />" só ocorre no fechamento de tags
+        optimized = ET.tostring(root, encoding="unicode").replace(" />", "/>")
+
+        # Garantia: o conjunto de animações continua idêntico
+        report = validate_svg(optimized)
+        if _animation_signature(root) != before or not report.well_formed:
+            return OptimizationResult(svg_code, original_bytes, original_bytes,
+                                      applied=False, reason="animações alteradas")
+
+        return OptimizationResult(
+            svg_code=optimized,
+            original_bytes=original_bytes,
+            optimized_bytes=len(optimized.encode("utf-8")),
+            stats=dict(stats)
+        )
+
+    def _strip_whitespace(self, root: ET.Element, stats: Counter):
+        for el in root.iter():
+            keep_text = _local(el.tag) in TEXT_TAGS
+            if el.text is not None and not keep_text and not el.text.strip():
+                el.text = None
+                stats["whitespace"] += 1
+            for child in el:
+                if child.tail is not None and not keep_text and not child.tail.strip():
+                    child.tail = None
+        root.tail = None
+
+    def _round_numbers(self, root: ET.Element, stats: Counter):
+        precision = self.precision
+
+        def fmt(match: re.Match) -> str:
+            text = match.group(0)
+            if "e" in text or "E" in text:
+                return text
+            value = float(text)
+            # `precision` casas decimais, mas nunca menos que `precision` algarismos
+            # significativos: baseFrequency="0.0004" não pode virar 0
+            digits = precision
+            if value:
+                digits = max(precision, precision - 1 - math.floor(math.log10(abs(value))))
+            decimals = len(text) - text.index(".") - 1
+            if decimals <= digits:
+                return text
+            out = f"{round(value, digits):.{digits}f}".rstrip("0").rstrip(".")
+            if out in ("-0", ""):
+                out = "0"
+            stats["numbers"] += 1
+            return out
+
+        for el in root.iter():
+            animation = _local(el.tag) in ANIMATION_TAGS
+            for attr, value in el.attrib.items():
+                name = _local(attr)
+                if name in SKIP_ROUNDING or "." not in value:
+                    continue
+                if animation and name in ANIMATION_VALUE_ATTRS:
+                    continue
+                el.set(attr, NUMBER_RE.sub(fmt, value))
+
+    def _remove_defaults(self, root: ET.Element, stats: Counter):
+        for el in root.iter():
+            tag = _local(el.tag)
+            for defaults in (DEFAULT_ATTRS[None], DEFAULT_ATTRS.get(tag, {})):
+                for attr, default in defaults.items():
+                    if el.get(attr) == default:
+                        del el.attrib[attr]
+                        stats["defaults"] += 1
+
+    def _dedupe_definitions(self, root: ET.Element, parents: Dict, stats: Counter):
+        seen: Dict[str, str] = {}
+        mapping: Dict[str, str] = {}
+
+        for el in list(root.iter()):
+            if _local(el.tag) not in DEDUPE_TAGS or el.get("id") is None:
+                continue
+            # Gradiente/filtro animado: cada cópia tem suas animações, que precisam sobreviver
+            if any(_local(child.tag) in ANIMATION_TAGS for child in el.iter()):
+                continue
+            element_id = el.get("id")
+            del el.attrib["id"]
+            canonical = ET.tostring(el, encoding="unicode")
+            el.set("id", element_id)
+
+            if canonical in seen:
+                mapping[element_id] = seen[canonical]
+                parents[el].remove(el)
+                stats["deduped"] += 1
+            else:
+                seen[canonical] = element_id
+
+        if mapping:
+            self._rewrite_references(root, mapping)
+
+    def _shorten_ids(self, root: ET.Element, stats: Counter):
+        names = _short_ids()
+        mapping = {}
+        for el in root.iter():
+            element_id = el.get("id")
+            if element_id is None or element_id in mapping:
+                continue
+            mapping[element_id] = next(names)
+
+        for el in root.iter():
+            element_id = el.get("id")
+            if element_id in mapping:
+                el.set("id", mapping[element_id])
+        self._rewrite_references(root, mapping)
+        stats["ids"] += len(mapping)
+
+    def _rewrite_references(self, root: ET.Element, mapping: Dict[str, str]):
+        """Atualiza href, url(#id) e referências syncbase (id.end) para novos ids"""
+        def url_sub(match: re.Match) -> str:
+            target = mapping.get(match.group(2), match.group(2))
+            return f"url(#{target})"
+
+        def syncbase_sub(match: re.Match) -> str:
+            return f"{mapping.get(match.group(1), match.group(1))}.{match.group(2)}"
+
+        for el in root.iter():
+            for attr, value in el.attrib.items():
+                name = _local(attr)
+                if name == "href" and value.startswith("#"):
+                    el.set(attr, "#" + mapping.get(value[1:], value[1:]))
+                elif name in ("begin", "end"):
+                    el.set(attr, SYNCBASE_RE.sub(syncbase_sub, value))
+                elif "url(" in value:
+                    el.set(attr, URL_REF_RE.sub(url_sub, value))
+
+    def _remove_empty_defs(self, root: ET.Element, parents: Dict, stats: Counter):
+        for el in list(root.iter()):
+            if _local(el.tag) == "defs" and len(el) == 0 and el in parents:
+                parents[el].remove(el)
+                stats["empty_defs"] += 1
+
+
+def optimize_svg(svg_code: str, precision: int = 3) -> OptimizationResult:
+    """Atalho para otimizar com as opções padrão"""
+    return SVGOptimizer(precision=precision).optimize(svg_code)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Reparo de SVGs rejeitados pelo validador
+Correções locais determinísticas quando possível; senão, um turno curto de
+correção na mesma conversa descrevendo o defeito exato
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from svg_validator import SVGReport
+
+EXPECTED_VIEWBOX_ATTR = 'viewBox="0 0 1000 1000"'
+
+# Formas que podem receber uma pulsação de opacidade sem mudar a composição
+PULSE_TAGS = ("circle", "ellipse", "rect", "path", "polygon", "polyline", "line")
+
+# Conteúdo não renderizado diretamente: animar ali não conta como movimento visível
+HIDDEN_CONTAINERS = ("defs", "clipPath", "mask", "pattern", "symbol", "marker", "linearGradient",
+                     "radialGradient", "filter")
+
+# Durações primas entre si: polirritmia em vez de pulsos sincronizados
+PULSE_DURATIONS = (7, 11, 13, 17, 19, 23, 29)
+
+ROOT_TAG_RE = re.compile(r"<svg\b[^>]*>")
+VIEWBOX_ATTR_RE = re.compile(r"""\sviewBox\s*=\s*(["']).*?\1""")
+TAG_RE = re.compile(r"<(/?)([A-Za-z][\w:.-]*)([^>]*?)(/?)>")
+
+
+def fix_viewbox(svg_code: str) -> Optional[str]:
+    """Força viewBox="0 0 1000 1000" na tag raiz"""
+    match = ROOT_TAG_RE.search(svg_code)
+    if match is None:
+        return None
+    tag = match.group(0)
+    if VIEWBOX_ATTR_RE.search(tag):
+        fixed = VIEWBOX_ATTR_RE.sub(" " + EXPECTED_VIEWBOX_ATTR, tag, count=1)
+    else:
+        fixed = tag[:4] + " " + EXPECTED_VIEWBOX_ATTR + tag[4:]
+    return svg_code[:match.start()] + fixed + svg_code[match.end():]
+
+
+def add_pulse_animations(svg_code: str, count: int) -> Optional[str]:
+    """
+    Converte `count` formas vazias (<circle .../>) em formas com uma pulsação
+    de opacidade. Retorna None se não houver formas suficientes.
+    """
+    candidates = []
+    hidden_depth = 0
+    for match in TAG_RE.finditer(svg_code):
+        closing, name, _, self_closing = match.groups()
+        local = name.rsplit(":", 1)[-1]
+        if local in HIDDEN_CONTAINERS and not self_closing:
+            hidden_depth += -1 if closing else 1
+            continue
+        if hidden_depth == 0 and not closing and self_closing and local in PULSE_TAGS:
+            candidates.append((match, name))
+    if len(candidates) < count:
+        return None
+
+    # Espalha as pulsações pela arte em vez de concentrar nas primeiras formas
+    step = len(candidates) / count
+    chosen = [candidates[int(i * step)] for i in range(count)]
+
+    parts = []
+    last = 0
+    for i, (match, name) in enumerate(chosen):
+        duration = PULSE_DURATIONS[i % len(PULSE_DURATIONS)]
+        attrs = match.group(3).rstrip()
+        parts.append(svg_code[last:match.start()])
+        parts.append(f'<{name}{attrs}><animate attributeName="opacity" values="1;0.55;1" '
+                     f'dur="{duration}s" calcMode="spline" keySplines="0.4 0 0.6 1;0.4 0 0.6 1" '
+                     f'repeatCount="indefinite"/></{name}>')
+        last = match.end()
+    parts.append(svg_code[last:])
+    return "".join(parts)
+
+
+def repair_locally(svg_code: str, report: Optional[SVGReport], violations: List[Tuple[str, str]],
+                   min_animations: int, max_added_animations: int = 4) -> Optional[str]:
+    """
+    Correções determinísticas sem chamar a API. Só atua quando todas as violações
+    são corrigíveis localmente (viewBox e pequenos déficits de animação).
+    """
+    if report is None or not report.well_formed or report.root_tag != "svg":
+        return None
+
+    fixed = svg_code
+    for reason, _ in violations:
+        if reason == "viewbox":
+            fixed = fix_viewbox(fixed)
+        elif reason == "few_animations":
+            deficit = min_animations - report.animation_total
+            if deficit > max_added_animations:
+                return None
+            fixed = add_pulse_animations(fixed, deficit)
+        else:
+            return None
+        if fixed is None:
+            return None
+    return fixed
+
+
+def repair_instructions(violations: List[Tuple[str, str]], report: Optional[SVGReport],
+                        min_animations: int, svg_length: int) -> str:
+    """Mensagem de correção (turno de usuário) descrevendo cada defeito exato"""
+    items = []
+    for reason, message in violations:
+        if reason == "few_animations" and report is not None:
+            deficit = min_animations - report.animation_total
+            items.append(f"Adicione pelo menos {deficit} novas animações SMIL (o SVG tem "
+                         f"{report.animation_total}, o mínimo é {min_animations}), todas com "
+                         f"repeatCount=\"indefinite\"; mantenha o restante da arte.")
+        elif reason == "viewbox" and report is not None:
+            current = report.root_viewbox or "ausente"
+            items.append(f"O elemento raiz <svg> deve usar exatamente {EXPECTED_VIEWBOX_ATTR} "
+                         f"(atual: {current}); ajuste as coordenadas se necessário.")
+        elif reason == "root_tag" and report is not None:
+            items.append(f"O elemento raiz deve ser <svg> (atual: <{report.root_tag}>).")
+        elif reason in ("malformed", "incomplete"):
+            detail = f" ({report.parse_error})" if report is not None and report.parse_error else ""
+            items.append(f"O SVG está malformado{detail}. Reenvie o documento completo e "
+                         f"bem-formado, com todas as tags fechadas.")
+        elif reason == "too_short":
+            items.append(f"O svg_code tem só {svg_length} caracteres: gere a obra completa, "
+                         f"com todos os elementos e animações pedidos.")
+        elif reason == "invalid_json":
+            items.append(f"{message}. Responda apenas com o JSON no formato pedido.")
+        else:
+            items.append(message)
+
+    bullets = "\n".join(f"- {item}" for item in items)
+    return (f"A obra anterior foi rejeitada pelo validador:\n{bullets}\n\n"
+            "Corrija apenas esses pontos e responda com o JSON completo no mesmo formato "
+            "(svg_code inteiro, não um trecho).")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Validador SVG incremental de passada única (expat)
+Aceita bytes ou pedaços de texto, podendo rodar direto sobre um stream
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple, Union
+from xml.parsers import expat
+
+ANIMATION_TAGS = ("animate", "animateTransform", "animateMotion", "animateColor")
+EXPECTED_VIEWBOX = (0.0, 0.0, 1000.0, 1000.0)
+
+URL_REF_RE = re.compile(r"url\(\s*['\"]?#([^'\")\s]+)['\"]?\s*\)")
+
+
+@dataclass
+class SVGReport:
+    """Resultado da análise de um SVG"""
+    well_formed: bool = True
+    parse_error: Optional[str] = None
+    root_tag: Optional[str] = None
+    root_viewbox: Optional[str] = None
+    animation_counts: Dict[str, int] = field(default_factory=lambda: {t: 0 for t in ANIMATION_TAGS})
+    non_indefinite: int = 0
+    ids: Set[str] = field(default_factory=set)
+    references: Set[str] = field(default_factory=set)
+    byte_size: int = 0
+
+    @property
+    def animation_total(self) -> int:
+        return sum(self.animation_counts.values())
+
+    @property
+    def viewbox_ok(self) -> bool:
+        return _parse_viewbox(self.root_viewbox) == EXPECTED_VIEWBOX
+
+    @property
+    def missing_references(self) -> List[str]:
+        return sorted(self.references - self.ids)
+
+    def violations(self, min_animations: int = 0) -> List[Tuple[str, str]]:
+        """Violações de regras rígidas como (motivo, mensagem)"""
+        violations = []
+        if not self.well_formed:
+            violations.append(("malformed", f"SVG malformado: {self.parse_error}"))
+        if self.root_tag is None:
+            violations.append(("incomplete", "SVG incompleto ou malformado"))
+        elif self.root_tag != "svg":
+            violations.append(("root_tag", f"Elemento raiz inválido: <{self.root_tag}>"))
+        elif not self.viewbox_ok:
+            violations.append(("viewbox", "viewBox raiz diferente de \"0 0 1000 1000\""))
+        if self.animation_total < min_animations:
+            violations.append(("few_animations",
+                               f"Poucas animações: {self.animation_total} < {min_animations}"))
+        return violations
+
+    def errors(self, min_animations: int = 0) -> List[str]:
+        """Violações de regras rígidas (impedem salvar o NFT)"""
+        return [message for _, message in self.violations(min_animations)]
+
+    def warnings(self) -> List[str]:
+        """Problemas não fatais"""
+        warnings = []
+        if self.non_indefinite:
+            warnings.append(f"{self.non_indefinite} animações sem repeatCount=\"indefinite\"")
+        missing = self.missing_references
+        if missing:
+            warnings.append(f"Referências para ids inexistentes: {', '.join(missing[:5])}")
+        return warnings
+
+
+def _parse_viewbox(value: Optional[str]):
+    if not value:
+        return None
+    try:
+        return tuple(float(v) for v in value.replace(",", " ").split())
+    except ValueError:
+        return None
+
+
+def _local_name(name: str) -> str:
+    return name.rsplit(":", 1)[-1]
+
+
+class SVGValidator:
+    """Analisa o SVG incrementalmente: feed(chunk)... close() -> SVGReport"""
+
+    def __init__(self):
+        self.report = SVGReport()
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start_element
+        self._started = False
+        self._closed = False
+
+    @property
+    def root_seen(self) -> bool:
+        return self.report.root_tag is not None
+
+    def _start_element(self, name: str, attrs: Dict[str, str]):
+        report = self.report
+        tag = _local_name(name)
+
+        if report.root_tag is None:
+            report.root_tag = tag
+            report.root_viewbox = attrs.get("viewBox")
+
+        if tag in report.animation_counts:
+            report.animation_counts[tag] += 1
+            if attrs.get("repeatCount") != "indefinite":
+                report.non_indefinite += 1
+
+        for attr, value in attrs.items():
+            if attr == "id":
+                report.ids.add(value)
+            elif _local_name(attr) == "href":
+                if value.startswith("#"):
+                    report.references.add(value[1:])
+            elif "url(" in value:
+                report.references.update(URL_REF_RE.findall(value))
+
+    def feed(self, chunk: Union[str, bytes]) -> bool:
+        """Alimenta mais um pedaço; retorna False se o documento já está malformado"""
+        if not self.report.well_formed or not chunk:
+            return self.report.well_formed
+        if not self._started:
+            # Declaração XML precisa estar no início exato do documento
+            chunk = chunk.lstrip()
+            if not chunk:
+                return True
+            self._started = True
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        self.report.byte_size += len(chunk)
+        try:
+            self._parser.Parse(chunk, False)
+        except expat.ExpatError as e:
+            self._fail(e)
+        return self.report.well_formed
+
+    def close(self) -> SVGReport:
+        """Finaliza o parse e retorna o relatório"""
+        if not self._closed:
+            self._closed = True
+            if self.report.well_formed:
+                try:
+                    self._parser.Parse(b"", True)
+                except expat.ExpatError as e:
+                    self._fail(e)
+        return self.report
+
+    def _fail(self, error: expat.ExpatError):
+        self.report.well_formed = False
+        self.report.parse_error = str(error)
+
+
+def validate_svg(data: Union[str, bytes]) -> SVGReport:
+    """Valida um SVG completo em uma passada"""
+    validator = SVGValidator()
+    validator.feed(data)
+    return validator.close()
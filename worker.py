@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Worker headless: vários processos (inclusive em hosts diferentes, com o
+diretório nfts/ compartilhado) consomem a mesma fila persistente
+
+Cada job é reservado com lease + heartbeat; se o worker morrer, o lease vence
+e outro worker retoma o job. O hash da obra é registrado antes da publicação,
+então um job retomado nunca gera uma segunda obra para o mesmo pedido.
+
+Uso:
+  python worker.py enqueue Common=10,Rare=5 [--budget 5.0]
+  python worker.py run [--concurrency 2] [--exit-when-empty] [--cost-aware]
+  python worker.py status
+"""
+
+import sys
+import signal
+import argparse
+import itertools
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import agent
+from hedging import DEFAULT_PERCENTILE, parse_budget
+from model_router import ROUTING_MODES
+from scheduler import (DEFAULT_LEASE_SECONDS, FAIL_OUTCOMES, RARITY_ORDER, BudgetExceeded,
+                       CostAwareScheduler, Job, JobQueue, default_owner, format_projection,
+                       in_discount_window, parse_targets)
+
+
+def open_queue(workdir: Path, owner: Optional[str] = None,
+               lease_seconds: float = DEFAULT_LEASE_SECONDS) -> JobQueue:
+    return JobQueue(workdir / "nfts" / "schedule.db", owner=owner, lease_seconds=lease_seconds)
+
+
+def enqueue(args: argparse.Namespace) -> int:
+    targets = parse_targets(args.mix)
+    queue = open_queue(args.workdir)
+    if args.budget is not None and not queue.unfinished_counts():
+        queue.plan(targets, args.budget)
+        added = sum(targets.values())
+    else:
+        added = queue.enqueue(targets)
+    print(f"📥 {added} jobs adicionados: {queue.status_counts()}")
+    queue.close()
+    return 0
+
+
+def status(args: argparse.Namespace) -> int:
+    queue = open_queue(args.workdir)
+    print(f"📋 Jobs: {queue.status_counts() or 'nenhum'}")
+    for owner, count in sorted(queue.lease_owners().items()):
+        print(f"   👷 {owner}: {count} em execução")
+    print(format_projection(CostAwareScheduler(queue, queue.budget).project()))
+    queue.close()
+    return 0
+
+
+def run(args: argparse.Namespace) -> int:
+    agent.load_environment()
+    if not agent.DEEPSEEK_API_KEY:
+        print("❌ Configure DEEPSEEK_API_KEY no ambiente ou no .env")
+        return 1
+
+    worker_id = args.worker_id or default_owner()
+    nft_agent = agent.HypnoticNFTAgent(
+        async_writer=False,  # a conclusão do job só é registrada após a publicação
+        stream=args.stream,
+        optimize_svg=args.optimize_svg,
+        svg_precision=args.svg_precision,
+        postprocess_workers=args.postprocess_workers,
+        svg_macros=args.svg_macros,
+        near_duplicates=args.near_duplicates,
+        similarity_threshold=args.similarity_threshold,
+        model_routing=args.model_routing,
+        route_fallback=not args.no_route_fallback,
+        routes_file=args.routes,
+        hedge=args.hedge,
+        hedge_percentile=args.hedge_percentile / 100,
+        hedge_budget=args.hedge_budget,
+        bundle=args.bundle,
+        metrics_port=args.metrics_port,
+        stats_file=args.stats_file,
+        nfts_dir=args.workdir / "nfts"  # sem chdir: --routes/--stats-file relativos ao diretório atual
+    )
+    queue = open_queue(args.workdir, worker_id, args.lease)
+    queue.start_heartbeat(args.heartbeat)
+    scheduler = CostAwareScheduler(queue, queue.budget, models=nft_agent.router.models())
+    nft_agent.configure_http_pool(args.concurrency)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    state: Dict[str, float] = {"claimed": 0, "saved": 0, "failed": 0,
+                               "recorded_cost": nft_agent.session_cost}
+    job_numbers = itertools.count(1)
+
+    def request_stop(signum, frame):
+        if not stop.is_set():
+            print(f"\n⏸️ [{worker_id}] Encerrando após os jobs em andamento...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    def record_spent(job: Optional[Job] = None):
+        with lock:
+            delta = nft_agent.session_cost - state["recorded_cost"]
+            state["recorded_cost"] = nft_agent.session_cost
+        queue.add_spent(delta, settle=job)  # acerta a reserva feita no claim
+
+    def next_job():
+        with lock:
+            if args.max_jobs and state["claimed"] >= args.max_jobs:
+                return None, False
+        rarities = scheduler.allowed_rarities() if args.cost_aware else RARITY_ORDER
+        discounted = in_discount_window()
+        try:
+            # Estimativa reservada na fila até o gasto real entrar (vale entre workers)
+            job = queue.claim(rarities, lambda rarity: scheduler.job_cost(rarity, discounted),
+                              queue.budget)
+        except BudgetExceeded:
+            if queue.reserved:
+                return None, True  # jobs em voo podem sair mais baratos que a estimativa
+            print(f"💰 [{worker_id}] Orçamento da fila atingido (${queue.budget:.2f})")
+            return None, False
+        if job is None:
+            # Jobs em execução em outros workers podem voltar se o lease vencer
+            keep_waiting = not args.exit_when_empty or bool(queue.unfinished_counts())
+            return None, keep_waiting
+        with lock:
+            state["claimed"] += 1
+        return job, True
+
+    def work():
+        while not stop.is_set():
+            job, keep_going = next_job()
+            if job is None:
+                if not keep_going:
+                    stop.set()
+                    break
+                stop.wait(args.poll)
+                continue
+            job_number = next(job_numbers)
+            try:
+                nft_agent.process_job(queue, job, job_number)
+                with lock:
+                    state["saved"] += 1
+                    nft_agent.nft_counter += 1
+            except Exception as e:
+                outcome = queue.fail(job, str(e))
+                with lock:
+                    state["failed"] += 1
+                print(f"   ⚠️ [{worker_id}] Job {job.id} ({job.rarity}) falhou, "
+                      f"{FAIL_OUTCOMES[outcome]}: {e}")
+            finally:
+                record_spent(job)
+
+    print(f"👷 Worker {worker_id}: {args.concurrency} slot(s), lease {args.lease:.0f}s, "
+          f"fila {queue.db_path}")
+    threads = [threading.Thread(target=work, name=f"nft-worker-{i}")
+               for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    # join com timeout: mantém o processo principal responsivo a sinais
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.5)
+
+    record_spent()
+    queue.release_owned()
+    print(f"📋 [{worker_id}] {int(state['saved'])} salvos, {int(state['failed'])} falhas, "
+          f"custo ${nft_agent.session_cost:.4f}")
+    for line in nft_agent.router.format_summary():
+        print(f"   🧭 {line}")
+    if nft_agent.hedger:
+        for rarity, row in nft_agent.hedger.summary().items():
+            print(f"   🏁 {rarity}: {row['fired']}/{row['jobs']} cópias, {row['hedge_wins']} vitórias, "
+                  f"+{row['extra_tokens']} tokens")
+    queue.close()
+    nft_agent.close()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Worker headless da fila de NFTs")
+    parser.add_argument("--workdir", type=Path, default=Path.cwd(),
+                        help="Diretório que contém nfts/ (compartilhado entre workers)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_cmd = commands.add_parser("enqueue", help="Adiciona jobs à fila")
+    enqueue_cmd.add_argument("mix", help="Ex.: Common=10,Rare=5,Epic=2")
+    enqueue_cmd.add_argument("--budget", type=float, default=None,
+                             help="Orçamento da fila (só ao criar uma fila nova)")
+
+    commands.add_parser("status", help="Mostra a fila e os leases ativos")
+
+    run_cmd = commands.add_parser("run", help="Consome a fila até ser interrompido")
+    run_cmd.add_argument("--worker-id", default=None, help="Padrão: host:pid")
+    run_cmd.add_argument("--concurrency", type=int, default=1)
+    run_cmd.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                         help="Segundos sem heartbeat até o job ser retomado por outro worker")
+    run_cmd.add_argument("--heartbeat", type=float, default=None,
+                         help="Intervalo do heartbeat (padrão: lease/3)")
+    run_cmd.add_argument("--poll", type=float, default=5.0,
+                         help="Espera entre consultas quando a fila está vazia")
+    run_cmd.add_argument("--max-jobs", type=int, default=0)
+    run_cmd.add_argument("--exit-when-empty", action="store_true",
+                         help="Sai quando não houver jobs pendentes nem em execução")
+    run_cmd.add_argument("--cost-aware", action="store_true",
+                         help="Epic/Legendary só na janela de desconto")
+    run_cmd.add_argument("--stream", action="store_true",
+                         help="Streaming SSE com validação incremental (necessário para --hedge)")
+    run_cmd.add_argument("--optimize-svg", action="store_true")
+    run_cmd.add_argument("--svg-precision", type=int, default=3)
+    run_cmd.add_argument("--postprocess-workers", type=int, default=0,
+                         help="Processos para thumbnails e etapas de CPU (0 = desligado)")
+    run_cmd.add_argument("--svg-macros", action="store_true",
+                         help="Macros SVG compactas expandidas localmente")
+    run_cmd.add_argument("--near-duplicates", choices=("off", "flag", "reject"), default="off",
+                         help="Quase-duplicatas (índice compartilhado entre os workers)")
+    run_cmd.add_argument("--similarity-threshold", type=float, default=None)
+    run_cmd.add_argument("--model-routing", choices=ROUTING_MODES, default="fixed",
+                         help="rarity = modelo/max_tokens/temperatura por raridade")
+    run_cmd.add_argument("--routes", type=Path, default=None, metavar="JSON")
+    run_cmd.add_argument("--no-route-fallback", action="store_true")
+    run_cmd.add_argument("--hedge", action="store_true",
+                         help="Cópia da requisição quando passa do percentil de latência recente")
+    run_cmd.add_argument("--hedge-percentile", type=float, default=DEFAULT_PERCENTILE * 100)
+    run_cmd.add_argument("--hedge-budget", type=parse_budget, default=None, metavar="MIX")
+    run_cmd.add_argument("--bundle", action="store_true",
+                         help="Acrescenta cada NFT publicado a nfts/collection.bundle (trava entre workers)")
+    run_cmd.add_argument("--metrics-port", type=int, default=None)
+    run_cmd.add_argument("--stats-file", type=Path, default=None)
+
+    args = parser.parse_args()
+    if getattr(args, "hedge", False) and not args.stream:
+        # Sem SSE a cópia perdedora não pode ser cancelada: seria paga por inteiro
+        parser.error("--hedge requer --stream")
+    args.workdir = args.workdir.resolve()
+    handlers = {"enqueue": enqueue, "status": status, "run": run}
+    return handlers[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())